@@ -75,16 +75,9 @@ class Bubble(Actor):
 
     def putOutput(self):
         """Function for putting updated results into the store"""
-        ids = []
-        ids.append(self.client.put(np.array(self.bw.A), "A" + str(self.frame_number)))
-        ids.append(self.client.put(np.array(self.bw.L), "L" + str(self.frame_number)))
-        ids.append(self.client.put(np.array(self.bw.mu), "mu" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.n_obs), "n_obs" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.pred), "pred" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.entropy_list), "entropy" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.dead_nodes), "dead_nodes" + str(self.frame_number)))
+        objects = [self.bw.A, self.bw.L, self.bw.mu, self.bw.n_obs,
+                   self.bw.pred, self.bw.entropy_list, self.bw.dead_nodes]
+        names = ["A", "L", "mu", "n_obs", "pred", "entropy", "dead_nodes"]
+        ids = self.client.putMany([np.array(obj) for obj in objects],
+                                  [name + str(self.frame_number) for name in names])
         self.q_out.put([self.frame_number, ids])
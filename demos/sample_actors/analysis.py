@@ -177,40 +177,15 @@ class MeanAnalysis(Actor):
     def putAnalysis(self):
         """Throw things to DS and put IDs in queue for Visual"""
         t = time.time()
-        ids = []
-        ids.append(
-            [self.client.put(self.Cx, "Cx" + str(self.frame)), "Cx" + str(self.frame)]
-        )
-        ids.append(
-            [
-                self.client.put(self.Call, "Call" + str(self.frame)),
-                "Call" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.Cpop, "Cpop" + str(self.frame)),
-                "Cpop" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.tune, "tune" + str(self.frame)),
-                "tune" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.color, "color" + str(self.frame)),
-                "color" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.coordDict, "analys_coords" + str(self.frame)),
-                "analys_coords" + str(self.frame),
-            ]
-        )
+        names = [
+            name + str(self.frame)
+            for name in ["Cx", "Call", "Cpop", "tune", "color", "analys_coords"]
+        ]
+        objects = [self.Cx, self.Call, self.Cpop, self.tune, self.color, self.coordDict]
+        ids = [
+            [obj_id, name]
+            for obj_id, name in zip(self.client.putMany(objects, names), names)
+        ]
         ids.append([self.frame, str(self.frame)])
 
         self.put(ids, save=[False, False, False, False, False, True, False])
@@ -221,10 +221,14 @@ class CaimanProcessor(Actor):
         self._updateCoords(A, dims)
         t5 = time.time()
 
-        ids = []
-        ids.append(self.client.put(self.coords, "coords" + str(self.frame_number)))
-        ids.append(self.client.put(image, "proc_image" + str(self.frame_number)))
-        ids.append(self.client.put(C, "S" + str(self.frame_number)))
+        ids = self.client.putMany(
+            [self.coords, image, C],
+            [
+                "coords" + str(self.frame_number),
+                "proc_image" + str(self.frame_number),
+                "S" + str(self.frame_number),
+            ],
+        )
         ids.append(self.frame_number)
         t6 = time.time()
 
@@ -3,7 +3,8 @@ import signal
 import asyncio
 import traceback
 from queue import Empty
-from improv.store import StoreInterface
+from contextlib import contextmanager
+from improv.store import StoreInterface, AsyncStoreInterface
 
 import logging
 
@@ -28,6 +29,8 @@ class AbstractActor:
         self.method = method
         self.client = None
         self.store_loc = store_loc
+        # Nexus replaces this with the class of the store it started
+        self.store_class = StoreInterface
         self.lower_priority = False
 
         # Start with no explicit data queues.
@@ -55,7 +58,7 @@ class AbstractActor:
     def _getStoreInterface(self):
         # TODO: Where do we require this be run? Add a Signal and include in RM?
         if not self.client:
-            store = StoreInterface(self.name, self.store_loc)
+            store = self.store_class(self.name, self.store_loc)
             self.setStoreInterface(store)
 
     def setLinks(self, links):
@@ -143,6 +146,50 @@ class AbstractActor:
                 if self.q_watchout:
                     self.q_watchout.put(idnames[i])
 
+    def send(self, obj, obj_name, link=None):
+        """Put obj in the store, leased to each consumer of link,
+        and send its id on link
+
+        Args:
+            obj: object to store
+            obj_name (str): name of the object
+            link (improv.link.Link): q_out if None
+
+        Returns:
+            id of the object, None if it was not stored and nothing was sent
+        """
+        if link is None:
+            link = self.q_out
+        obj_id = self.client.put(obj, obj_name, consumers=link.consumers)
+        if obj_id is not None:
+            link.put(obj_id)
+        return obj_id
+
+    @contextmanager
+    def receive(self, link=None, timeout=None):
+        """Get the next id sent on link with send, and the object it
+        refers to, releasing this actor's lease on the object at the end
+        of the with block. Arrays read from the shared memory store are
+        views that are only valid inside the block.
+
+        Args:
+            link (improv.link.Link): q_in if None
+            timeout (float): seconds to wait for an id, None to wait forever
+
+        Yields:
+            the object
+
+        Raises:
+            queue.Empty: If no id arrives in time
+        """
+        if link is None:
+            link = self.q_in
+        obj_id = link.get(timeout=timeout)
+        try:
+            yield self.client.getID(obj_id)
+        finally:
+            self.client.releaseID(obj_id)
+
     def setup(self):
         """Essenitally the registration process
         Can also be an initialization for the actor
@@ -207,6 +254,17 @@ class AsyncActor(AbstractActor):
         self.actions["setup"] = self.setup
         self.actions["run"] = self.runStep
         self.actions["stop"] = self.stop
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        """Asyncio client for the store (improv.store.AsyncStoreInterface),
+        created on first use in the actor's process
+        """
+        if self._async_client is None:
+            self._getStoreInterface()
+            self._async_client = AsyncStoreInterface(self.client)
+        return self._async_client
 
     def run(self):
         """Run the actor in an async loop"""
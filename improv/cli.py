@@ -11,6 +11,7 @@ from zmq import SocketOption
 from zmq.log.handlers import PUBHandler
 from improv.tui import TUI
 from improv.nexus import Nexus
+from improv.utils.reader import LMDBReader
 
 MAX_PORT = 2**16 - 1
 DEFAULT_CONTROL_PORT = "0"
@@ -190,6 +191,36 @@ def parse_cli_args(args):
     )
     cleanup_parser.set_defaults(func=run_cleanup)
 
+    export_parser = subparsers.add_parser(
+        "export", description="Export objects saved to LMDB to an HDF5 file"
+    )
+    export_parser.add_argument(
+        "lmdb", type=path_exists, help="LMDB folder of an improv session"
+    )
+    export_parser.add_argument(
+        "-n",
+        "--name",
+        required=True,
+        help="name of the objects without their frame number, e.g. acq_raw",
+    )
+    export_parser.add_argument(
+        "-t", "--to", required=True, help="HDF5 file to write the objects to"
+    )
+    export_parser.add_argument(
+        "-d", "--dataset", default=None, help="name of the dataset; defaults to name"
+    )
+    export_parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=256,
+        help="number of objects held in memory at once",
+    )
+    export_parser.add_argument(
+        "-z", "--compression", default=None, help="HDF5 compression, e.g. gzip"
+    )
+    export_parser.set_defaults(func=run_export)
+
     return parser.parse_args(args)
 
 
@@ -293,6 +324,17 @@ def run_cleanup(args, headless=False):
             print("No running processes found.")
 
 
+def run_export(args):
+    n = LMDBReader(args.lmdb).export(
+        args.name,
+        args.to,
+        dataset=args.dataset,
+        batch_size=args.batch_size,
+        compression=args.compression,
+    )
+    print(f"Exported {n} objects named {args.name} to {args.to}.")
+
+
 def run(args, timeout=10):
     apath_opts = []
     for p in args.actor_path:
@@ -3,6 +3,8 @@ import logging
 from inspect import signature
 from importlib import import_module
 
+from improv.link import LINK_OVERFLOW
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +45,7 @@ class Config:
 
         self.actors = {}
         self.connections = {}
+        self.link_options = {}
         self.hasGUI = False
 
     def createConfig(self):
@@ -107,6 +110,36 @@ class Config:
             if name in self.connections.keys():
                 raise RepeatedConnectionsError(name)
 
+            # A connection is either a list of drains or a dict of them
+            # ("to") with the size and overflow policy of their links
+            if isinstance(conn, dict):
+                maxsize = conn.get("maxsize", 0)
+                overflow = conn.get("overflow", "block")
+                if "to" not in conn:
+                    logger.error(f"Error: connection {name} has no inputs (to)")
+                    return -1
+                if type(maxsize) is not int or maxsize < 0:
+                    logger.error(
+                        f"Error: maxsize of connection {name} must be a "
+                        f"non-negative integer, not {maxsize}"
+                    )
+                    return -1
+                if overflow not in LINK_OVERFLOW:
+                    logger.error(
+                        f"Error: overflow of connection {name} must be one of "
+                        f"{', '.join(LINK_OVERFLOW)}, not {overflow}"
+                    )
+                    return -1
+                if overflow == "latest" and "maxsize" in conn:
+                    logger.error(
+                        f"Error: connection {name} holds only the latest "
+                        "message, it takes no maxsize"
+                    )
+                    return -1
+                self.link_options.update(
+                    {name: {"maxsize": maxsize, "overflow": overflow}}
+                )
+                conn = conn["to"]
             self.connections.update({name: conn})
         return 0
 
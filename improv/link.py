@@ -1,33 +1,618 @@
+import os
+import mmap
+import time
+import pickle
+import select
+import struct
 import asyncio
 import logging
-from multiprocessing import Manager, cpu_count
+import tempfile
+import weakref
+from queue import Empty, Full
+from multiprocessing import cpu_count
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures._base import CancelledError
 
+from improv.store import shared_memory_dir
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
-def Link(name, start, end):
+def Link(name, start, end, maxsize=0, overflow="block"):
     """Function to construct a queue that Nexus uses for
     inter-process (actor) signaling and information passing.
 
     A Link has an internal queue that can be synchronous (put, get)
-    as inherited from multiprocessing.Manager.Queue
-    or asynchronous (put_async, get_async) using async executors.
+    as implemented by SharedMemoryQueue
+    or asynchronous (put_async, get_async), waiting on the event loop
+    for its file descriptors with no threads.
 
     Args:
         See AsyncQueue constructor
+        maxsize (int): Most messages in the queue, 0 for no limit
+            other than the size of its buffer
+        overflow (str): What a put does when the queue is full, one of
+            LINK_OVERFLOW; see SharedMemoryQueue. "latest" makes a
+            LatestValueQueue, which only holds the newest message.
 
     Returns:
         AsyncQueue: queue for communicating between actors and with Nexus
     """
 
-    m = Manager()
-    q = AsyncQueue(m.Queue(maxsize=0), name, start, end)
+    q = AsyncQueue(_link_queue(maxsize, overflow), name, start, end)
     return q
 
 
+def _link_queue(maxsize, overflow):
+    """Queue for one consumer of a link"""
+    if overflow not in LINK_OVERFLOW:
+        raise ValueError(
+            "overflow must be one of {}, not {}".format(LINK_OVERFLOW, overflow)
+        )
+    if overflow == "latest":
+        return LatestValueQueue()
+    return SharedMemoryQueue(maxsize=maxsize, overflow=overflow)
+
+
+# Positions in a SharedMemoryQueue file. The consumer writes the head
+# (position of the next message to read) and number of messages read,
+# the producer the tail (position after the last message written) and
+# number of messages written; each on its own cache line. Each side
+# counts the messages it dropped after its counter.
+_HEAD = 0
+_TAIL = 64
+_DROPPED = 16
+_PRODUCER_WAITING = 128
+_DATA = 192
+_COUNTER = struct.Struct("<QQ")
+_FLAG = struct.Struct("<I")
+# Message header: length of the payload and its kind
+_MESSAGE = struct.Struct("<II")
+_MESSAGE_PICKLE = 0
+_MESSAGE_SPILLED = 1  # payload is in a file of its own
+_MESSAGE_WRAP = 2  # rest of the ring is unused, continue at the start
+_SEQ = struct.Struct("<Q")
+# Producers blocked on a full queue recheck it this often, in seconds
+_FULL_POLL = 0.05
+# First wait before a LatestValueQueue consumer rereads a slot being written
+_RETRY_POLL = 1e-5
+_COUNT = struct.Struct("<Q")
+
+_RING_OVERFLOW = ("block", "drop-oldest", "drop-newest")
+LINK_OVERFLOW = _RING_OVERFLOW + ("latest",)
+
+
+def _aligned(n):
+    return -(-n // 8) * 8
+
+
+def _remove_queue(path, pid):
+    """Remove the files of a SharedMemoryQueue, in the process that made it"""
+    if os.getpid() != pid:
+        return
+    directory, prefix = os.path.split(path)
+    for name in os.listdir(directory):
+        if name.startswith(prefix):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+class SharedMemoryQueue:
+    """Single-producer, single-consumer queue of pickled objects in a ring
+    buffer in shared memory, with no server process. Messages are
+    written and read in place; the consumer is woken through a FIFO,
+    which get_async polls on the event loop, as does put_async for
+    a FIFO the producer is woken through when the queue is full.
+    Messages bigger than a quarter of the ring are written to a file
+    of their own.
+
+    With a maxsize, the queue holds at most that many messages. When it
+    is full, a put waits ("block"), the new message is dropped
+    ("drop-newest"), or the consumer skips the oldest messages beyond
+    maxsize on its next get ("drop-oldest"; if the ring itself fills
+    up, new messages are dropped). dropped() counts the messages lost.
+
+    The queue is shared with processes forked after it is made, or
+    pickled to processes started with spawn. Its files are removed
+    when the process that made it drops it.
+    """
+
+    def __init__(self, capacity=2**20, maxsize=0, overflow="block"):
+        """
+        Constructor for a SharedMemoryQueue
+
+        :param capacity: bytes in the ring buffer, rounded up to a multiple of 8
+        :param maxsize: most messages in the queue, 0 for no limit
+        :param overflow: "block", "drop-oldest" or "drop-newest"
+        """
+        if overflow not in _RING_OVERFLOW:
+            raise ValueError(
+                "overflow must be one of {}, not {}".format(_RING_OVERFLOW, overflow)
+            )
+        self.maxsize = maxsize
+        self.overflow = overflow
+        capacity = _aligned(capacity)
+        fd, path = tempfile.mkstemp(prefix="improv-link-", dir=shared_memory_dir())
+        try:
+            os.ftruncate(fd, _DATA + capacity)
+        finally:
+            os.close(fd)
+        os.mkfifo(path + ".readable")
+        os.mkfifo(path + ".writable")
+        self._finalizer = weakref.finalize(self, _remove_queue, path, os.getpid())
+        self._attach(path, capacity)
+
+    def _attach(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        with open(path, "r+b") as f:
+            self._buf = mmap.mmap(f.fileno(), _DATA + capacity)
+        # Open both ends so that neither side waits for the other to open them
+        self._readable_fd = os.open(path + ".readable", os.O_RDWR | os.O_NONBLOCK)
+        self._writable_fd = os.open(path + ".writable", os.O_RDWR | os.O_NONBLOCK)
+
+    def __getstate__(self):
+        return {
+            "path": self.path,
+            "capacity": self.capacity,
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+        }
+
+    def __setstate__(self, state):
+        self._finalizer = None
+        self.maxsize = state["maxsize"]
+        self.overflow = state["overflow"]
+        self._attach(state["path"], state["capacity"])
+
+    def qsize(self):
+        """Number of messages in the queue"""
+        size = (
+            _COUNTER.unpack_from(self._buf, _TAIL)[1]
+            - _COUNTER.unpack_from(self._buf, _HEAD)[1]
+        )
+        if self.maxsize and self.overflow == "drop-oldest":
+            return min(size, self.maxsize)
+        return size
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        """Whether there is no room left for even an empty message"""
+        if self.maxsize and self.qsize() >= self.maxsize:
+            return True
+        head = _COUNTER.unpack_from(self._buf, _HEAD)[0]
+        tail = _COUNTER.unpack_from(self._buf, _TAIL)[0]
+        return self.capacity - (tail - head) < _aligned(_MESSAGE.size + 1)
+
+    def dropped(self):
+        """Number of messages dropped because the queue was full"""
+        return (
+            _COUNT.unpack_from(self._buf, _HEAD + _DROPPED)[0]
+            + _COUNT.unpack_from(self._buf, _TAIL + _DROPPED)[0]
+        )
+
+    def fileno(self):
+        """File descriptor that becomes readable when a message is put"""
+        return self._readable_fd
+
+    def put(self, item, block=True, timeout=None):
+        """
+        Put an object in the queue, waiting for room if it is full
+
+        Args:
+            item (object): any object that can be pickled
+            block (bool): wait for room rather than raise queue.Full
+            timeout (float): seconds to wait, None to wait forever
+
+        Raises:
+            queue.Full: If there is no room in time
+        """
+        self.put_many([item], block=block, timeout=timeout)
+
+    def put_many(self, items, block=True, timeout=None):
+        """
+        Put several objects in the queue, publishing and ringing once
+        for as many of them as there is room for
+
+        Args:
+            items (list): objects that can be pickled, oldest first
+            block (bool): wait for room rather than raise queue.Full
+            timeout (float): seconds to wait, None to wait forever
+
+        Raises:
+            queue.Full: If there is no room in time for the remaining
+            objects; the ones before them have been put. Only raised
+            when overflow is "block".
+        """
+        puts = _COUNTER.unpack_from(self._buf, _TAIL)[1]
+        messages = [self._encode(item, puts + i) for i, item in enumerate(items)]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while messages:
+            messages = messages[self._write(messages) :]
+            if not messages:
+                break
+            if self.overflow != "block":
+                for kind, data in messages:
+                    self._unspill(kind, data)
+                dropped = _COUNT.unpack_from(self._buf, _TAIL + _DROPPED)[0]
+                _COUNT.pack_into(self._buf, _TAIL + _DROPPED, dropped + len(messages))
+                break
+            if not block or not self._wait(
+                self._writable_fd, deadline, _PRODUCER_WAITING
+            ):
+                for kind, data in messages:
+                    self._unspill(kind, data)
+                raise Full
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        """
+        Get the oldest object in the queue, waiting for one if it is empty
+
+        Args:
+            block (bool): wait for an object rather than raise queue.Empty
+            timeout (float): seconds to wait, None to wait forever
+
+        Raises:
+            queue.Empty: If there is no object in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not block:
+            deadline = time.monotonic()
+        while True:
+            data = self._take(1, deadline)
+            if data:
+                return pickle.loads(data[0])
+            if not self._wait(self._readable_fd, deadline):
+                raise Empty
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_many(self, max_items, timeout=None):
+        """
+        Get the oldest objects in the queue, waiting for the first one
+        and taking the rest that are already there in one pass
+
+        Args:
+            max_items (int): most objects to return
+            timeout (float): seconds to wait, None to wait forever
+
+        Returns:
+            (list): between 1 and max_items objects, oldest first
+
+        Raises:
+            queue.Empty: If there is no object in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            data = self._take(max_items, deadline)
+            if data:
+                return [pickle.loads(d) for d in data]
+            if not self._wait(self._readable_fd, deadline):
+                raise Empty
+
+    async def put_async(self, item):
+        """Put an object in the queue, waiting for room on the event loop"""
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                return self.put_nowait(item)
+            except Full:
+                pass
+            # Recheck now and then, as in put, in case the consumer
+            # took a message before it saw the flag
+            _FLAG.pack_into(self._buf, _PRODUCER_WAITING, 1)
+            try:
+                await asyncio.wait_for(
+                    self._wait_readable(loop, self._writable_fd), _FULL_POLL
+                )
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                _FLAG.pack_into(self._buf, _PRODUCER_WAITING, 0)
+            self._drain(self._writable_fd)
+
+    async def get_async(self):
+        """Get the oldest object in the queue, waiting on the event loop"""
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                return self.get_nowait()
+            except Empty:
+                pass
+            await self._wait_readable(loop, self._readable_fd)
+            self._drain(self._readable_fd)
+
+    @staticmethod
+    async def _wait_readable(loop, fd):
+        """Wait for fd to become readable"""
+        readable = loop.create_future()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+
+    def close(self):
+        """Detach this process from the queue"""
+        os.close(self._readable_fd)
+        os.close(self._writable_fd)
+        self._buf.close()
+
+    def _encode(self, item, seq):
+        """Kind and payload of the message for item, spilling large ones"""
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        if _aligned(_MESSAGE.size + len(data)) > self.capacity // 4:
+            with open("{}.{}".format(self.path, seq), "wb") as f:
+                f.write(data)
+            return _MESSAGE_SPILLED, _SEQ.pack(seq)
+        return _MESSAGE_PICKLE, data
+
+    def _write(self, messages):
+        """Write as many messages as fit, publish them at once and return
+        how many were written"""
+        head, gets = _COUNTER.unpack_from(self._buf, _HEAD)
+        first, puts = _COUNTER.unpack_from(self._buf, _TAIL)
+        tail = first
+        written = 0
+        # Under drop-oldest the consumer enforces maxsize
+        room = None
+        if self.maxsize and self.overflow != "drop-oldest":
+            room = self.maxsize - (puts - gets)
+        for kind, data in messages:
+            if room is not None and written >= room:
+                break
+            size = _aligned(_MESSAGE.size + len(data))
+            offset = tail % self.capacity
+            # a message does not wrap around the end of the ring
+            skip = self.capacity - offset if size > self.capacity - offset else 0
+            if self.capacity - (tail - head) < size + skip:
+                break
+            if skip:
+                _MESSAGE.pack_into(self._buf, _DATA + offset, 0, _MESSAGE_WRAP)
+                tail += skip
+                offset = 0
+            start = _DATA + offset
+            _MESSAGE.pack_into(self._buf, start, len(data), kind)
+            self._buf[start + _MESSAGE.size : start + _MESSAGE.size + len(data)] = data
+            tail += size
+            written += 1
+        if written:
+            # Publish the messages only once they are written
+            _COUNTER.pack_into(self._buf, _TAIL, tail, puts + written)
+            self._ring(self._readable_fd)
+        return written
+
+    def _take(self, max_items, deadline=None):
+        """Payloads of up to max_items oldest messages, removed from the
+        ring at once; empty if there are none. Never waits, so the
+        deadline is unused."""
+        first, gets = _COUNTER.unpack_from(self._buf, _HEAD)
+        tail, puts = _COUNTER.unpack_from(self._buf, _TAIL)
+        head = first
+        skip = 0
+        if self.maxsize and self.overflow == "drop-oldest":
+            skip = max(puts - gets - self.maxsize, 0)
+        messages = []
+        while head != tail and len(messages) < max_items:
+            offset = head % self.capacity
+            length, kind = _MESSAGE.unpack_from(self._buf, _DATA + offset)
+            if kind == _MESSAGE_WRAP:
+                head += self.capacity - offset
+                continue
+            start = _DATA + offset + _MESSAGE.size
+            if skip:
+                self._unspill(kind, self._buf[start : start + length])
+                skip -= 1
+                gets += 1
+                dropped = _COUNT.unpack_from(self._buf, _HEAD + _DROPPED)[0]
+                _COUNT.pack_into(self._buf, _HEAD + _DROPPED, dropped + 1)
+            else:
+                messages.append((kind, self._buf[start : start + length]))
+            head += _aligned(_MESSAGE.size + length)
+        if not messages:
+            if head != first:
+                _COUNTER.pack_into(self._buf, _HEAD, head, gets)
+            return []
+        _COUNTER.pack_into(self._buf, _HEAD, head, gets + len(messages))
+        if _FLAG.unpack_from(self._buf, _PRODUCER_WAITING)[0]:
+            self._ring(self._writable_fd)
+        payloads = []
+        for kind, data in messages:
+            if kind == _MESSAGE_SPILLED:
+                path = "{}.{}".format(self.path, _SEQ.unpack(data)[0])
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.unlink(path)
+            payloads.append(data)
+        return payloads
+
+    def _unspill(self, kind, data):
+        """Remove the file of a spilled message that was not put"""
+        if kind == _MESSAGE_SPILLED:
+            os.unlink("{}.{}".format(self.path, _SEQ.unpack(data)[0]))
+
+    def _wait(self, fd, deadline, flag=None):
+        """Wait for fd to be rung, False if the deadline passed first"""
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            return False
+        if flag is not None:
+            # Producers are only rung when they ask to be, and recheck
+            # the queue in case they asked just after the last get
+            _FLAG.pack_into(self._buf, flag, 1)
+            remaining = _FULL_POLL if remaining is None else min(remaining, _FULL_POLL)
+        try:
+            select.select([fd], [], [], remaining)
+        finally:
+            if flag is not None:
+                _FLAG.pack_into(self._buf, flag, 0)
+        self._drain(fd)
+        return True
+
+    @staticmethod
+    def _ring(fd):
+        try:
+            os.write(fd, b"\0")
+        except BlockingIOError:
+            pass  # already rung many times, and not yet drained
+
+    @staticmethod
+    def _drain(fd):
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+
+class LatestValueQueue(SharedMemoryQueue):
+    """Queue that holds only the newest message, for consumers such as
+    displays that only care about the latest value. A put overwrites
+    the message in the queue if it was not read yet, and never waits;
+    dropped() counts the messages overwritten this way, as they are
+    overwritten. A message the consumer was reading just as it was
+    overwritten may be counted even if the read got it.
+
+    The message is kept in a single slot guarded by a sequence number
+    that is odd while the producer writes; the consumer copies the slot
+    and retries, backing off until its deadline, if the number changed
+    meanwhile. Messages bigger than the slot are written to a file of
+    their own.
+    """
+
+    def __init__(self, capacity=2**20):
+        """
+        Constructor for a LatestValueQueue
+
+        :param capacity: bytes in the message slot, rounded up to a multiple of 8
+        """
+        super().__init__(capacity)
+        self.overflow = "latest"
+        self._spilled = None
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._spilled = None
+
+    def qsize(self):
+        """1 if there is a message that was not read, else 0"""
+        puts = _COUNTER.unpack_from(self._buf, _TAIL)[1]
+        return int(puts != _COUNTER.unpack_from(self._buf, _HEAD)[0])
+
+    def full(self):
+        return False
+
+    def dropped(self):
+        """Number of messages overwritten before they were read"""
+        return _COUNT.unpack_from(self._buf, _TAIL + _DROPPED)[0]
+
+    def put_many(self, items, block=True, timeout=None):
+        """
+        Put the last of several objects in the queue, overwriting the
+        message there; the others count as overwritten
+
+        Args:
+            items (list): objects that can be pickled, oldest first
+            block (bool): unused, a put never waits
+            timeout (float): unused, a put never waits
+        """
+        items = list(items)
+        if not items:
+            return
+        seq, puts = _COUNTER.unpack_from(self._buf, _TAIL)
+        # The message in the slot is lost unless it was read, and so are
+        # all but the last of items
+        overwritten = len(items) - 1
+        if puts != _COUNTER.unpack_from(self._buf, _HEAD)[0]:
+            overwritten += 1
+        puts += len(items)
+        kind = _MESSAGE_PICKLE
+        data = pickle.dumps(items[-1], protocol=pickle.HIGHEST_PROTOCOL)
+        if _MESSAGE.size + len(data) > self.capacity:
+            with open("{}.{}".format(self.path, puts), "wb") as f:
+                f.write(data)
+            kind = _MESSAGE_SPILLED
+            data = _SEQ.pack(puts)
+
+        _COUNTER.pack_into(self._buf, _TAIL, seq + 1, puts - len(items))
+        _MESSAGE.pack_into(self._buf, _DATA, len(data), kind)
+        self._buf[_DATA + _MESSAGE.size : _DATA + _MESSAGE.size + len(data)] = data
+        _COUNTER.pack_into(self._buf, _TAIL, seq + 2, puts)
+        self._ring(self._readable_fd)
+        if overwritten:
+            dropped = _COUNT.unpack_from(self._buf, _TAIL + _DROPPED)[0]
+            _COUNT.pack_into(self._buf, _TAIL + _DROPPED, dropped + overwritten)
+
+        # The consumer reads a spilled message after checking it was not
+        # overwritten, and retries if its file is gone
+        if self._spilled is not None:
+            try:
+                os.unlink(self._spilled)
+            except FileNotFoundError:
+                pass
+        self._spilled = None
+        if kind == _MESSAGE_SPILLED:
+            self._spilled = "{}.{}".format(self.path, puts)
+
+    def _take(self, max_items, deadline=None):
+        """Payload of the newest message if it was not read; empty if
+        there is none, or if it is being written past the deadline"""
+        taken, gets = _COUNTER.unpack_from(self._buf, _HEAD)
+        backoff = _RETRY_POLL
+        while True:
+            data = self._read_slot(taken)
+            if data is not None:
+                break
+            # A producer that died while writing leaves the sequence
+            # number odd; give up rather than spin
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(backoff)
+            backoff = min(backoff * 2, _FULL_POLL)
+        if not data:
+            return []
+        puts, data = data
+        _COUNTER.pack_into(self._buf, _HEAD, puts, gets + 1)
+        return [data]
+
+    def _read_slot(self, taken):
+        """(number, payload) of the message in the slot, () if it was
+        read already, or None if it changed while being read"""
+        seq, puts = _COUNTER.unpack_from(self._buf, _TAIL)
+        if puts == taken:
+            return ()
+        if seq % 2:
+            return None  # being written
+        length, kind = _MESSAGE.unpack_from(self._buf, _DATA)
+        if _MESSAGE.size + length > self.capacity:
+            return None  # torn read
+        start = _DATA + _MESSAGE.size
+        data = self._buf[start : start + length]
+        if _COUNTER.unpack_from(self._buf, _TAIL)[0] != seq:
+            return None
+        if kind == _MESSAGE_SPILLED:
+            path = "{}.{}".format(self.path, _SEQ.unpack(data)[0])
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None  # overwritten since
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        return puts, data
+
+
 class AsyncQueue(object):
     """Single-output and asynchronous queue class.
 
@@ -48,7 +633,7 @@ class AsyncQueue(object):
         """Constructor for the queue class.
 
         Args:
-            q (Queue): A queue from the Manager class
+            q (Queue): A SharedMemoryQueue, or any queue with the same methods
             name (str): String description of this queue
             start (str): The producer (input) actor name for the queue
             end (str): The consumer (output) actor name for the queue
@@ -61,6 +646,8 @@ class AsyncQueue(object):
         self.name = name
         self.start = start
         self.end = end
+        # number of actors reading each message, i.e. store leases per object
+        self.consumers = 1
 
         self.status = "pending"
         self.result = None
@@ -123,7 +710,7 @@ class AsyncQueue(object):
         Returns:
             (object): Value of the attribute specified by "name".
         """
-        if name in ["qsize", "empty", "full", "get", "get_nowait", "close"]:
+        if name in ["qsize", "empty", "full", "dropped", "get", "get_nowait", "close"]:
             return getattr(self.queue, name)
         else:
             cn = self.__class__.__name__
@@ -153,6 +740,45 @@ class AsyncQueue(object):
         """
         self.queue.put_nowait(item)
 
+    def put_many(self, items):
+        """Puts a batch of items, synchronizing once for all of them when
+        the queue supports it
+
+        Args:
+            items (list): Items that can be sent through a queue
+        """
+        if hasattr(self.queue, "put_many"):
+            self.queue.put_many(items)
+        else:
+            for item in items:
+                self.queue.put(item)
+
+    def get_many(self, max_items, timeout=None):
+        """Gets a batch of items, waiting only for the first one
+
+        Lets an actor that fell behind catch up with one synchronization
+        per batch rather than per item.
+
+        Args:
+            max_items (int): Most items to return
+            timeout (float): Seconds to wait, None to wait forever
+
+        Returns:
+            (list): Between 1 and max_items items, oldest first
+
+        Raises:
+            queue.Empty: If there is no item in time
+        """
+        if hasattr(self.queue, "get_many"):
+            return self.queue.get_many(max_items, timeout=timeout)
+        items = [self.queue.get(timeout=timeout)]
+        while len(items) < max_items:
+            try:
+                items.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return items
+
     async def put_async(self, item):
         """Coroutine for an asynchronous put
 
@@ -166,7 +792,10 @@ class AsyncQueue(object):
         """
         loop = asyncio.get_event_loop()
         try:
-            res = await loop.run_in_executor(self._executor, self.put, item)
+            if hasattr(self.queue, "put_async"):
+                res = await self.queue.put_async(item)
+            else:
+                res = await loop.run_in_executor(self._executor, self.put, item)
             return res
         except EOFError:
             logger.warn("Link probably killed (EOF)")
@@ -195,7 +824,10 @@ class AsyncQueue(object):
         loop = asyncio.get_event_loop()
         self.status = "pending"
         try:
-            self.result = await loop.run_in_executor(self._executor, self.get)
+            if hasattr(self.queue, "get_async"):
+                self.result = await self.queue.get_async()
+            else:
+                self.result = await loop.run_in_executor(self._executor, self.get)
             self.status = "done"
             return self.result
         except CancelledError:
@@ -207,6 +839,15 @@ class AsyncQueue(object):
         except Exception as e:
             logger.exception("Error in get_async: {}".format(e))
 
+    def fileno(self):
+        """File descriptor that becomes readable when an item is put,
+        for polling many links from one event loop or select call
+
+        Returns:
+            (int): the file descriptor
+        """
+        return self.queue.fileno()
+
     def cancel_join_thread(self):
         """Function wrapper for cancel_join_thread."""
         self._cancelled_join = True
@@ -219,24 +860,25 @@ class AsyncQueue(object):
             self._real_executor.shutdown()
 
 
-def MultiLink(name, start, end):
+def MultiLink(name, start, end, maxsize=0, overflow="block"):
     """Function to generate links for the multi-output queue case.
 
     Args:
         See constructor for AsyncQueue or MultiAsyncQueue
+        maxsize (int): Most messages in each consumer's queue
+        overflow (str): What a put does when a consumer's queue is full
 
     Returns:
         MultiAsyncQueue: Producer end of the queue
         List: AsyncQueues for consumers
     """
-    m = Manager()
-
     q_out = []
     for endpoint in end:
-        q = AsyncQueue(m.Queue(maxsize=0), name, start, endpoint)
+        q = AsyncQueue(_link_queue(maxsize, overflow), name, start, endpoint)
         q_out.append(q)
 
-    q = MultiAsyncQueue(m.Queue(maxsize=0), q_out, name, start, end)
+    # puts go straight to the consumers' queues, so there is no queue in
+    q = MultiAsyncQueue(None, q_out, name, start, end)
 
     return q, q_out
 
@@ -246,7 +888,8 @@ class MultiAsyncQueue(AsyncQueue):
 
     Inherits from AsyncQueue.
     A single producer queue's 'put' is copied to multiple consumer's
-    queues, q_in is the producer queue, q_out are the consumer queues.
+    queues, q_in is the producer queue (None when the producer only
+    puts), q_out are the consumer queues.
 
     TODO:
         Test the async nature of this group of queues
@@ -255,6 +898,7 @@ class MultiAsyncQueue(AsyncQueue):
     def __init__(self, q_in, q_out, name, start, end):
         self.queue = q_in
         self.output = q_out
+        self.consumers = len(q_out)
 
         self.real_executor = None
         self.cancelled_join = False
@@ -270,13 +914,39 @@ class MultiAsyncQueue(AsyncQueue):
 
     def __getattr__(self, name):
         # Remove put and put_nowait and define behavior specifically
-        # TODO: remove get capability?
-        if name in ["qsize", "empty", "full", "get", "get_nowait", "close"]:
-            return getattr(self.queue, name)
-        else:
-            raise AttributeError(
-                "'%s' object has no attribute '%s'" % (self.__class__.__name__, name)
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (self.__class__.__name__, name)
+        )
+
+    def _input(self):
+        """The producer queue, for the gets of a MultiLink that has one
+
+        Raises:
+            TypeError: the MultiLink only puts, its consumers get from q_out
+        """
+        if self.queue is None:
+            raise TypeError(
+                "{} is the producer end of a MultiLink, get from its "
+                "consumer links instead".format(self)
             )
+        return self.queue
+
+    def get(self, *args, **kwargs):
+        return self._input().get(*args, **kwargs)
+
+    def get_nowait(self):
+        return self._input().get_nowait()
+
+    def get_many(self, max_items, timeout=None):
+        self._input()
+        return super().get_many(max_items, timeout=timeout)
+
+    async def get_async(self):
+        self._input()
+        return await super().get_async()
+
+    def fileno(self):
+        return self._input().fileno()
 
     def put(self, item):
         for q in self.output:
@@ -285,3 +955,28 @@ class MultiAsyncQueue(AsyncQueue):
     def put_nowait(self, item):
         for q in self.output:
             q.put_nowait(item)
+
+    def put_many(self, items):
+        items = list(items)
+        for q in self.output:
+            q.put_many(items)
+
+    def qsize(self):
+        return max(q.qsize() for q in self.output)
+
+    def empty(self):
+        return all(q.empty() for q in self.output)
+
+    def full(self):
+        return any(q.full() for q in self.output)
+
+    def dropped(self):
+        return sum(q.dropped() for q in self.output)
+
+    def close(self):
+        for q in self.output:
+            q.close()
+
+    async def put_async(self, item):
+        for q in self.output:
+            await q.put_async(item)
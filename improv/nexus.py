@@ -14,7 +14,12 @@ from importlib import import_module
 import zmq.asyncio as zmq
 from zmq import PUB, REP, SocketOption
 
-from improv.store import StoreInterface
+from improv.store import (
+    SharedMemoryStoreInterface,
+    STORE_BACKENDS,
+    DEFAULT_STORE_BACKEND,
+    shared_memory_dir,
+)
 from improv.actor import Signal
 from improv.config import Config
 from improv.link import Link, MultiLink
@@ -42,6 +47,7 @@ class Nexus:
         store_size=10_000_000,
         control_port=0,
         output_port=0,
+        store_backend=None,
     ):
         """Function to initialize class variables based on config file.
 
@@ -56,6 +62,8 @@ class Nexus:
             store_size (int): initial store size
             control_port (int): port number for input socket
             output_port (int): port number for output socket
+            store_backend (str): "plasma" or "shared_memory", overrides the
+                store_backend setting; by default plasma if pyarrow provides it
 
         Returns:
             string: "Shutting down", to notify start() that pollQueues has completed.
@@ -86,6 +94,12 @@ class Nexus:
             cfg["control_port"] = control_port
         if "output_port" not in cfg or output_port != 0:
             cfg["output_port"] = output_port
+        if "store_backend" not in cfg or store_backend is not None:
+            cfg["store_backend"] = store_backend or DEFAULT_STORE_BACKEND
+        if cfg["store_backend"] not in STORE_BACKENDS:
+            logger.error("Unknown store_backend {}".format(cfg["store_backend"]))
+            raise ValueError(cfg["store_backend"])
+        self.store_class = STORE_BACKENDS[cfg["store_backend"]]
 
         # set up socket in lieu of printing to stdout
         self.zmq_context = zmq.Context()
@@ -100,18 +114,25 @@ class Nexus:
         cfg["control_port"] = int(in_port_string.split(":")[-1])
 
         # default size should be system-dependent
-        self._startStoreInterface(store_size)
+        self._startStoreInterface(
+            store_size,
+            backend=cfg["store_backend"],
+            retention=cfg.get("store_retention"),
+            spill=cfg.get("store_spill"),
+        )
         self.out_socket.send_string("StoreInterface started")
 
         # connect to store and subscribe to notifications
         logger.info("Create new store object")
-        self.store = StoreInterface(store_loc=self.store_loc)
+        self.store = self.store_class(store_loc=self.store_loc)
         self.store.subscribe()
 
         # LMDB storage
         self.use_hdd = cfg["use_hdd"]
         if self.use_hdd:
             self.lmdb_name = f'lmdb_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+            self.lmdb_segment = cfg.get("lmdb_segment")
+            self.lmdb_codecs = cfg.get("lmdb_codecs")
             self.store_dict = dict()
 
         # TODO: Better logic/flow for using watcher as an option
@@ -292,7 +313,10 @@ class Nexus:
 
         if hasattr(self, "store_loc"):
             try:
-                os.remove(self.store_loc)
+                if getattr(self, "store_backend", "plasma") == "shared_memory":
+                    SharedMemoryStoreInterface.destroy_store(self.store_loc)
+                else:
+                    os.remove(self.store_loc)
             except FileNotFoundError:
                 logger.warning(
                     "StoreInterface file {} is already deleted".format(self.store_loc)
@@ -575,23 +599,34 @@ class Nexus:
         """Creates StoreInterface w/ or w/out LMDB
         functionality based on {self.use_hdd}."""
         if not self.use_hdd:
-            return StoreInterface(name, self.store_loc)
+            return self.store_class(name, self.store_loc)
         else:
             if name not in self.store_dict:
-                self.store_dict[name] = StoreInterface(
-                    name, self.store_loc, use_hdd=True, lmdb_name=self.lmdb_name
+                self.store_dict[name] = self.store_class(
+                    name,
+                    self.store_loc,
+                    use_hdd=True,
+                    lmdb_name=self.lmdb_name,
+                    lmdb_segment=self.lmdb_segment,
+                    lmdb_codecs=self.lmdb_codecs,
                 )
             return self.store_dict[name]
 
-    def _startStoreInterface(self, size):
-        """Start a subprocess that runs the plasma store
+    def _startStoreInterface(
+        self, size, backend=DEFAULT_STORE_BACKEND, retention=None, spill=None
+    ):
+        """Start a subprocess that runs the plasma store,
+        or create a shared memory store (which needs no subprocess)
         Raises a RuntimeError exception size is undefined
         Raises an Exception if the plasma store doesn't start
 
-        #TODO: Generalize this to non-plasma stores
-
         Args:
             size: in bytes
+            backend (str): "plasma" or "shared_memory"
+            retention (dict): number of objects to keep per name prefix,
+                only supported by the shared memory store
+            spill (dict): where and when to spill objects to LMDB,
+                only supported by the shared memory store
 
         Raises:
             RuntimeError: if the size is undefined
@@ -600,6 +635,21 @@ class Nexus:
         """
         if size is None:
             raise RuntimeError("Server size needs to be specified")
+        self.store_backend = backend
+        if backend == "shared_memory":
+            self.p_StoreInterface = None
+            self.store_loc = os.path.join(
+                shared_memory_dir(), "improv_{}".format(uuid.uuid4())
+            )
+            SharedMemoryStoreInterface.create_store(
+                self.store_loc, size, retention=retention, spill=spill
+            )
+            logger.info("StoreInterface start successful: {}".format(self.store_loc))
+            return
+        if retention:
+            logger.warning("store_retention is ignored by the plasma store")
+        if spill:
+            logger.warning("store_spill is ignored by the plasma store")
         try:
             self.store_loc = str(os.path.join("/tmp/", str(uuid.uuid4())))
             self.p_StoreInterface = subprocess.Popen(
@@ -623,6 +673,9 @@ class Nexus:
         """Internal method to kill the subprocess
         running the store (plasma sever)
         """
+        if getattr(self, "store_backend", "plasma") == "shared_memory":
+            logger.info("StoreInterface close successful: {}".format(self.store_loc))
+            return
         try:
             self.p_StoreInterface.kill()
             self.p_StoreInterface.wait()
@@ -642,6 +695,7 @@ class Nexus:
         mod = import_module(actor.packagename)
         clss = getattr(mod, actor.classname)
         instance = clss(actor.name, self.store_loc, **actor.options)
+        instance.store_class = self.store_class
 
         if "method" in actor.options.keys():
             # check for spawn
@@ -681,16 +735,17 @@ class Nexus:
         """
         for source, drain in self.config.connections.items():
             name = source.split(".")[0]
+            options = self.config.link_options.get(source, {})
             # current assumption is connection goes from q_out to something(s) else
             if len(drain) > 1:  # we need multiasyncqueue
-                link, endLinks = MultiLink(name + "_multi", source, drain)
+                link, endLinks = MultiLink(name + "_multi", source, drain, **options)
                 self.data_queues.update({source: link})
                 for i, e in enumerate(endLinks):
                     self.data_queues.update({drain[i]: e})
             else:  # single input, single output
                 d = drain[0]
                 d_name = d.split(".")  # TODO: check if .anything, if not assume q_in
-                link = Link(name + "_" + d_name[0], source, d)
+                link = Link(name + "_" + d_name[0], source, d, **options)
                 self.data_queues.update({source: link})
                 self.data_queues.update({d: link})
 
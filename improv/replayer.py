@@ -1,10 +1,39 @@
 import time
-from typing import Callable, List
-
-from pyarrow.plasma import ObjectID
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Callable
 
 from nexus.actor import Actor, RunManager
-from nexus.store import LMDBStoreInterface, LMDBData
+from nexus.store import LMDBStoreInterface, OBJECT_ID_TYPES
+
+
+class LMDBValues(Sequence):
+    """Saved objects in the order they were saved, each read from LMDB
+    and decoded only when it is accessed"""
+
+    def __init__(self, lmdb, keys, times):
+        """
+        Args:
+            lmdb: LMDBStoreInterface the objects are saved in
+            keys: keys of the objects, in order of time
+            times: times the objects were saved
+        """
+        self.lmdb = lmdb
+        self.keys = keys
+        self.times = times
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return LMDBValues(self.lmdb, self.keys[i], self.times[i])
+        return self.lmdb.get(self.keys[i], include_metadata=True)
+
+    def split(self, t):
+        """The objects saved before time t, and those saved from t on"""
+        i = bisect_left(self.times, t)
+        return self[:i], self[i:]
 
 
 class Replayer(Actor):
@@ -23,7 +52,7 @@ class Replayer(Actor):
         self.resave = resave
 
         self.lmdb = LMDBStoreInterface(path=lmdb_path, load=True)
-        self.lmdb_values: list = self.get_lmdb_values(replay)
+        self.lmdb_values: LMDBValues = self.get_lmdb_values(replay)
         assert len(self.lmdb_values) > 0
 
         self.gui_messages: dict = self.get_lmdb_values(
@@ -33,31 +62,25 @@ class Replayer(Actor):
         self.t_saved_start_run = self.gui_messages["run"]  # TODO Add load GUI actions
         self.t_start_run = None
 
-    def get_lmdb_values(self, replay: str, func: Callable = None) -> List[LMDBData]:
+    def get_lmdb_values(self, replay: str, func: Callable = None) -> LMDBValues:
         """
-        Load saved queue objects from LMDB
+        Find saved queue objects in LMDB, in the order they were saved
 
         Args:
             replay: named of Actor
             func: (optional) Function to apply to objects before returning
 
         Returns:
-            lmdb_values
+            lmdb_values: LMDBData of each object, read as it is accessed
 
         """
-        # Get all out queue names
-        replay = f"q__{replay}"
-        keys = [
-            key.decode()
-            for key in self.lmdb.get_keys()
-            if key.startswith(replay.encode())
-        ]
-
-        # Get relevant keys, convert to str, and sort. Then convert back to bytes.
-        keys = [key.encode() for key in keys]
-        lmdb_values = sorted(
-            self.lmdb.get(keys, include_metadata=True),
-            key=lambda lmdb_value: lmdb_value.time,
+        # Get all out queue names, from the name index, and order them
+        # by the times in their record headers, without decoding payloads
+        keys = self.lmdb.keys_by_name(f"q__{replay}")
+        times = [info.time for info in self.lmdb.get_metadata(keys)]
+        order = sorted(range(len(keys)), key=times.__getitem__)
+        lmdb_values = LMDBValues(
+            self.lmdb, [keys[i] for i in order], [times[i] for i in order]
         )
 
         if func is not None:
@@ -68,7 +91,6 @@ class Replayer(Actor):
         if self.client.use_hdd and not self.resave:
             self.client.use_hdd = False
 
-        self.move_to_plasma(self.lmdb_values)
         self.put_setup(self.lmdb_values)
 
     def move_to_plasma(self, lmdb_values):
@@ -87,14 +109,14 @@ class Replayer(Actor):
                 ):  # Raw frames
                     data = lmdbdata.obj[0]
                     for i, obj_id in data.items():
-                        if isinstance(obj_id, ObjectID):
+                        if isinstance(obj_id, OBJECT_ID_TYPES):
                             actual_obj = self.lmdb.get(obj_id, include_metadata=True)
                             lmdbdata.obj = [
                                 {i: self.client.put(actual_obj.obj, actual_obj.name)}
                             ]
 
                 for i, obj in enumerate(lmdbdata.obj):  # List
-                    if isinstance(obj, ObjectID):
+                    if isinstance(obj, OBJECT_ID_TYPES):
                         actual_obj = self.lmdb.get(obj, include_metadata=True)
                         lmdbdata.obj[i] = self.client.put(
                             actual_obj.obj, actual_obj.name
@@ -112,9 +134,10 @@ class Replayer(Actor):
         Args:
             lmdb_values:
         """
-        for lmdb_value in lmdb_values:
-            if lmdb_value.time < self.t_saved_start_run:
-                getattr(self, lmdb_value.queue).put(lmdb_value.obj)
+        before_run, _ = lmdb_values.split(self.t_saved_start_run)
+        for lmdb_value in before_run:
+            self.move_to_plasma([lmdb_value])
+            getattr(self, lmdb_value.queue).put(lmdb_value.obj)
 
     def run(self):
         self.t_start_run = time.time()
@@ -128,14 +151,15 @@ class Replayer(Actor):
         Get list of objects and output them
         to their respective queues based on time delay.
         """
-        for lmdb_value in self.lmdb_values:
-            if lmdb_value.time >= self.t_saved_start_run:
-                t_sleep = (
-                    lmdb_value.time + self.t_start_run - self.t_saved_start_run
-                ) - time.time()
-                if t_sleep > 0:
-                    time.sleep(t_sleep)
-                getattr(self, lmdb_value.queue).put(lmdb_value.obj)
+        _, after_run = self.lmdb_values.split(self.t_saved_start_run)
+        for lmdb_value in after_run:
+            self.move_to_plasma([lmdb_value])
+            t_sleep = (
+                lmdb_value.time + self.t_start_run - self.t_saved_start_run
+            ) - time.time()
+            if t_sleep > 0:
+                time.sleep(t_sleep)
+            getattr(self, lmdb_value.queue).put(lmdb_value.obj)
 
     #     policy = asyncio.get_event_loop_policy()
     #     policy.set_event_loop(policy.new_event_loop())
@@ -1,36 +1,92 @@
+import os
+import re
 import lmdb
+import mmap
+import lzma
+import json
 import time
+import uuid
+import fcntl
+import zlib
 import pickle
+import select
+import shutil
 import signal
+import socket
+import struct
+import asyncio
+import hashlib
 import logging
+import tempfile
 import traceback
 
 import numpy as np
-import pyarrow.plasma as plasma
 
-from queue import Queue
+from queue import Queue, Full
 from pathlib import Path
 from random import random
-from threading import Thread
+from threading import Event, Lock, Thread, local, current_thread, main_thread
 from typing import List, Union
+from contextlib import contextmanager
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, make_dataclass
-from scipy.sparse import csc_matrix
-from pyarrow.lib import ArrowIOError
-from pyarrow._plasma import PlasmaObjectExists, ObjectNotAvailable, ObjectID
+from scipy.sparse import csc_matrix, csr_matrix, coo_matrix, issparse
+
+try:
+    import pyarrow.plasma as plasma
+    from pyarrow.lib import ArrowIOError
+    from pyarrow._plasma import PlasmaObjectExists, ObjectNotAvailable, ObjectID
+except ImportError:
+    # plasma was removed from pyarrow after 9.0.0;
+    # only the shared memory store is available without it
+    plasma = None
+    ArrowIOError = PlasmaObjectExists = ObjectNotAvailable = ObjectID = None
+
+# Faster compression codecs for LMDB, if installed
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Returned by lookups for objects not (yet) in the store
+_MISSING = object()
+
+
+def _segment_settings(lmdb_segment):
+    """LMDBStoreInterface arguments for an lmdb_segment setting"""
+    if not lmdb_segment:
+        return {}
+    settings = {}
+    if lmdb_segment.get("minutes") is not None:
+        settings["segment_seconds"] = 60 * lmdb_segment["minutes"]
+    if lmdb_segment.get("gb") is not None:
+        settings["segment_bytes"] = int(lmdb_segment["gb"] * 2**30)
+    return settings
+
 
 class StoreInterface:
     """General interface for a store"""
 
+    # Cache of deserialized objects, off until enable_cache is called
+    _cache = None
+
     def get(self):
         raise NotImplementedError
 
     def put(self):
         raise NotImplementedError
 
+    def putMany(self):
+        raise NotImplementedError
+
     def delete(self):
         raise NotImplementedError
 
@@ -40,28 +96,6 @@ class StoreInterface:
     def subscribe(self):
         raise NotImplementedError
 
-
-class PlasmaStoreInterface(StoreInterface):
-    """Basic interface for our specific data store implemented with apache arrow plasma
-    Objects are stored with object_ids
-    References to objects are contained in a dict where key is shortname,
-    value is object_id
-    """
-
-    def __init__(self, name="default", store_loc="/tmp/store"):
-        """
-        Constructor for the StoreInterface
-
-        :param name:
-        :param store_loc: Apache Arrow Plasma client location
-        """
-
-        self.name = name
-        self.store_loc = store_loc
-        self.client = self.connect_store(store_loc)
-        self.stored = {}
-        self.use_hdd = False
-
     def _setup_LMDB(
         self,
         use_lmdb=False,
@@ -70,6 +104,8 @@ class PlasmaStoreInterface(StoreInterface):
         hdd_maxstore=1e12,
         flush_immediately=False,
         commit_freq=1,
+        lmdb_segment=None,
+        lmdb_codecs=None,
     ):
         """
         Constructor for the Store
@@ -91,6 +127,10 @@ class PlasmaStoreInterface(StoreInterface):
             flush_immediately (bool): Save objects to disk immediately
             commit_freq (int): If not flush_immediately,
                 flush data to disk every {commit_freq} seconds.
+            lmdb_segment (dict): roll over to a new LMDB segment every
+                "minutes" minutes or "gb" GB, whichever comes first
+            lmdb_codecs (dict): compression codec for objects whose names
+                start with each prefix, see LMDBStoreInterface.set_codec
         """
         self.use_hdd = use_lmdb
         self.flush_immediately = flush_immediately
@@ -102,8 +142,134 @@ class PlasmaStoreInterface(StoreInterface):
                 max_size=hdd_maxstore,
                 flush_immediately=flush_immediately,
                 commit_freq=commit_freq,
+                codecs=lmdb_codecs,
+                **_segment_settings(lmdb_segment),
+            )
+
+    def enable_cache(self, max_objects=128):
+        """Cache up to max_objects deserialized objects read from the store,
+        evicting the least recently read. Objects cannot change once sealed,
+        so cached objects are always up to date.
+
+        Args:
+            max_objects (int): size of the cache
+        """
+        self._cache = OrderedDict()
+        self._cache_max = max_objects
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def disable_cache(self):
+        """Stop caching and drop the cached objects"""
+        self._cache = None
+
+    def cache_info(self):
+        """
+        Returns:
+            dict: "hits", "misses", number of cached objects ("size")
+            and "max_objects"; None if caching is off
+        """
+        if self._cache is None:
+            return None
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._cache),
+            "max_objects": self._cache_max,
+        }
+
+    def _cache_get(self, obj_id):
+        """Get obj_id from the cache, _MISSING if it is not there"""
+        if self._cache is None:
+            return _MISSING
+        obj = self._cache.get(obj_id, _MISSING)
+        if obj is _MISSING:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+            self._cache.move_to_end(obj_id)
+        return obj
+
+    def _cache_put(self, obj_id, obj):
+        if self._cache is None:
+            return
+        self._cache[obj_id] = obj
+        if len(self._cache) > self._cache_max:
+            self._cache.popitem(last=False)
+
+    def _cache_drop(self, obj_id):
+        if self._cache is not None:
+            self._cache.pop(obj_id, None)
+
+    def updateStoreInterfaced(self, object_name, object_id):
+        """Update local dict with info we need locally
+        Report to Nexus that we updated the store
+        (did a put or delete/replace)
+
+        Args:
+            object_name (str): the name of the object to update
+            object_id (): the id of the object to update
+        """
+        self.stored.update({object_name: object_id})
+
+    def getStored(self):
+        """
+        Returns:
+            its info about what it has stored
+        """
+        return self.stored
+
+
+# Version number at the end of the ids of objects published with replace
+_PLASMA_VERSION = struct.Struct(">Q")
+
+
+class PlasmaStoreInterface(StoreInterface):
+    """Basic interface for our specific data store implemented with apache arrow plasma
+    Objects are stored with object_ids
+    References to objects are contained in a dict where key is shortname,
+    value is object_id
+    """
+
+    def __init__(
+        self,
+        name="default",
+        store_loc="/tmp/store",
+        use_hdd=False,
+        lmdb_name=None,
+        lmdb_segment=None,
+        lmdb_codecs=None,
+    ):
+        """
+        Constructor for the StoreInterface
+
+        :param name:
+        :param store_loc: Apache Arrow Plasma client location
+        :param use_hdd: also write objects to the LMDB database lmdb_name
+        :param lmdb_name:
+        :param lmdb_segment: when to roll over to a new LMDB segment,
+            {"minutes": ..., "gb": ...}
+        :param lmdb_codecs: LMDB compression codec for each name prefix,
+            {prefix: codec}
+        """
+        if plasma is None:
+            raise ImportError(
+                "The plasma store needs pyarrow 9.0.0 or earlier: "
+                "pip install improv[plasma], or use the shared_memory store"
             )
 
+        self.name = name
+        self.store_loc = store_loc
+        self.client = self.connect_store(store_loc)
+        self._async_client = None
+        self.stored = {}
+        self._setup_LMDB(
+            use_lmdb=use_hdd,
+            lmdb_name=lmdb_name,
+            lmdb_segment=lmdb_segment,
+            lmdb_codecs=lmdb_codecs,
+        )
+
     def connect_store(self, store_loc):
         """Connect to the store at store_loc, max 20 retries to connect
         Raises exception if can't connect
@@ -121,7 +287,7 @@ class PlasmaStoreInterface(StoreInterface):
             raise CannotConnectToStoreInterfaceError(store_loc)
         return self.client
 
-    def put(self, object, object_name):
+    def put(self, object, object_name, consumers=None, object_id=None):
         """
         Put a single object referenced by its string name
         into the store
@@ -131,7 +297,11 @@ class PlasmaStoreInterface(StoreInterface):
         Args:
             object:
             object_name (str):
-            flush_this_immediately (bool):
+            consumers (int): accepted for compatibility with the shared
+                memory store, ignored: plasma evicts objects itself
+                once no client uses them, see releaseID
+            object_id (class 'plasma.ObjectID'): id to store the object
+                under, a random one if None
 
         Returns:
             class 'plasma.ObjectID': Plasma object ID
@@ -140,14 +310,9 @@ class PlasmaStoreInterface(StoreInterface):
             PlasmaObjectExists: if we are overwriting \
             unknown error
         """
-        object_id = None
+        requested_id, object_id = object_id, None
         try:
-            # Need to pickle if object is csc_matrix
-            if isinstance(object, csc_matrix):
-                prot = pickle.HIGHEST_PROTOCOL
-                object_id = self.client.put(pickle.dumps(object, protocol=prot))
-            else:
-                object_id = self.client.put(object)
+            object_id = self.client.put(self._to_plasma(object), requested_id)
 
             if self.use_hdd:
                 self.lmdb_store.put(object, object_name, obj_id=object_id)
@@ -163,6 +328,134 @@ class PlasmaStoreInterface(StoreInterface):
 
         return object_id
 
+    def replace(self, object, object_name):
+        """
+        Publish object as the next version of object_name and delete the
+        previous version. Plasma objects cannot be rewritten, so each
+        version is a new object, under an id made from the name and the
+        version number; a client reading the previous version keeps it
+        until it releases it.
+
+        Args:
+            object:
+            object_name (str):
+
+        Returns:
+            int: the new version number, counting from 1;
+            None if the object was not stored
+        """
+        latest = self._latest_version(object_name)
+        version = latest + 1
+        object_id = self._version_id(object_name, version)
+        if self.put(object, object_name, object_id=object_id) is None:
+            return None
+        if latest:
+            self.delete(self._version_id(object_name, latest))
+        return version
+
+    def get_version(self, object_name, version=None):
+        """
+        Get a version of an object published with replace
+
+        Args:
+            object_name (str):
+            version (int): the version, None for the latest
+
+        Returns:
+            the object
+
+        Raises:
+            ObjectNotFoundError: If the version is not in the store
+        """
+        if version is None:
+            version = self._latest_version(object_name)
+        try:
+            return self.getID(self._version_id(object_name, version))
+        except ObjectNotFoundError:
+            raise ObjectNotFoundError("{}@{}".format(object_name, version))
+
+    @staticmethod
+    def _version_id(object_name, version):
+        """Id of a version: digest of the name, then the version number"""
+        digest = hashlib.sha1(object_name.encode()).digest()
+        return plasma.ObjectID(
+            digest[: 20 - _PLASMA_VERSION.size] + _PLASMA_VERSION.pack(version)
+        )
+
+    def _latest_version(self, object_name):
+        """Latest version of object_name in the store, 0 if none,
+        found among the ids of all the objects in the store"""
+        prefix = self._version_id(object_name, 0).binary()[: -_PLASMA_VERSION.size]
+        versions = [
+            _PLASMA_VERSION.unpack(obj_id.binary()[len(prefix) :])[0]
+            for obj_id in self.client.list()
+            if obj_id.binary().startswith(prefix)
+        ]
+        return max(versions, default=0)
+
+    def putMany(self, objects, names, consumers=None):
+        """
+        Put several objects into the store as one batch:
+        all objects are serialized, then all buffers are created
+        and written, then all of them are sealed
+
+        Args:
+            objects (list): objects to store
+            names (list): names of the objects, same length as objects
+            consumers (int): ignored, see put
+
+        Returns:
+            list: plasma ObjectIDs in the order of objects,
+            all None if the batch could not be stored
+        """
+        if len(objects) != len(names):
+            raise ValueError("putMany needs one name per object")
+
+        object_ids = [None] * len(objects)
+        try:
+            import pyarrow
+
+            serialized = []
+            for object in objects:
+                serialized.append(pyarrow.serialize(self._to_plasma(object)))
+
+            ids = self.random_ObjectID(len(objects))
+            buffers = [
+                self.client.create(obj_id, data.total_bytes)
+                for obj_id, data in zip(ids, serialized)
+            ]
+            for data, buffer in zip(serialized, buffers):
+                data.write_to(pyarrow.FixedSizeBufferWriter(buffer))
+            for obj_id in ids:
+                self.client.seal(obj_id)
+            object_ids = ids
+
+            if self.use_hdd:
+                for object, object_name, obj_id in zip(objects, names, ids):
+                    self.lmdb_store.put(object, object_name, obj_id=obj_id)
+        except PlasmaObjectExists:
+            logger.error("Object already exists. Meant to call replace?")
+        except ArrowIOError:
+            logger.error("Could not store objects {}".format(names))
+            logger.info("Refreshing connection and continuing")
+            self.reset()
+        except Exception:
+            logger.error("Could not store objects {}".format(names))
+            logger.error(traceback.format_exc())
+
+        return object_ids
+
+    def releaseID(self, obj_id):
+        """Release a consumer's lease on an object. Plasma keeps no
+        leases: it counts the clients using each object itself, and
+        evicts unused objects when it needs room, so there is nothing
+        to do.
+
+        Args:
+            obj_id (class 'plasma.ObjectID'): the id of the object
+        """
+        pass
+
     def get(self, object_name):
         """Get a single object from the store by object name
         Checks to see if it knows the object first
@@ -181,13 +474,15 @@ class PlasmaStoreInterface(StoreInterface):
         # else:
         return self.getID(object_name)
 
-    def getID(self, obj_id, hdd_only=False):
+    def getID(self, obj_id, hdd_only=False, timeout=0):
         """
         Get object by object ID
 
         Args:
             obj_id (class 'plasma.ObjectID'): the id of the object
             hdd_only (bool):
+            timeout (float): seconds to wait for the object to be sealed
+                if it is not in the store yet, None to wait forever
 
         Returns:
             Stored object
@@ -195,20 +490,72 @@ class PlasmaStoreInterface(StoreInterface):
         Raises:
             ObjectNotFoundError: If the id is not found
         """
-        # Check in RAM
+        # Check in RAM; the store answers as soon as the object is sealed
         if not hdd_only:
-            res = self.client.get(obj_id, 0)  # Timeout = 0 ms
+            cached = self._cache_get(obj_id)
+            if cached is not _MISSING:
+                return cached
+            res = self.client.get(obj_id, self._timeout_ms(timeout))
             if res is not plasma.ObjectNotAvailable:
-                return res if not isinstance(res, bytes) else pickle.loads(res)
+                res = self._from_plasma(res)
+                self._cache_put(obj_id, res)
+                return res
+
+        return self._getID_hdd(obj_id)
+
+    async def get_async(self, obj_id, timeout=None):
+        """
+        Get object by object ID, waiting for it to be sealed
+        without blocking the event loop
+
+        Args:
+            obj_id (class 'plasma.ObjectID'): the id of the object
+            timeout (float): seconds to wait, None to wait forever
+
+        Returns:
+            Stored object
+
+        Raises:
+            ObjectNotFoundError: If the id is not found in time
+        """
+        cached = self._cache_get(obj_id)
+        if cached is not _MISSING:
+            return cached
+        res = self.client.get(obj_id, 0)
+        if res is plasma.ObjectNotAvailable:
+            # a blocking get would hold the client's lock, so wait on a
+            # connection of our own
+            if self._async_client is None:
+                self._async_client = plasma.connect(self.store_loc, 20)
+            loop = asyncio.get_event_loop()
+            res = await loop.run_in_executor(
+                None, self._async_client.get, obj_id, self._timeout_ms(timeout)
+            )
+        if res is not plasma.ObjectNotAvailable:
+            res = self._from_plasma(res)
+            self._cache_put(obj_id, res)
+            return res
+
+        return self._getID_hdd(obj_id)
+
+    @staticmethod
+    def _timeout_ms(timeout):
+        """Timeout for plasma, which waits forever when given -1"""
+        return -1 if timeout is None else int(timeout * 1000)
+
+    def _getID_hdd(self, obj_id):
+        """Get an object that is not in memory from disk
 
-        # Check in disk
+        Raises:
+            ObjectNotFoundError: If the id is not found
+        """
         if self.use_hdd:
             res = self.lmdb_store.get(obj_id)
             if res is not None:
                 return res
 
         logger.warning("Object {} cannot be found.".format(obj_id))
-        raise ObjectNotFoundError
+        raise ObjectNotFoundError(obj_id)
 
     def getList(self, ids):
         """Get multiple objects from the store
@@ -220,7 +567,40 @@ class PlasmaStoreInterface(StoreInterface):
             list of the objects
         """
         # self._get()
-        return self.client.get(ids)
+        objects = [self._cache_get(obj_id) for obj_id in ids]
+        missing = [obj_id for obj_id, obj in zip(ids, objects) if obj is _MISSING]
+        if missing:
+            fetched = iter(self.client.get(missing))
+            for i, obj in enumerate(objects):
+                if obj is _MISSING:
+                    objects[i] = self._from_plasma(next(fetched))
+                    self._cache_put(ids[i], objects[i])
+        return objects
+
+    def _to_plasma(self, object):
+        """Convert objects plasma cannot serialize well.
+        Sparse matrices become a dict of their component arrays,
+        which plasma stores (and returns) without copying;
+        sparse matrices of other types are pickled.
+        """
+        sparse_format = _SPARSE_FORMATS.get(type(object))
+        if sparse_format == "coo":
+            arrays = [object.data, object.row, object.col]
+        elif sparse_format is not None:
+            arrays = [object.data, object.indices, object.indptr]
+        elif issparse(object):
+            return pickle.dumps(object, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            return object
+        return {_SPARSE_KEY: sparse_format, "shape": object.shape, "arrays": arrays}
+
+    def _from_plasma(self, res):
+        """Undo _to_plasma on an object read from plasma"""
+        if isinstance(res, bytes):
+            return pickle.loads(res)
+        if isinstance(res, dict) and _SPARSE_KEY in res:
+            return _sparse_from_arrays(res[_SPARSE_KEY], res["shape"], res["arrays"])
+        return res
 
     def get_all(self):
         """Get a listing of all objects in the store
@@ -230,6 +610,17 @@ class PlasmaStoreInterface(StoreInterface):
         """
         return self.client.list()
 
+    def delete(self, obj_id):
+        """
+        Delete object from the store. Plasma keeps objects
+        that are still in use by a client until they are released.
+
+        Args:
+            obj_id (class 'plasma.ObjectID'): the object_id to be deleted
+        """
+        self._cache_drop(obj_id)
+        self.client.delete([obj_id])
+
     def reset(self):
         """Reset client connection"""
         self.client = self.connect_store(self.store_loc)
@@ -237,6 +628,8 @@ class PlasmaStoreInterface(StoreInterface):
 
     def release(self):
         self.client.disconnect()
+        if self._async_client is not None:
+            self._async_client.disconnect()
 
     # Subscribe to notifications about sealed objects?
     def subscribe(self):
@@ -270,24 +663,6 @@ class PlasmaStoreInterface(StoreInterface):
             ids.append(plasma.ObjectID(np.random.bytes(20)))
         return ids
 
-    def updateStoreInterfaced(self, object_name, object_id):
-        """Update local dict with info we need locally
-        Report to Nexus that we updated the store
-        (did a put or delete/replace)
-
-        Args:
-            object_name (str): the name of the object to update
-            object_id (): the id of the object to update
-        """
-        self.stored.update({object_name: object_id})
-
-    def getStored(self):
-        """
-        Returns:
-            its info about what it has stored
-        """
-        return self.stored
-
     def _put(self, obj, id):
         """Internal put"""
         return self.client.put(obj, id)
@@ -312,115 +687,2099 @@ class PlasmaStoreInterface(StoreInterface):
             return res
 
 
-class LMDBStoreInterface(StoreInterface):
-    def __init__(
-        self,
-        path="../outputs/",
-        name=None,
-        load=False,
-        max_size=1e12,
-        flush_immediately=False,
-        commit_freq=1,
-    ):
-        """
-        Constructor for LMDB store
+class SharedMemoryObjectID:
+    """Identifier for an object held by a SharedMemoryStoreInterface.
+    Mirrors the parts of plasma.ObjectID that improv relies on:
+    a 20 byte binary() key that is hashable and picklable,
+    so ids can be passed through Links and used as LMDB keys.
+    """
 
-        Args:
-            path (string): Path to folder containing LMDB folder.
-            name (string): Name of LMDB. Required if not {load].
-            max_size (float):
-            Maximum size database may grow to; used to size the memory mapping.
-            If the database grows larger than map_size, a MapFullError will be raised.
-            On 64-bit there is no penalty for making this huge. Must be <2GB on 32-bit.
-            load (bool): For Replayer use. Informs the class that we're loading
-                    from a previous LMDB, not create a new one.
-            flush_immediately (bool): Save objects to disk immediately
-            commit_freq (int): If not flush_immediately,
-                            flush data to disk every {commit_freq} seconds.
-        """
+    __slots__ = ("_binary",)
 
-        # Check if LMDB folder exists.
-        # LMDB path?
-        path = Path(path)
-        if load:
-            if name is not None:
-                path = path / name
-            if not (path / "data.mdb").exists():
-                raise FileNotFoundError("Invalid LMDB directory.")
-        else:
-            assert name is not None
-            if not path.exists():
-                path.mkdir(parents=True)
-            path = path / name
+    def __init__(self, binary):
+        self._binary = bytes(binary)
 
-        self.flush_immediately = flush_immediately
-        self.lmdb_env = lmdb.open(
-            path.as_posix(), map_size=max_size, sync=flush_immediately
-        )
-        self.lmdb_commit_freq = commit_freq
+    @classmethod
+    def from_random(cls):
+        return cls(os.urandom(20))
 
-        self.put_queue = Queue()
-        self.put_queue_container = make_dataclass(
-            "LMDBPutContainer", [("name", str), ("obj", bytes)]
-        )
-        # Initialize only after interpreter has forked at the start of each actor.
-        self.commit_thread: Thread = None
-        signal.signal(signal.SIGINT, self.flush)
+    def binary(self):
+        return self._binary
 
-    def get(
-        self,
-        key: Union[plasma.ObjectID, bytes, List[plasma.ObjectID], List[bytes]],
-        include_metadata=False,
-    ):
-        """
-        Get object using key (could be any byte string or plasma.ObjectID)
+    def __eq__(self, other):
+        return isinstance(other, SharedMemoryObjectID) and self._binary == other._binary
 
-        Args:
-            key:
-            include_metadata (bool): returns whole LMDBData if true else LMDBData.obj
-                                (just the stored object).
-        Returns:
-            object or LMDBData
-        """
-        while True:
-            try:
-                if isinstance(key, str) or isinstance(key, ObjectID):
-                    return self._get_one(
-                        LMDBStoreInterface._convert_obj_id_to_bytes(key),
-                        include_metadata,
-                    )
-                return self._get_batch(
-                    list(map(LMDBStoreInterface._convert_obj_id_to_bytes, key)),
-                    include_metadata,
-                )
-            except (
-                lmdb.BadRslotError
-            ):  # Happens when multiple transactions access LMDB at the same time.
-                pass
+    def __hash__(self):
+        return hash(self._binary)
+
+    def __reduce__(self):
+        return (SharedMemoryObjectID, (self._binary,))
+
+    def __repr__(self):
+        return "SharedMemoryObjectID({})".format(self._binary.hex())
+
+
+# Index entry for a stored object: offset in the arena, payload size,
+# creation time, consumers left (-1 if not leased), kind, length of the name.
+# The name and a kind-specific header follow the fixed part.
+_ENTRY = struct.Struct("<QQdiBH")
+_OFFSET = struct.Struct(">Q")  # big-endian so LMDB keeps offsets sorted
+_SIZE = struct.Struct("<Q")
+# Retention policy for a name prefix: objects to keep, sequence numbers
+# of the oldest and next object in its window, objects and bytes evicted.
+# The window maps prefix, NUL, big-endian sequence number to object ids.
+_RETENTION = struct.Struct("<QQQQQ")
+# Versions of a replaced object: the latest one and the oldest one
+# that may still be in the store. Each version maps name, NUL,
+# big-endian version number to the id of that version.
+_VERSIONS = struct.Struct("<QQ")
+
+_KIND_PICKLE = 0
+_KIND_ARRAY = 1
+_KIND_SPARSE = 2
+_KIND_RING = 3
+_KIND_SPILLED = 4
+_KIND_TREE = 5
+_KIND_TRACES = 6
+
+# Spill settings: high and low water marks, followed by the LMDB path
+_SPILL = struct.Struct("<dd")
+# Kinds that can be spilled; rings and traces are written in place
+_SPILLABLE = (_KIND_PICKLE, _KIND_ARRAY, _KIND_SPARSE, _KIND_TREE)
+
+# Sparse matrices stored as their component arrays rather than pickled
+_SPARSE_TYPES = {"csc": csc_matrix, "csr": csr_matrix, "coo": coo_matrix}
+_SPARSE_FORMATS = {cls: fmt for fmt, cls in _SPARSE_TYPES.items()}
+_SPARSE_KEY = "__improv_sparse__"
+
+
+def _sparse_from_arrays(sparse_format, shape, arrays):
+    """Rebuild a sparse matrix around its component arrays, without copying them"""
+    if sparse_format == "coo":
+        data, row, col = arrays
+        return coo_matrix((data, (row, col)), shape=shape, copy=False)
+    return _SPARSE_TYPES[sparse_format](tuple(arrays), shape=shape, copy=False)
+
+
+# Trees of dicts, lists and tuples are described by a schema of tagged
+# values; arrays (and numpy scalars, as 0-d arrays) are referred to
+# by their index in the block
+_COUNT = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_CONTAINER_TAGS = {dict: b"d", list: b"l", tuple: b"t"}
+
+
+def _encode_tree(obj, schema, arrays):
+    """Append the schema of obj to schema and its arrays to arrays
+
+    Returns:
+        bool: whether obj could be described, False if it holds other types
+    """
+    kind = type(obj)
+    if kind in _CONTAINER_TAGS:
+        schema.append(_CONTAINER_TAGS[kind] + _COUNT.pack(len(obj)))
+        items = obj.items() if kind is dict else [(item,) for item in obj]
+        return all(_encode_tree(x, schema, arrays) for item in items for x in item)
+    if _is_plain_array(obj) or isinstance(obj, np.generic):
+        arr = obj if kind is np.ndarray else np.asarray(obj)
+        if not _is_plain_array(arr):
+            return False
+        schema.append((b"a" if kind is np.ndarray else b"g") + _COUNT.pack(len(arrays)))
+        arrays.append(arr)
+    elif obj is None:
+        schema.append(b"n")
+    elif kind is bool:
+        schema.append(b"b" if obj else b"B")
+    elif kind is int:
+        if not -(2**63) <= obj < 2**63:
+            return False
+        schema.append(b"i" + _INT.pack(obj))
+    elif kind is float:
+        schema.append(b"f" + _FLOAT.pack(obj))
+    elif kind is str or kind is bytes:
+        try:
+            raw = obj.encode() if kind is str else obj
+        except UnicodeEncodeError:
+            return False  # lone surrogates; pickle keeps them
+        schema.append((b"s" if kind is str else b"y") + _COUNT.pack(len(raw)) + raw)
+    else:
+        return False
+    return True
+
+
+def _decode_tree(schema, pos, arrays):
+    """Rebuild the value described at pos in schema
+
+    Returns:
+        tuple: the value, position after its description
+    """
+    tag = schema[pos : pos + 1]
+    pos += 1
+    if tag in (b"d", b"l", b"t"):
+        (count,) = _COUNT.unpack_from(schema, pos)
+        pos += 4
+        if tag == b"d":
+            value = {}
+            for _ in range(count):
+                key, pos = _decode_tree(schema, pos, arrays)
+                value[key], pos = _decode_tree(schema, pos, arrays)
+            return value, pos
+        items = []
+        for _ in range(count):
+            item, pos = _decode_tree(schema, pos, arrays)
+            items.append(item)
+        return (items if tag == b"l" else tuple(items)), pos
+    if tag == b"a" or tag == b"g":
+        arr = arrays[_COUNT.unpack_from(schema, pos)[0]]
+        return (arr if tag == b"a" else arr[()]), pos + 4
+    if tag == b"n":
+        return None, pos
+    if tag == b"b" or tag == b"B":
+        return tag == b"b", pos
+    if tag == b"i":
+        return _INT.unpack_from(schema, pos)[0], pos + 8
+    if tag == b"f":
+        return _FLOAT.unpack_from(schema, pos)[0], pos + 8
+    (length,) = _COUNT.unpack_from(schema, pos)
+    raw = bytes(schema[pos + 4 : pos + 4 + length])
+    return (raw.decode() if tag == b"s" else raw), pos + 4 + length
+
+
+class FrameRing:
+    """Frames of one shape and dtype, preallocated in a shared memory store
+    and written in turn by a single producer (see create_ring).
+    Each frame gets the next sequence number and is overwritten depth
+    frames later; get returns a view of a frame that is only valid
+    until then, so consumers that lag behind should copy it.
+    """
+
+    def __init__(self, store_loc, name, head, seqs, frames):
+        """
+        Constructor for a FrameRing, from its arrays in the arena
+
+        :param store_loc: location of the store holding the ring
+        :param name: name the ring was created with
+        :param head: one-element array, sequence number of the next frame
+        :param seqs: sequence number of the frame in each slot, -1 if none
+        :param frames: the slots
+        """
+        self.store_loc = store_loc
+        self.name = name
+        self.depth = len(seqs)
+        self.shape = frames.shape[1:]
+        self.dtype = frames.dtype
+        self._head = head
+        self._seqs = seqs
+        self._frames = frames
+
+    def claim(self):
+        """Get the next slot to write a frame into, in place
+
+        Returns:
+            tuple: sequence number of the frame, writable view of its slot;
+            the frame is not visible to consumers until commit is called
+        """
+        seq = int(self._head[0])
+        slot = seq % self.depth
+        self._seqs[slot] = -1
+        return seq, self._frames[slot]
+
+    def commit(self, seq):
+        """Publish the frame written in the slot claimed for seq"""
+        self._seqs[seq % self.depth] = seq
+        self._head[0] = seq + 1
+
+    def put(self, frame):
+        """Copy frame into the next slot
+
+        Returns:
+            int: sequence number of the frame
+        """
+        seq, slot = self.claim()
+        slot[...] = frame
+        self.commit(seq)
+        return seq
+
+    def get(self, seq):
+        """Get a frame by sequence number
+
+        Returns:
+            read-only view of the frame
+
+        Raises:
+            ObjectNotFoundError: if the frame has not been written yet,
+                or has been overwritten
+        """
+        if not self.is_valid(seq):
+            raise ObjectNotFoundError("{}[{}]".format(self.name, seq))
+        frame = self._frames[seq % self.depth].view()
+        frame.flags.writeable = False
+        return frame
+
+    def is_valid(self, seq):
+        """Whether frame seq is in the ring. Checking after reading a view
+        tells whether the producer overwrote the frame meanwhile.
+        """
+        return seq >= 0 and int(self._seqs[seq % self.depth]) == seq
+
+    def latest(self):
+        """
+        Returns:
+            int: sequence number of the last frame written, -1 if none
+        """
+        return int(self._head[0]) - 1
+
+    def __reduce__(self):
+        # the arrays live in the arena: reattach rather than copy them
+        return (_open_ring, (self.store_loc, self.name))
+
+    def __repr__(self):
+        return "FrameRing({}, {}x{} {})".format(
+            self.name, self.depth, self.shape, self.dtype
+        )
+
+
+def _open_ring(store_loc, name):
+    return SharedMemoryStoreInterface("ring", store_loc).get_ring(name)
+
+
+class TraceMatrix:
+    """Append-only rows by frames matrix, preallocated in a shared memory
+    store (see create_traces) and appended to by a single producer.
+    Each frame adds a column; rows are added by appending longer columns,
+    earlier frames of new rows being zero. Consumers read windows of frames
+    as views, so a frame is copied into the store once.
+    """
+
+    def __init__(self, store_loc, name, shape, data):
+        """
+        Constructor for a TraceMatrix, from its arrays in the arena
+
+        :param store_loc: location of the store holding the matrix
+        :param name: name the matrix was created with
+        :param shape: two-element array, current (rows, frames)
+        :param data: (max_frames, max_rows) array, one frame per row
+        """
+        self.store_loc = store_loc
+        self.name = name
+        self.max_frames, self.max_rows = data.shape
+        self.dtype = data.dtype
+        self._shape = shape
+        self._data = data
+
+    @property
+    def shape(self):
+        """(rows, frames) appended so far"""
+        return int(self._shape[0]), int(self._shape[1])
+
+    def append(self, column):
+        """Append one frame
+
+        Args:
+            column: values of the frame, one per row; more values than
+                there are rows adds rows
+
+        Returns:
+            int: index of the frame
+
+        Raises:
+            ValueError: if the matrix is full or column has too many rows
+        """
+        return self.extend(np.asarray(column).reshape(-1, 1))
+
+    def extend(self, columns):
+        """Append frames
+
+        Args:
+            columns: (rows, frames) array of the frames to append
+
+        Returns:
+            int: index of the last frame appended
+
+        Raises:
+            ValueError: if the frames do not fit
+        """
+        columns = np.asarray(columns)
+        rows, frames = self.shape
+        if columns.shape[0] > self.max_rows:
+            raise ValueError("{} rows do not fit in {}".format(columns.shape[0], self))
+        if frames + columns.shape[1] > self.max_frames:
+            raise ValueError("{} is full".format(self))
+        self._data[frames : frames + columns.shape[1], : columns.shape[0]] = columns.T
+        # publish the frames only once they are written
+        self._shape[0] = max(rows, columns.shape[0])
+        self._shape[1] = frames + columns.shape[1]
+        return frames + columns.shape[1] - 1
+
+    def window(self, start=0, stop=None):
+        """Get frames start to stop (excluded), indexed as a Python slice
+
+        Returns:
+            read-only (rows, frames) view
+        """
+        rows, frames = self.shape
+        start, stop, _ = slice(start, stop).indices(frames)
+        view = self._data[start:stop, :rows].T
+        view.flags.writeable = False
+        return view
+
+    def __reduce__(self):
+        # the arrays live in the arena: reattach rather than copy them
+        return (_open_traces, (self.store_loc, self.name))
+
+    def __repr__(self):
+        return "TraceMatrix({}, {}x{} {})".format(
+            self.name, self.max_rows, self.max_frames, self.dtype
+        )
+
+
+def _open_traces(store_loc, name):
+    return SharedMemoryStoreInterface("traces", store_loc).get_traces(name)
+
+
+# Object moved from the arena to the spill database at path, under key;
+# entry is its index entry
+_Spilled = namedtuple("_Spilled", ["path", "key", "entry"])
+
+# Spill databases, opened once per process and path
+_spill_stores = {}
+
+
+def _open_spill_store(path):
+    key = (os.getpid(), path)
+    store = _spill_stores.get(key)
+    if store is None:
+        directory, name = os.path.split(path)
+        store = _spill_stores[key] = LMDBStoreInterface(
+            path=directory, name=name, handle_sigint=False
+        )
+    return store
+
+
+_StoreHandles = namedtuple(
+    "_StoreHandles",
+    [
+        "arena",
+        "view",
+        "env",
+        "objects",
+        "free",
+        "meta",
+        "retention",
+        "window",
+        "heads",
+        "versions",
+    ],
+)
+
+# Arena and index handles, opened once per process and store location
+_shared_memory_handles = {}
+
+
+def _attach_shared_memory(store_loc):
+    """Map the arena and open the index of a shared memory store.
+    LMDB environments must not be opened twice in one process nor used
+    across a fork, so handles are cached per (pid, store_loc).
+
+    Raises:
+        CannotConnectToStoreInterfaceError: if there is no store at store_loc
+    """
+    key = (os.getpid(), store_loc)
+    handles = _shared_memory_handles.get(key)
+    if handles is not None:
+        return handles
+
+    arena_path = os.path.join(str(store_loc), SharedMemoryStoreInterface.ARENA)
+    index_path = os.path.join(str(store_loc), SharedMemoryStoreInterface.INDEX)
+    if not os.path.exists(arena_path) or not os.path.exists(index_path):
+        raise CannotConnectToStoreInterfaceError(store_loc)
+
+    fd = os.open(arena_path, os.O_RDWR)
+    try:
+        arena = mmap.mmap(fd, 0)
+    finally:
+        os.close(fd)
+    env = lmdb.open(
+        index_path,
+        max_dbs=SharedMemoryStoreInterface.INDEX_DBS,
+        map_size=SharedMemoryStoreInterface.INDEX_SIZE,
+        sync=False,
+        metasync=False,
+        readahead=False,
+        create=False,
+    )
+    handles = _StoreHandles(
+        arena,
+        memoryview(arena),
+        env,
+        env.open_db(b"objects", create=False),
+        env.open_db(b"free", create=False),
+        env.open_db(b"meta", create=False),
+        env.open_db(b"retention", create=False),
+        env.open_db(b"window", create=False),
+        env.open_db(b"heads", create=False),
+        env.open_db(b"versions", create=False),
+    )
+    _shared_memory_handles[key] = handles
+    return handles
+
+
+# Seal notifications are datagrams of (object id, data size) records,
+# sent to a socket per subscriber
+_NOTIFICATION = struct.Struct("<20sQ")
+_NOTIFICATIONS_PER_MESSAGE = 1024
+_MAX_PENDING_NOTIFICATIONS = 100000
+
+# Subscriber sockets per directory, with the mtime of the directory when listed
+_subscribers = {}
+# Socket sending notifications, one per process
+_notification_senders = {}
+
+
+def _subscriber_dir(store_loc):
+    """Directory holding the notification sockets of the store at store_loc.
+    It is in the temporary directory rather than the store
+    because socket paths must be short.
+    """
+    digest = hashlib.sha1(os.path.abspath(str(store_loc)).encode()).hexdigest()
+    return os.path.join(tempfile.gettempdir(), "improv-" + digest[:16])
+
+
+def _notification_sender():
+    sock = _notification_senders.get(os.getpid())
+    if sock is None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        _notification_senders[os.getpid()] = sock
+    return sock
+
+
+def _is_plain_array(obj):
+    """Whether obj is an ndarray whose memory can be copied as is"""
+    return (
+        type(obj) is np.ndarray and not obj.dtype.hasobject and obj.dtype.names is None
+    )
+
+
+def shared_memory_dir():
+    """Directory in which shared memory stores are created by default:
+    /dev/shm where it exists (Linux), else the system temporary directory.
+    """
+    if os.path.isdir("/dev/shm"):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+class SharedMemoryStoreInterface(StoreInterface):
+    """Data store built directly on shared memory, with no broker process.
+
+    A store is a directory (store_loc) holding a fixed-size arena file,
+    memory-mapped by every process that connects, and a small LMDB index
+    that tracks free space in the arena and the objects stored in it.
+    Numpy arrays are copied into the arena once on put and returned
+    as read-only views on get; other objects are pickled.
+
+    Streams of objects whose names share a prefix can be given a retention
+    policy (see set_retention): only the most recent objects of the stream
+    are kept, older ones are evicted as new ones are put.
+
+    With spilling on (see set_spill), the oldest objects are moved to an
+    LMDB database when the arena fills up, and moved back on access.
+
+    An object that evolves, such as model weights, can be kept under one
+    name with replace; readers get consistent snapshots of its versions.
+    """
+
+    ARENA = "arena"
+    INDEX = "index"
+    INDEX_DBS = 8
+    INDEX_SIZE = 2**30
+    ALIGNMENT = 64
+
+    def __init__(
+        self,
+        name="default",
+        store_loc="/tmp/store",
+        use_hdd=False,
+        lmdb_name=None,
+        lmdb_segment=None,
+        lmdb_codecs=None,
+    ):
+        """
+        Constructor for the SharedMemoryStoreInterface
+
+        :param name:
+        :param store_loc: directory of a store made with create_store
+        :param use_hdd: also write objects to the LMDB database lmdb_name
+        :param lmdb_name:
+        :param lmdb_segment: when to roll over to a new LMDB segment,
+            {"minutes": ..., "gb": ...}
+        :param lmdb_codecs: LMDB compression codec for each name prefix,
+            {prefix: codec}
+        """
+
+        self.name = name
+        self.store_loc = store_loc
+        self.stored = {}
+        self._setup_LMDB(
+            use_lmdb=use_hdd,
+            lmdb_name=lmdb_name,
+            lmdb_segment=lmdb_segment,
+            lmdb_codecs=lmdb_codecs,
+        )
+        self._notifications = None
+        self._pending = deque(maxlen=_MAX_PENDING_NOTIFICATIONS)
+        self._waiters = set()
+        self.connect_store(store_loc)
+
+    @staticmethod
+    def create_store(store_loc, size, retention=None, spill=None):
+        """Create a new, empty store of size bytes in the directory store_loc
+
+        Args:
+            store_loc: directory for the store, must not exist yet
+            size (int): size of the arena in bytes
+            retention (dict): number of objects to keep per name prefix,
+                see set_retention
+            spill (dict): arguments of set_spill, to spill objects to LMDB
+        """
+        size = int(size)
+        os.makedirs(store_loc)
+        arena_path = os.path.join(store_loc, SharedMemoryStoreInterface.ARENA)
+        with open(arena_path, "wb") as f:
+            f.truncate(size)
+            if hasattr(os, "posix_fallocate") and size > 0:
+                # reserve the memory now rather than fail on first write
+                os.posix_fallocate(f.fileno(), 0, size)
+
+        env = lmdb.open(
+            os.path.join(store_loc, SharedMemoryStoreInterface.INDEX),
+            max_dbs=SharedMemoryStoreInterface.INDEX_DBS,
+            map_size=SharedMemoryStoreInterface.INDEX_SIZE,
+        )
+        objects = env.open_db(b"objects")
+        free = env.open_db(b"free")
+        meta = env.open_db(b"meta")
+        env.open_db(b"retention")
+        env.open_db(b"window")
+        env.open_db(b"heads")
+        env.open_db(b"versions")
+        with env.begin(write=True) as txn:
+            txn.drop(objects, delete=False)
+            txn.drop(free, delete=False)
+            if size > 0:
+                txn.put(_OFFSET.pack(0), _SIZE.pack(size), db=free)
+            txn.put(b"size", _SIZE.pack(size), db=meta)
+            txn.put(b"used", _SIZE.pack(0), db=meta)
+        env.close()
+
+        store = SharedMemoryStoreInterface("create_store", store_loc)
+        for prefix, keep in (retention or {}).items():
+            store.set_retention(prefix, keep)
+        if spill:
+            store.set_spill(**spill)
+
+    @staticmethod
+    def destroy_store(store_loc):
+        """Remove the store at store_loc
+
+        Raises:
+            FileNotFoundError: if the store has already been removed
+        """
+        for key in [k for k in _shared_memory_handles if k[1] == store_loc]:
+            _shared_memory_handles.pop(key).env.close()
+        shutil.rmtree(_subscriber_dir(store_loc), ignore_errors=True)
+        shutil.rmtree(store_loc)
+
+    def connect_store(self, store_loc):
+        """Attach to the store at store_loc
+        Raises exception if there is no store there
+
+        Args:
+            store_loc: store location
+        """
+        try:
+            _attach_shared_memory(store_loc)
+            logger.info("Successfully connected to store: {} ".format(store_loc))
+        except Exception:
+            logger.exception("Cannot connect to store: {}".format(store_loc))
+            raise CannotConnectToStoreInterfaceError(store_loc)
+
+    @property
+    def _handles(self):
+        return _attach_shared_memory(self.store_loc)
+
+    def put(self, object, object_name, consumers=None):
+        """
+        Put a single object referenced by its string name
+        into the store
+
+        Args:
+            object:
+            object_name (str):
+            consumers (int): if given, the object is leased to this many
+                consumers and freed once each of them has called releaseID;
+                otherwise it stays in the store until deleted
+
+        Returns:
+            SharedMemoryObjectID: id of the object, None if it was not stored
+        """
+        return self.putMany([object], [object_name], consumers=consumers)[0]
+
+    def putMany(self, objects, names, consumers=None):
+        """
+        Put several objects into the store as one batch:
+        space for all of them is reserved in one index transaction,
+        they are copied into the arena, and all are sealed in a second one
+
+        Args:
+            objects (list): objects to store
+            names (list): names of the objects, same length as objects
+            consumers (int): number of consumers each object is leased to,
+                see put
+
+        Returns:
+            list: SharedMemoryObjectIDs in the order of objects,
+            None for objects that were not stored
+        """
+        if len(objects) != len(names):
+            raise ValueError("putMany needs one name per object")
+
+        object_ids = [None] * len(objects)
+        batch = []
+        for i, (object, object_name) in enumerate(zip(objects, names)):
+            try:
+                batch.append((i, object_name) + self._encode(object))
+            except Exception:
+                logger.error("Could not store object {}".format(object_name))
+                logger.error(traceback.format_exc())
+        if not batch:
+            return object_ids
+
+        handles = self._handles
+        sizes = [nbytes for (_, _, _, _, _, nbytes) in batch]
+        try:
+            try:
+                offsets = self._reserve(handles, sizes)
+            except StoreFullError:
+                needed = sum(self._aligned(nbytes) for nbytes in sizes)
+                if not self._spill(handles, needed=needed):
+                    raise
+                offsets = self._reserve(handles, sizes)
+        except StoreFullError as e:
+            logger.error("Could not store objects {}: {}".format(names, e))
+            return object_ids
+
+        try:
+            entries = []
+            for (i, object_name, kind, header, payload, nbytes), offset in zip(
+                batch, offsets
+            ):
+                self._write(handles, kind, payload, offset, nbytes)
+                object_id = SharedMemoryObjectID.from_random()
+                entries.append((object_id, object_name, kind, header, offset, nbytes))
+            self._seal(handles, entries, consumers=consumers)
+        except Exception:
+            logger.error("Could not store objects {}".format(names))
+            logger.error(traceback.format_exc())
+            self._free(handles, list(zip(offsets, sizes)))
+            return object_ids
+
+        for (i, object_name, *_), (object_id, *_) in zip(batch, entries):
+            object_ids[i] = object_id
+            if self.use_hdd:
+                self.lmdb_store.put(objects[i], object_name, obj_id=object_id)
+
+        try:
+            self._spill(handles)
+        except Exception:
+            logger.error("Could not spill objects from {}".format(self.store_loc))
+            logger.error(traceback.format_exc())
+
+        return object_ids
+
+    def releaseID(self, obj_id):
+        """Release a consumer's lease on an object; the object is freed
+        when the last consumer it was put for releases it.
+        Objects put without consumers are not affected.
+
+        Args:
+            obj_id (SharedMemoryObjectID): the id of the object
+
+        Raises:
+            ObjectNotFoundError: If the id is not found
+        """
+        handles = self._handles
+        self._cache_drop(obj_id)
+        with handles.env.begin(write=True) as txn:
+            if not self._lease(handles, txn, obj_id.binary(), -1):
+                raise ObjectNotFoundError(obj_id)
+
+    def replace(self, object, object_name):
+        """
+        Publish object as the next version of object_name.
+        The previous version is freed once no reader holds it
+        (see hold_version and snapshot).
+
+        Args:
+            object:
+            object_name (str):
+
+        Returns:
+            int: the new version number, counting from 1;
+            None if the object was not stored
+        """
+        # the lease taken here is dropped when the version is superseded
+        object_id = self.put(object, object_name, consumers=1)
+        if object_id is None:
+            return None
+
+        handles = self._handles
+        name = object_name.encode()
+        with handles.env.begin(write=True) as txn:
+            head = txn.get(name, db=handles.heads)
+            latest, oldest = _VERSIONS.unpack(head) if head else (0, 1)
+            version = latest + 1
+            txn.put(
+                name + b"\0" + _OFFSET.pack(version),
+                object_id.binary(),
+                db=handles.versions,
+            )
+            if latest:
+                previous = txn.get(
+                    name + b"\0" + _OFFSET.pack(latest), db=handles.versions
+                )
+                self._lease(handles, txn, previous, -1)
+            # forget versions that have been freed
+            while oldest < version:
+                key = name + b"\0" + _OFFSET.pack(oldest)
+                if txn.get(txn.get(key, db=handles.versions), db=handles.objects):
+                    break
+                txn.delete(key, db=handles.versions)
+                oldest += 1
+            txn.put(name, _VERSIONS.pack(version, oldest), db=handles.heads)
+        return version
+
+    def get_version(self, object_name, version=None):
+        """
+        Get a version of an object published with replace.
+        Arrays are views that are only valid while the version
+        is in the store; hold it to read them safely.
+
+        Args:
+            object_name (str):
+            version (int): the version, None for the latest
+
+        Returns:
+            the object
+
+        Raises:
+            ObjectNotFoundError: If the version is not in the store
+        """
+        handles = self._handles
+        with handles.env.begin(buffers=True) as txn:
+            key = self._version_key(handles, txn, object_name, version)
+            entry = txn.get(key, db=handles.objects) if key else None
+            if entry is None:
+                raise ObjectNotFoundError("{}@{}".format(object_name, version))
+            return self._decode(handles, entry)
+
+    def hold_version(self, object_name, version=None):
+        """
+        Get a version of an object published with replace,
+        keeping it in the store until release_version is called
+
+        Returns:
+            tuple: the version number, the object
+
+        Raises:
+            ObjectNotFoundError: If the version is not in the store
+        """
+        handles = self._handles
+        with handles.env.begin(write=True, buffers=True) as txn:
+            key = self._version_key(handles, txn, object_name, version)
+            if key is None or not self._lease(handles, txn, key, 1):
+                raise ObjectNotFoundError("{}@{}".format(object_name, version))
+            if version is None:
+                version = _VERSIONS.unpack(
+                    txn.get(object_name.encode(), db=handles.heads)
+                )[0]
+            return version, self._decode(handles, txn.get(key, db=handles.objects))
+
+    def release_version(self, object_name, version):
+        """Let a version taken with hold_version be freed
+
+        Raises:
+            ObjectNotFoundError: If the version is not in the store
+        """
+        handles = self._handles
+        with handles.env.begin(write=True) as txn:
+            key = self._version_key(handles, txn, object_name, version)
+            if key is None or not self._lease(handles, txn, key, -1):
+                raise ObjectNotFoundError("{}@{}".format(object_name, version))
+
+    @contextmanager
+    def snapshot(self, object_name, version=None):
+        """Hold a version of an object published with replace while in
+        a with block, e.g. ``with store.snapshot("theta") as theta:``
+        """
+        version, obj = self.hold_version(object_name, version)
+        try:
+            yield obj
+        finally:
+            self.release_version(object_name, version)
+
+    def _version_key(self, handles, txn, object_name, version):
+        """Index key of a version, None if there is no such version"""
+        name = object_name.encode()
+        if version is None:
+            head = txn.get(name, db=handles.heads)
+            if head is None:
+                return None
+            version = _VERSIONS.unpack(head)[0]
+        key = txn.get(name + b"\0" + _OFFSET.pack(version), db=handles.versions)
+        return None if key is None else bytes(key)
+
+    def _lease(self, handles, txn, key, change):
+        """Add change to the number of consumers of a leased object,
+        freeing it when none are left; objects that are not leased
+        are not affected
+
+        Returns:
+            bool: whether the object was in the store
+        """
+        entry = txn.get(key, db=handles.objects)
+        if entry is None:
+            return False
+        offset, nbytes, create_time, consumers, kind, name_len = _ENTRY.unpack_from(
+            entry
+        )
+        if consumers < 0:
+            return True
+        if consumers + change > 0:
+            txn.put(
+                key,
+                _ENTRY.pack(
+                    offset, nbytes, create_time, consumers + change, kind, name_len
+                )
+                + bytes(entry[_ENTRY.size :]),
+                db=handles.objects,
+            )
+            return True
+        txn.delete(key, db=handles.objects)
+        self._free(handles, [(offset, nbytes)], txn=txn)
+        return True
+
+    def delete(self, obj_id):
+        """
+        Delete object from the store, whether or not it is leased
+
+        Args:
+            obj_id (SharedMemoryObjectID): the object_id to be deleted
+
+        Raises:
+            ObjectNotFoundError: If the id is not found
+        """
+        handles = self._handles
+        self._cache_drop(obj_id)
+        with handles.env.begin(write=True) as txn:
+            entry = txn.pop(obj_id.binary(), db=handles.objects)
+            if entry is None:
+                raise ObjectNotFoundError(obj_id)
+            self._free(handles, self._dropped(entry), txn=txn)
+
+    def create_ring(self, name, shape, dtype, depth):
+        """Preallocate a FrameRing of depth frames of the given shape and dtype.
+        Writing a frame to the ring needs no allocation, and frames are found
+        by sequence number without a lookup in the index.
+        The ring is removed with delete.
+
+        Args:
+            name (str): name of the ring, unique in the store
+            shape (tuple): shape of a frame
+            dtype: numpy dtype of a frame
+            depth (int): number of frames kept
+
+        Returns:
+            FrameRing: the ring; get_ring(name) and getID on its id
+            (ring_id(name)) give the same ring in other processes
+
+        Raises:
+            ValueError: if there already is a ring with that name
+            StoreFullError: if there is no room for the ring
+        """
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        arrays = [
+            np.zeros(1, dtype=np.int64),
+            np.full(int(depth), -1, dtype=np.int64),
+            np.broadcast_to(np.zeros((), dtype=dtype), (int(depth),) + shape),
+        ]
+        self._create_in_place(self.ring_id(name), name, _KIND_RING, arrays)
+        return self.get_ring(name)
+
+    def get_ring(self, name):
+        """Get the FrameRing created with name
+
+        Raises:
+            ObjectNotFoundError: If there is no such ring
+        """
+        return self.getID(self.ring_id(name))
+
+    @staticmethod
+    def ring_id(name):
+        """Id of the FrameRing created with name"""
+        return SharedMemoryObjectID(hashlib.sha1(b"ring:" + name.encode()).digest())
+
+    def create_traces(self, name, max_rows, max_frames, dtype=np.float64):
+        """Preallocate a TraceMatrix of up to max_rows rows and max_frames frames.
+        Appending a frame copies just that frame into the store, and consumers
+        read any window of frames without a copy.
+        The matrix is removed with delete.
+
+        Args:
+            name (str): name of the matrix, unique in the store
+            max_rows (int): largest number of rows, e.g. neurons
+            max_frames (int): largest number of frames
+            dtype: numpy dtype of the values
+
+        Returns:
+            TraceMatrix: the matrix; get_traces(name) and getID on its id
+            (traces_id(name)) give the same matrix in other processes
+
+        Raises:
+            ValueError: if there already is a matrix with that name
+            StoreFullError: if there is no room for the matrix
+        """
+        arrays = [
+            np.zeros(2, dtype=np.int64),
+            np.broadcast_to(
+                np.zeros((), dtype=dtype), (int(max_frames), int(max_rows))
+            ),
+        ]
+        self._create_in_place(self.traces_id(name), name, _KIND_TRACES, arrays)
+        return self.get_traces(name)
+
+    def get_traces(self, name):
+        """Get the TraceMatrix created with name
+
+        Raises:
+            ObjectNotFoundError: If there is no such matrix
+        """
+        return self.getID(self.traces_id(name))
+
+    @staticmethod
+    def traces_id(name):
+        """Id of the TraceMatrix created with name"""
+        return SharedMemoryObjectID(hashlib.sha1(b"traces:" + name.encode()).digest())
+
+    def _create_in_place(self, object_id, name, kind, arrays):
+        """Store arrays that will be written in place, under a chosen id
+
+        Raises:
+            ValueError: if there already is an object with that id
+            StoreFullError: if there is no room for the arrays
+        """
+        header, layout, nbytes = self._layout_arrays(arrays)
+        handles = self._handles
+        with handles.env.begin(db=handles.objects) as txn:
+            if txn.get(object_id.binary()) is not None:
+                raise ValueError("{} already exists".format(name))
+        offset = self._reserve(handles, [nbytes])[0]
+        try:
+            self._write(handles, kind, layout, offset, nbytes)
+            self._seal(handles, [(object_id, name, kind, header, offset, nbytes)])
+        except Exception:
+            self._free(handles, [(offset, nbytes)])
+            raise
+
+    def get(self, object_name):
+        """Get a single object from the store by object id
+
+        Returns:
+            Stored object
+        """
+        return self.getID(object_name)
+
+    def getID(self, obj_id, hdd_only=False, timeout=0):
+        """
+        Get object by object ID
+
+        Args:
+            obj_id (SharedMemoryObjectID): the id of the object
+            hdd_only (bool):
+            timeout (float): seconds to wait for the object to be sealed
+                if it is not in the store yet, None to wait forever
+
+        Returns:
+            Stored object
+
+        Raises:
+            ObjectNotFoundError: If the id is not found
+        """
+        # Check in RAM
+        if not hdd_only:
+            res = self._lookup(obj_id)
+            if res is _MISSING and timeout != 0:
+                res = self._wait_for(obj_id, timeout)
+            if res is not _MISSING:
+                return res
+
+        return self._getID_hdd(obj_id)
+
+    async def get_async(self, obj_id, timeout=None):
+        """
+        Get object by object ID, waiting for it to be sealed
+        without blocking the event loop
+
+        Args:
+            obj_id (SharedMemoryObjectID): the id of the object
+            timeout (float): seconds to wait, None to wait forever
+
+        Returns:
+            Stored object
+
+        Raises:
+            ObjectNotFoundError: If the id is not found in time
+        """
+        res = self._lookup(obj_id)
+        if res is _MISSING:
+            try:
+                res = await asyncio.wait_for(self._sealed(obj_id), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if res is not _MISSING:
+            return res
+
+        return self._getID_hdd(obj_id)
+
+    def _getID_hdd(self, obj_id):
+        """Get an object that is not in memory from disk
+
+        Raises:
+            ObjectNotFoundError: If the id is not found
+        """
+        if self.use_hdd:
+            res = self.lmdb_store.get(obj_id)
+            if res is not None:
+                return res
+
+        logger.warning("Object {} cannot be found.".format(obj_id))
+        raise ObjectNotFoundError(obj_id)
+
+    def getList(self, ids):
+        """Get multiple objects from the store
+
+        Args:
+            ids (list): of type SharedMemoryObjectID
+
+        Returns:
+            list of the objects, None for ids that are not in the store
+        """
+        handles = self._handles
+        objects = [self._cache_get(obj_id) for obj_id in ids]
+        kinds = [None] * len(ids)
+        with handles.env.begin(db=handles.objects, buffers=True) as txn:
+            for i, obj_id in enumerate(ids):
+                if objects[i] is _MISSING:
+                    entry = txn.get(obj_id.binary())
+                    if entry is not None:
+                        kinds[i] = _ENTRY.unpack_from(entry)[4]
+                        objects[i] = self._decode(handles, entry)
+        for i, obj_id in enumerate(ids):
+            objects[i] = self._cached(handles, obj_id, objects[i], kinds[i])
+        return [None if obj is _MISSING else obj for obj in objects]
+
+    def get_all(self):
+        """Get a listing of all objects in the store
+
+        Returns:
+            dict of object id to name, size and creation time
+        """
+        handles = self._handles
+        listing = {}
+        with handles.env.begin(db=handles.objects) as txn:
+            for key, entry in txn.cursor():
+                _, nbytes, create_time, consumers, _, name_len = _ENTRY.unpack_from(
+                    entry
+                )
+                name = bytes(entry[_ENTRY.size : _ENTRY.size + name_len]).decode()
+                listing[SharedMemoryObjectID(key)] = {
+                    "name": name,
+                    "data_size": nbytes,
+                    "create_time": create_time,
+                    "consumers": None if consumers < 0 else consumers,
+                }
+        return listing
+
+    def get_usage(self):
+        """
+        Returns:
+            tuple: (bytes allocated, total size) of the arena
+        """
+        handles = self._handles
+        with handles.env.begin(db=handles.meta) as txn:
+            used = _SIZE.unpack(txn.get(b"used"))[0]
+            size = _SIZE.unpack(txn.get(b"size"))[0]
+        return used, size
+
+    def set_retention(self, prefix, keep):
+        """Keep only the last keep objects whose names start with prefix.
+        Older objects of the stream are evicted when new ones are put;
+        leased objects leave the window at once, but are only freed
+        when their last consumer releases them. An object matching
+        several prefixes belongs to the stream of the longest one.
+        A policy only applies to objects put after it is set.
+
+        Args:
+            prefix (str): name prefix; a trailing "*" is ignored
+            keep (int): number of objects to keep, None to remove the policy
+        """
+        key = prefix.rstrip("*").encode()
+        handles = self._handles
+        with handles.env.begin(write=True, db=handles.retention) as txn:
+            record = txn.get(key)
+            if keep is None:
+                if record is not None:
+                    _, first, last, _, _ = _RETENTION.unpack(record)
+                    txn.delete(key)
+                    for seq in range(first, last):
+                        txn.delete(key + b"\0" + _OFFSET.pack(seq), db=handles.window)
+                return
+            if int(keep) < 1:
+                raise ValueError("Retention must keep at least one object")
+            if record is None:
+                record = _RETENTION.pack(int(keep), 0, 0, 0, 0)
+            else:
+                record = _RETENTION.pack(int(keep), *_RETENTION.unpack(record)[1:])
+            txn.put(key, record)
+
+    def get_retention(self):
+        """
+        Returns:
+            dict: for each name prefix with a retention policy, the number of
+            objects to "keep", the number of objects "retained" in its window
+            and the number of objects and bytes evicted so far
+            ("evicted" and "evicted_bytes")
+        """
+        handles = self._handles
+        policies = {}
+        with handles.env.begin(db=handles.retention) as txn:
+            for key, record in txn.cursor():
+                keep, first, last, evicted, evicted_bytes = _RETENTION.unpack(record)
+                policies[key.decode()] = {
+                    "keep": keep,
+                    "retained": last - first,
+                    "evicted": evicted,
+                    "evicted_bytes": evicted_bytes,
+                }
+        return policies
+
+    def set_spill(self, path, high_water=0.9, low_water=0.7):
+        """Spill objects to an LMDB database when the arena fills up.
+        Once more than high_water of the arena is in use, the oldest objects
+        are moved to the database until no more than low_water is used;
+        getID moves them back to the arena when they are accessed.
+        Leased objects and rings always stay in the arena.
+
+        Args:
+            path: directory of the LMDB database, None to stop spilling
+            high_water (float): fraction of the arena in use that
+                starts spilling
+            low_water (float): fraction of the arena spilling stops at
+
+        Raises:
+            ValueError: unless 0 <= low_water <= high_water <= 1
+        """
+        handles = self._handles
+        with handles.env.begin(write=True, db=handles.meta) as txn:
+            if path is None:
+                txn.delete(b"spill")
+                return
+            if not 0 <= low_water <= high_water <= 1:
+                raise ValueError("Need 0 <= low_water <= high_water <= 1")
+            path = os.path.abspath(str(path))
+            txn.put(b"spill", _SPILL.pack(high_water, low_water) + path.encode())
+
+    def reset(self):
+        """Reset client connection"""
+        self.connect_store(self.store_loc)
+        logger.debug("Reset local connection to store: {0}".format(self.store_loc))
+
+    def release(self):
+        """Unsubscribe from notifications. The arena and index are shared
+        by all the interfaces of a process and are closed when it exits.
+        """
+        self.unsubscribe()
+
+    def subscribe(self):
+        """Subscribe to notifications of objects sealed in the store,
+        which are then read with notify
+        """
+        if self._notifications is not None:
+            return
+        directory = _subscriber_dir(self.store_loc)
+        os.makedirs(directory, exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(
+            os.path.join(directory, "{}-{}".format(os.getpid(), uuid.uuid4().hex[:8]))
+        )
+        self._notifications = sock
+
+    def notify(self):
+        """Get the next notification of a sealed object, if there is one
+
+        Returns:
+            tuple: (object id, data size, metadata size) as with plasma,
+            None if there are no notifications
+        """
+        if self._notifications is None:
+            return None
+        if not self._pending:
+            self._receive()
+        return self._pending.popleft() if self._pending else None
+
+    def unsubscribe(self):
+        """Stop receiving notifications"""
+        if self._notifications is None:
+            return
+        path = self._notifications.getsockname()
+        self._notifications.close()
+        self._notifications = None
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def random_ObjectID(self, number=1):
+        return [SharedMemoryObjectID.from_random() for _ in range(number)]
+
+    def _lookup(self, obj_id):
+        """Get object obj_id from the arena, _MISSING if it is not there"""
+        cached = self._cache_get(obj_id)
+        if cached is not _MISSING:
+            return cached
+        handles = self._handles
+        with handles.env.begin(db=handles.objects, buffers=True) as txn:
+            entry = txn.get(obj_id.binary())
+            if entry is None:
+                return _MISSING
+            kind = _ENTRY.unpack_from(entry)[4]
+            res = self._decode(handles, entry)
+        return self._cached(handles, obj_id, res, kind)
+
+    def _cached(self, handles, obj_id, res, kind):
+        """Finish reading a decoded object: promote it if it was spilled,
+        and cache it if it was deserialized. Arrays are views on the arena,
+        which is reused once they are deleted, so they are not cached.
+        """
+        if isinstance(res, _Spilled):
+            res = self._promote(handles, obj_id, res)
+            if res is not _MISSING:
+                self._cache_put(obj_id, res)
+        elif kind == _KIND_PICKLE:
+            self._cache_put(obj_id, res)
+        return res
+
+    def _wait_for(self, obj_id, timeout):
+        """Wait up to timeout seconds (forever if None) for obj_id to be sealed
+
+        Returns:
+            the object, _MISSING if it was not sealed in time
+        """
+        self.subscribe()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # notifications sent after this check wake up the select
+            self._receive()
+            res = self._lookup(obj_id)
+            if res is not _MISSING:
+                return res
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return _MISSING
+            select.select([self._notifications], [], [], remaining)
+
+    async def _sealed(self, obj_id):
+        """Wait in the event loop until obj_id is sealed
+
+        Returns:
+            the object
+        """
+        self.subscribe()
+        loop = asyncio.get_event_loop()
+        event = asyncio.Event()
+        if not self._waiters:
+            loop.add_reader(self._notifications.fileno(), self._wake_waiters)
+        self._waiters.add(event)
+        try:
+            while True:
+                event.clear()
+                res = self._lookup(obj_id)
+                if res is not _MISSING:
+                    return res
+                await event.wait()
+        finally:
+            self._waiters.discard(event)
+            if not self._waiters and self._notifications is not None:
+                loop.remove_reader(self._notifications.fileno())
+
+    def _wake_waiters(self):
+        self._receive()
+        for event in self._waiters:
+            event.set()
+
+    def _receive(self):
+        """Move notifications waiting on the socket to the pending ones,
+        dropping the oldest if nobody reads them with notify
+        """
+        while True:
+            try:
+                message = self._notifications.recv(
+                    _NOTIFICATION.size * _NOTIFICATIONS_PER_MESSAGE
+                )
+            except BlockingIOError:
+                return
+            for object_id, nbytes in _NOTIFICATION.iter_unpack(message):
+                self._pending.append((SharedMemoryObjectID(object_id), nbytes, 0))
+
+    def _publish(self, entries):
+        """Notify subscribers of sealed objects
+
+        Args:
+            entries (list): (object_id, name, kind, header, offset, nbytes) tuples
+        """
+        directory = _subscriber_dir(self.store_loc)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return
+        listed = _subscribers.get(directory)
+        if listed is None or listed[0] != mtime:
+            paths = [os.path.join(directory, f) for f in os.listdir(directory)]
+            listed = _subscribers[directory] = (mtime, paths)
+        if not listed[1]:
+            return
+
+        records = [_NOTIFICATION.pack(entry[0].binary(), entry[5]) for entry in entries]
+        messages = [
+            b"".join(records[i : i + _NOTIFICATIONS_PER_MESSAGE])
+            for i in range(0, len(records), _NOTIFICATIONS_PER_MESSAGE)
+        ]
+        sock = _notification_sender()
+        for path in listed[1]:
+            try:
+                for message in messages:
+                    sock.sendto(message, path)
+            except BlockingIOError:
+                # the subscriber is not reading its notifications
+                continue
+            except (ConnectionRefusedError, FileNotFoundError):
+                # the subscriber exited without unsubscribing
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _spill(self, handles, needed=0):
+        """Move the oldest objects to the spill database if, with needed
+        more bytes, more of the arena than its high water mark is in use
+
+        Returns:
+            bool: whether any objects were moved
+        """
+        with handles.env.begin(db=handles.meta) as txn:
+            settings = txn.get(b"spill")
+            used = _SIZE.unpack(txn.get(b"used"))[0] + needed
+            size = _SIZE.unpack(txn.get(b"size"))[0]
+        if settings is None:
+            return False
+        high_water, low_water = _SPILL.unpack_from(settings)
+        if used <= high_water * size:
+            return False
+        path = settings[_SPILL.size :].decode()
+
+        candidates = []
+        with handles.env.begin(db=handles.objects) as txn:
+            for key, entry in txn.cursor():
+                _, _, create_time, consumers, kind, _ = _ENTRY.unpack_from(entry)
+                if consumers < 0 and kind in _SPILLABLE:
+                    candidates.append((create_time, key, entry))
+        candidates.sort()
+
+        # copy the objects to the database before removing them from the arena
+        spill_store = _open_spill_store(path)
+        moved = []
+        for _, key, entry in candidates:
+            if used <= low_water * size:
+                break
+            nbytes, _, _, _, name_len = _ENTRY.unpack_from(entry)[1:]
+            name = entry[_ENTRY.size : _ENTRY.size + name_len]
+            obj_id = SharedMemoryObjectID(key)
+            spill_store.put(self._decode(handles, entry), name.decode(), obj_id=obj_id)
+            moved.append((key, entry))
+            used -= self._aligned(nbytes)
+        spill_store.commit()
+
+        blocks = []
+        with handles.env.begin(write=True, db=handles.objects) as txn:
+            for key, entry in moved:
+                # skip objects deleted or moved by another process meanwhile
+                if txn.get(key) != entry:
+                    continue
+                offset, nbytes, create_time, _, _, name_len = _ENTRY.unpack_from(entry)
+                name = entry[_ENTRY.size : _ENTRY.size + name_len]
+                lmdb_key = spill_store.key(name.decode(), SharedMemoryObjectID(key))
+                header = struct.pack("<B", len(lmdb_key)) + lmdb_key + path.encode()
+                spilled = _ENTRY.pack(
+                    0, nbytes, create_time, -1, _KIND_SPILLED, name_len
+                )
+                txn.put(key, spilled + name + header)
+                blocks.append((offset, nbytes))
+            self._free(handles, blocks, txn=txn)
+        return bool(blocks)
+
+    def _promote(self, handles, obj_id, spilled):
+        """Get a spilled object, moving it back into the arena if there is room
+
+        Returns:
+            the object, _MISSING if it is no longer in the spill database
+        """
+        spill_store = _open_spill_store(spilled.path)
+        obj = spill_store.get(spilled.key)
+        if obj is None:
+            return _MISSING
+        try:
+            kind, header, payload, nbytes = self._encode(obj)
+            offset = self._reserve(handles, [nbytes])[0]
+        except StoreFullError:
+            return obj
+        self._write(handles, kind, payload, offset, nbytes)
+
+        name_len = _ENTRY.unpack_from(spilled.entry)[5]
+        name = spilled.entry[_ENTRY.size : _ENTRY.size + name_len]
+        with handles.env.begin(write=True, db=handles.objects) as txn:
+            if txn.get(obj_id.binary()) != spilled.entry:
+                # deleted, or promoted by another process meanwhile
+                self._free(handles, [(offset, nbytes)], txn=txn)
+                return obj
+            entry = _ENTRY.pack(offset, nbytes, time.time(), -1, kind, name_len)
+            txn.put(obj_id.binary(), entry + name + header)
+        spill_store.delete(spilled.key)
+        return obj
+
+    def _dropped(self, entry):
+        """Blocks of the arena to free for a removed index entry;
+        spilled objects are deleted from the spill database instead
+        """
+        offset, nbytes, _, _, kind, _ = _ENTRY.unpack_from(entry)
+        if kind != _KIND_SPILLED:
+            return [(offset, nbytes)]
+        spilled = self._decode(None, entry)
+        try:
+            _open_spill_store(spilled.path).delete(spilled.key)
+        except ObjectNotFoundError:
+            pass
+        return []
+
+    def _encode(self, obj):
+        """Choose how to lay out obj in the arena
+
+        Returns:
+            tuple: kind, kind-specific header, payload, payload size.
+            The payload is a list of (offset, array) pairs for array kinds,
+            bytes otherwise. Dicts, lists and tuples of arrays and scalars
+            are trees: their arrays are laid out like the others, and their
+            structure is described in the header; other objects are pickled
+        """
+        if _is_plain_array(obj):
+            header, layout, nbytes = self._layout_arrays([obj])
+            return _KIND_ARRAY, header, layout, nbytes
+
+        sparse_format = _SPARSE_FORMATS.get(type(obj))
+        if sparse_format is not None:
+            if sparse_format == "coo":
+                arrays = [obj.data, obj.row, obj.col]
+            else:
+                arrays = [obj.data, obj.indices, obj.indptr]
+            if all(_is_plain_array(arr) for arr in arrays):
+                header, layout, nbytes = self._layout_arrays(arrays)
+                header = (
+                    struct.pack("<3sQQ", sparse_format.encode(), *obj.shape) + header
+                )
+                return _KIND_SPARSE, header, layout, nbytes
+
+        if type(obj) in _CONTAINER_TAGS:
+            schema, arrays = [], []
+            if _encode_tree(obj, schema, arrays) and arrays:
+                schema = b"".join(schema)
+                header, layout, nbytes = self._layout_arrays(arrays)
+                header = _COUNT.pack(len(schema)) + schema + header
+                return _KIND_TREE, header, layout, nbytes
+
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        return _KIND_PICKLE, b"", payload, len(payload)
+
+    def _decode(self, handles, entry):
+        """Rebuild an object from its index entry.
+        Arrays, and the arrays inside sparse matrices and trees,
+        are read-only views on the arena.
+        Rings and traces are FrameRings and TraceMatrixes over their arrays.
+        Spilled objects are _Spilled records, to be promoted by the caller.
+        """
+        offset, nbytes, _, _, kind, name_len = _ENTRY.unpack_from(entry)
+        header = entry[_ENTRY.size + name_len :]
+
+        if kind == _KIND_ARRAY:
+            return self._arrays_from_layout(handles, header, offset)[0]
+
+        if kind == _KIND_SPARSE:
+            sparse_format, rows, cols = struct.unpack_from("<3sQQ", header)
+            arrays = self._arrays_from_layout(handles, header[19:], offset)
+            return _sparse_from_arrays(sparse_format.decode(), (rows, cols), arrays)
+
+        if kind == _KIND_TREE:
+            (schema_len,) = _COUNT.unpack_from(header)
+            schema = bytes(header[4 : 4 + schema_len])
+            arrays = self._arrays_from_layout(handles, header[4 + schema_len :], offset)
+            return _decode_tree(schema, 0, arrays)[0]
+
+        if kind == _KIND_RING or kind == _KIND_TRACES:
+            name = bytes(entry[_ENTRY.size : _ENTRY.size + name_len]).decode()
+            arrays = self._arrays_from_layout(handles, header, offset, writeable=True)
+            cls = FrameRing if kind == _KIND_RING else TraceMatrix
+            return cls(self.store_loc, name, *arrays)
+
+        if kind == _KIND_SPILLED:
+            key = bytes(header[1 : 1 + header[0]])
+            path = bytes(header[1 + header[0] :]).decode()
+            return _Spilled(path, key, bytes(entry))
+
+        return pickle.loads(handles.view[offset : offset + nbytes])
+
+    def _write(self, handles, kind, payload, offset, nbytes):
+        """Copy an encoded object into its reserved block"""
+        if kind == _KIND_PICKLE:
+            handles.view[offset : offset + nbytes] = payload
+            return
+
+        for array_offset, arr in payload:
+            dest = np.ndarray(
+                arr.shape,
+                dtype=arr.dtype,
+                buffer=handles.arena,
+                offset=offset + array_offset,
+            )
+            np.copyto(dest, arr)
+
+    def _layout_arrays(self, arrays):
+        """Place arrays one after the other in a block, each one aligned
+
+        Returns:
+            tuple: header describing the arrays,
+            list of (offset in block, array) pairs, size of the block
+        """
+        header = [_COUNT.pack(len(arrays))]
+        layout = []
+        nbytes = 0
+        for arr in arrays:
+            array_offset = -(-nbytes // self.ALIGNMENT) * self.ALIGNMENT
+            dtype = arr.dtype.str.encode()
+            header.append(
+                struct.pack("<QB", array_offset, arr.ndim)
+                + struct.pack("<{}Q".format(arr.ndim), *arr.shape)
+                + struct.pack("<B", len(dtype))
+                + dtype
+            )
+            layout.append((array_offset, arr))
+            nbytes = array_offset + arr.nbytes
+        return b"".join(header), layout, nbytes
+
+    def _arrays_from_layout(self, handles, header, offset, writeable=False):
+        """Views of the arrays described by a _layout_arrays header,
+        for a block at offset in the arena; read-only unless writeable
+        """
+        arrays = []
+        pos = 4
+        for _ in range(_COUNT.unpack_from(header)[0]):
+            array_offset, ndim = struct.unpack_from("<QB", header, pos)
+            pos += 9
+            shape = struct.unpack_from("<{}Q".format(ndim), header, pos)
+            pos += 8 * ndim
+            dtype_len = header[pos]
+            dtype = np.dtype(bytes(header[pos + 1 : pos + 1 + dtype_len]).decode())
+            pos += 1 + dtype_len
+            arr = np.ndarray(
+                shape, dtype=dtype, buffer=handles.arena, offset=offset + array_offset
+            )
+            arr.flags.writeable = writeable
+            arrays.append(arr)
+        return arrays
+
+    def _aligned(self, nbytes):
+        """Size of the block holding nbytes; blocks are never empty"""
+        return max(self.ALIGNMENT, -(-nbytes // self.ALIGNMENT) * self.ALIGNMENT)
+
+    def _reserve(self, handles, sizes):
+        """Take blocks for objects of the given sizes out of the free list
+        (first fit), all in one index transaction
+
+        Returns:
+            list: offsets of the blocks in the arena
+
+        Raises:
+            StoreFullError: if the blocks do not all fit;
+            nothing is reserved in that case
+        """
+        offsets = []
+        with handles.env.begin(write=True) as txn:
+            total = 0
+            with txn.cursor(db=handles.free) as cur:
+                for nbytes in sizes:
+                    size = self._aligned(nbytes)
+                    if not cur.first():
+                        raise StoreFullError(size, self.store_loc)
+                    while _SIZE.unpack(cur.value())[0] < size:
+                        if not cur.next():
+                            raise StoreFullError(size, self.store_loc)
+                    offset = _OFFSET.unpack(cur.key())[0]
+                    block = _SIZE.unpack(cur.value())[0]
+                    cur.delete()
+                    if block > size:
+                        txn.put(
+                            _OFFSET.pack(offset + size),
+                            _SIZE.pack(block - size),
+                            db=handles.free,
+                        )
+                    offsets.append(offset)
+                    total += size
+            used = _SIZE.unpack(txn.get(b"used", db=handles.meta))[0]
+            txn.put(b"used", _SIZE.pack(used + total), db=handles.meta)
+        return offsets
+
+    def _free(self, handles, blocks, txn=None):
+        """Return blocks, given as (offset, nbytes) pairs, to the free list,
+        merging each with its free neighbors
+        """
+        if txn is None:
+            with handles.env.begin(write=True) as txn:
+                return self._free(handles, blocks, txn=txn)
+
+        total = 0
+        with txn.cursor(db=handles.free) as cur:
+            for offset, nbytes in blocks:
+                size = self._aligned(nbytes)
+                total += size
+                # following block
+                if cur.set_key(_OFFSET.pack(offset + size)):
+                    size += _SIZE.unpack(cur.value())[0]
+                    cur.delete()
+                # preceding block
+                if cur.set_range(_OFFSET.pack(offset)):
+                    found = cur.prev()
+                else:
+                    found = cur.last()
+                if found:
+                    prev_offset = _OFFSET.unpack(cur.key())[0]
+                    prev_size = _SIZE.unpack(cur.value())[0]
+                    if prev_offset + prev_size == offset:
+                        offset, size = prev_offset, prev_size + size
+                txn.put(_OFFSET.pack(offset), _SIZE.pack(size), db=handles.free)
+        used = _SIZE.unpack(txn.get(b"used", db=handles.meta))[0]
+        txn.put(b"used", _SIZE.pack(used - total), db=handles.meta)
+
+    def _seal(self, handles, entries, consumers=None):
+        """Publish written objects in the index; readers can see them from now on,
+        and subscribers are notified.
+        Objects of streams with a retention policy are added to their window,
+        evicting the oldest objects that no longer fit.
+
+        Args:
+            entries (list): (object_id, name, kind, header, offset, nbytes) tuples
+            consumers (int): number of releaseID calls that free each object
+        """
+        now = time.time()
+        consumers = -1 if consumers is None else consumers
+        with handles.env.begin(write=True, db=handles.objects) as txn:
+            policies = {}
+            for key, record in txn.cursor(db=handles.retention):
+                policies[bytes(key)] = list(_RETENTION.unpack(record))
+
+            for object_id, object_name, kind, header, offset, nbytes in entries:
+                name = object_name.encode()
+                entry = _ENTRY.pack(offset, nbytes, now, consumers, kind, len(name))
+                txn.put(object_id.binary(), entry + name + header)
+
+                prefixes = [p for p in policies if name.startswith(p)]
+                if prefixes:
+                    prefix = max(prefixes, key=len)
+                    self._retain(handles, txn, prefix, policies[prefix], object_id)
+
+            for prefix, policy in policies.items():
+                txn.put(prefix, _RETENTION.pack(*policy), db=handles.retention)
+        self._publish(entries)
+
+    def _retain(self, handles, txn, prefix, policy, object_id):
+        """Append object_id to the window of prefix and evict what falls out
+
+        Args:
+            policy (list): unpacked _RETENTION record, updated in place
+        """
+        keep, first, last = policy[:3]
+        txn.put(
+            prefix + b"\0" + _OFFSET.pack(last), object_id.binary(), db=handles.window
+        )
+        last += 1
+        blocks = []
+        while last - first > keep:
+            key = prefix + b"\0" + _OFFSET.pack(first)
+            evicted_id = txn.pop(key, db=handles.window)
+            first += 1
+            # the object may have been deleted or released already
+            entry = txn.get(evicted_id, db=handles.objects)
+            if entry is not None:
+                policy[3] += 1
+                policy[4] += _ENTRY.unpack_from(entry)[1]
+                # a leased object may still be viewed by its consumers,
+                # so it is only freed when the last of them releases it
+                if _ENTRY.unpack_from(entry)[3] < 0:
+                    txn.delete(evicted_id, db=handles.objects)
+                    blocks.extend(self._dropped(entry))
+        if blocks:
+            self._free(handles, blocks, txn=txn)
+        policy[1], policy[2] = first, last
+
+
+# LMDB record: magic, flags, time, length of the name, length of the
+# dtype string, number of dimensions. The name, dtype string and shape
+# follow, then the payload at the next 8-byte boundary: the raw bytes
+# of an array, or the pickled object. Records without the magic are
+# pickled LMDBData from before the record format.
+_RECORD = struct.Struct("<2sBdHBB")
+_RECORD_MAGIC = b"IR"
+_RECORD_ARRAY = 1
+_RECORD_QUEUE = 2
+_DIM = struct.Struct("<Q")
+# The upper bits of the flags are the codec the payload is compressed with
+_CODEC_SHIFT = 4
+
+# Compression codecs: id in the record flags, default level,
+# compress(data, level) and decompress(data)
+_Codec = namedtuple("_Codec", ["id", "level", "compress", "decompress"])
+LMDB_CODECS = {
+    "zlib": _Codec(1, 1, zlib.compress, zlib.decompress),
+    "lzma": _Codec(
+        2, 0, lambda data, level: lzma.compress(data, preset=level), lzma.decompress
+    ),
+}
+if lz4 is not None:
+    LMDB_CODECS["lz4"] = _Codec(
+        3,
+        0,
+        lambda data, level: lz4.frame.compress(data, compression_level=level),
+        lz4.frame.decompress,
+    )
+if zstandard is not None:
+    LMDB_CODECS["zstd"] = _Codec(
+        4,
+        3,
+        lambda data, level: zstandard.ZstdCompressor(level).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+_CODEC_IDS = {codec.id: codec for codec in LMDB_CODECS.values()}
+
+# Segmented LMDB: one environment per segment, listed in the manifest
+_MANIFEST = "manifest.json"
+_MANIFEST_LOCK = "manifest.lock"
+
+# Secondary indexes, kept in named databases next to the records:
+# name, NUL, key; big-endian frame number, key; big-endian time, key.
+# The frame number is the number the object name ends with.
+_INDEX_NAME = b"__by_name__"
+_INDEX_FRAME = b"__by_frame__"
+_INDEX_TIME = b"__by_time__"
+_INDEX_NUMBER = struct.Struct(">Q")
+_INDEX_TIME_KEY = struct.Struct(">d")
+_FRAME_NUMBER = re.compile(r"(\d+)$")
+
+# Header of a record, read without touching its payload
+LMDBRecordInfo = namedtuple(
+    "LMDBRecordInfo", ["time", "name", "is_queue", "dtype", "shape"]
+)
+
+
+class LMDBStoreInterface(StoreInterface):
+    # Named databases holding the secondary indexes. Their names are
+    # keys of the main database, which are not records.
+    INDEXES = (_INDEX_NAME, _INDEX_FRAME, _INDEX_TIME)
+    # Start of records in the raw format, rather than pickled LMDBData
+    RECORD_MAGIC = _RECORD_MAGIC
+
+    def __init__(
+        self,
+        path="../outputs/",
+        name=None,
+        load=False,
+        max_size=1e12,
+        flush_immediately=False,
+        commit_freq=1,
+        commit_records=1000,
+        commit_bytes=2**26,
+        max_pending=10000,
+        overflow="block",
+        codecs=None,
+        segment_seconds=None,
+        segment_bytes=None,
+        handle_sigint=True,
+    ):
+        """
+        Constructor for LMDB store
+
+        Args:
+            path (string): Path to folder containing LMDB folder.
+            name (string): Name of LMDB. Required if not {load].
+            max_size (float):
+            Maximum size database may grow to; used to size the memory mapping.
+            If the database grows larger than map_size, a MapFullError will be raised.
+            On 64-bit there is no penalty for making this huge. Must be <2GB on 32-bit.
+            load (bool): For Replayer use. Informs the class that we're loading
+                    from a previous LMDB, not create a new one.
+            flush_immediately (bool): Save objects to disk immediately
+            commit_freq (int): If not flush_immediately,
+                            flush data to disk every {commit_freq} seconds.
+            commit_records (int): Commit as soon as this many objects are pending.
+            commit_bytes (int): Commit as soon as this many bytes are pending.
+            max_pending (int): Most objects waiting to be committed.
+            overflow (str): When max_pending objects are waiting, "block"
+                        puts until the writer catches up, or "drop" new objects.
+            codecs (dict): Compression codec for objects whose names start
+                        with each prefix, see set_codec.
+            segment_seconds (float): Roll over to a new LMDB environment
+                        (segment) after this many seconds.
+            segment_bytes (int): Roll over to a new segment once the
+                        current one holds this many bytes. If either is set,
+                        the LMDB folder holds the segments and a manifest
+                        listing them, and reads look in every segment.
+            handle_sigint (bool): Flush on SIGINT. Off for stores opened
+                        on behalf of another store, whose process keeps
+                        its own handler.
+        """
+        if overflow not in ("block", "drop"):
+            raise ValueError(
+                "overflow must be 'block' or 'drop', not {}".format(overflow)
+            )
+
+        # Check if LMDB folder exists.
+        # LMDB path?
+        path = Path(path)
+        if load:
+            if name is not None:
+                path = path / name
+            segmented = (path / _MANIFEST).exists()
+            if not segmented and not (path / "data.mdb").exists():
+                raise FileNotFoundError("Invalid LMDB directory.")
+        else:
+            assert name is not None
+            if not path.exists():
+                path.mkdir(parents=True)
+            path = path / name
+            segmented = segment_seconds is not None or segment_bytes is not None
+
+        self.path = path
+        self.flush_immediately = flush_immediately
+        self.max_size = int(max_size)
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        # Segments, oldest first, as listed in the manifest; None if not segmented
+        self._segments = None
+        self._segment_envs = {}
+        self._manifest_mtime = None
+        self.load = load
+        # Index databases of each environment; None for LMDBs written
+        # before the indexes were kept, which are scanned instead
+        self._index_dbs = {}
+        if segmented:
+            if not load:
+                path.mkdir(exist_ok=True)
+                with self._manifest() as manifest:
+                    if not manifest["segments"]:
+                        LMDBStoreInterface._add_segment(manifest)
+            self._refresh_segments()
+        else:
+            self.lmdb_env = self._open_env(path)
+        self.lmdb_commit_freq = commit_freq
+        self.commit_records = commit_records
+        self.commit_bytes = commit_bytes
+        self.overflow = overflow
+
+        self.put_queue = Queue(maxsize=max_pending)
+        self.put_queue_container = make_dataclass(
+            "LMDBPutContainer",
+            [
+                ("name", str),
+                ("obj", bytes),
+                ("time", float),
+                ("codec", tuple),
+                ("obj_name", str),
+            ],
+        )
+        self._pending_bytes = 0
+        self._pending_lock = Lock()
+        self._commit_lock = Lock()
+        self._commit_event = Event()
+        self._stats = {
+            "commits": 0,
+            "records_written": 0,
+            "bytes_put": 0,
+            "bytes_written": 0,
+            "dropped": 0,
+            "last_commit_latency": 0.0,
+            "max_commit_latency": 0.0,
+            "last_lag": 0.0,
+            "max_lag": 0.0,
+        }
+        self._started = time.time()
+        # Latest version of each name this interface replaced
+        self._versions = {}
+        self._version_lock = Lock()
+        self._codecs = {}
+        for prefix, codec in (codecs or {}).items():
+            self.set_codec(prefix, codec)
+        # Initialize only after interpreter has forked at the start of each actor.
+        self.commit_thread: Thread = None
+        # signal handlers can only be set from the main thread
+        if handle_sigint and current_thread() is main_thread():
+            signal.signal(signal.SIGINT, self.flush)
+
+    def get(
+        self,
+        key: Union["ObjectID", bytes, List["ObjectID"], List[bytes]],
+        include_metadata=False,
+    ):
+        """
+        Get object using key (any byte string or object id with a binary() method)
+
+        Args:
+            key:
+            include_metadata (bool): returns whole LMDBData if true else LMDBData.obj
+                                (just the stored object).
+        Returns:
+            object or LMDBData
+        """
+        while True:
+            try:
+                if not isinstance(key, (list, tuple)):
+                    return self._get_one(
+                        LMDBStoreInterface._convert_obj_id_to_bytes(key),
+                        include_metadata,
+                    )
+                return self._get_batch(
+                    list(map(LMDBStoreInterface._convert_obj_id_to_bytes, key)),
+                    include_metadata,
+                )
+            except (
+                lmdb.BadRslotError
+            ):  # Happens when multiple transactions access LMDB at the same time.
+                pass
 
     def _get_one(self, key, include_metadata):
-        with self.lmdb_env.begin() as txn:
-            r = txn.get(key)
+        for env in self._envs():
+            with env.begin() as txn:
+                r = txn.get(key)
+            if r is not None:
+                break
 
         if r is None:
             return None
-        return pickle.loads(r) if include_metadata else pickle.loads(r).obj
+        data = LMDBStoreInterface.decode_record(r)
+        return data if include_metadata else data.obj
 
     def _get_batch(self, keys, include_metadata):
-        with self.lmdb_env.begin() as txn:
-            objs = [txn.get(key) for key in keys]
-
+        objs = [None] * len(keys)
+        for env in self._envs():
+            with env.begin() as txn:
+                for i, key in enumerate(keys):
+                    if objs[i] is None:
+                        objs[i] = txn.get(key)
+
+        data = [
+            LMDBStoreInterface.decode_record(obj) for obj in objs if obj is not None
+        ]
         if include_metadata:
-            return [pickle.loads(obj) for obj in objs if obj is not None]
+            return data
         else:
-            return [pickle.loads(obj).obj for obj in objs if obj is not None]
+            return [d.obj for d in data]
+
+    @contextmanager
+    def view(self, key, include_metadata=False):
+        """
+        Read an object in place: arrays are backed by the LMDB pages
+        rather than copied out of them, and are only valid inside the block
+
+        Args:
+            key: key or object id of the object
+            include_metadata (bool): yields whole LMDBData if true
+
+        Yields:
+            object or LMDBData, arrays read-only
+
+        Raises:
+            ObjectNotFoundError: If the key is not found
+        """
+        for env in self._envs():
+            with env.begin(buffers=True) as txn:
+                r = txn.get(LMDBStoreInterface._convert_obj_id_to_bytes(key))
+                if r is not None:
+                    data = LMDBStoreInterface.decode_record(r)
+                    yield data if include_metadata else data.obj
+                    return
+        raise ObjectNotFoundError(key)
+
+    def get_metadata(
+        self, key: Union["ObjectID", bytes, List["ObjectID"], List[bytes]]
+    ):
+        """
+        Get the time, name, dtype and shape an object was stored with,
+        reading only the header of its record
+
+        Args:
+            key: key or object id, or a list of them
+
+        Returns:
+            LMDBRecordInfo, or a list of them for the keys found
+        """
+        single = not isinstance(key, (list, tuple))
+        keys = [key] if single else key
+        keys = list(map(LMDBStoreInterface._convert_obj_id_to_bytes, keys))
+        found = [None] * len(keys)
+        for env in self._envs():
+            with env.begin(buffers=True) as txn:
+                for i, k in enumerate(keys):
+                    if found[i] is None:
+                        r = txn.get(k)
+                        if r is not None:
+                            found[i] = LMDBStoreInterface.decode_record_info(r)
+        infos = [info for info in found if info is not None]
+        if single:
+            return infos[0] if infos else None
+        return infos
 
     def get_keys(self):
-        """Get all keys in LMDB"""
-        with self.lmdb_env.begin() as txn:
-            with txn.cursor() as cur:
-                cur.first()
-                return [key for key in cur.iternext(values=False)]
+        """Get all keys in LMDB, in every segment"""
+        keys = []
+        for env in reversed(self._envs()):
+            with env.begin() as txn:
+                with txn.cursor() as cur:
+                    cur.first()
+                    keys.extend(
+                        key
+                        for key in cur.iternext(values=False)
+                        if key not in LMDBStoreInterface.INDEXES
+                    )
+        return keys
 
     def put(self, obj, obj_name, obj_id=None, flush_this_immediately=False):
         """
@@ -437,52 +2796,166 @@ class LMDBStoreInterface(StoreInterface):
             None
         """
         # TODO: Duplication check
+        self._put_record(
+            self.key(obj_name, obj_id), obj, obj_name, flush_this_immediately
+        )
+
+    def _put_record(self, name, obj, obj_name, flush_this_immediately=False):
+        """Queue obj to be committed under key name
+
+        Returns:
+            bool: whether obj was queued, False if it was dropped
+        """
         if self.commit_thread is None:
             self.commit_thread = Thread(target=self.commit_daemon, daemon=True)
             self.commit_thread.start()
 
-        if obj_name.startswith("q_") or obj_name.startswith("config"):  # Queue
-            name = obj_name.encode()
-            is_queue = True
-        else:
-            name = obj_id.binary() if obj_id is not None else obj_name.encode()
-            is_queue = False
-
-        self.put_queue.put(
-            self.put_queue_container(
-                name=name,
-                obj=pickle.dumps(
-                    LMDBData(obj, time=time.time(), name=obj_name, is_queue=is_queue)
-                ),
-            )
+        is_queue = obj_name.startswith("q_") or obj_name.startswith("config")
+        t = time.time()
+        container = self.put_queue_container(
+            name=name,
+            obj=LMDBStoreInterface.encode_record(obj, t, obj_name, is_queue),
+            time=t,
+            codec=self.get_codec(obj_name),
+            obj_name=obj_name,
         )
 
+        if self.put_queue.full():
+            self._commit_event.set()
+        if self.overflow == "block":
+            self.put_queue.put(container)
+        else:
+            try:
+                self.put_queue.put_nowait(container)
+            except Full:
+                self._stats["dropped"] += 1
+                if self._stats["dropped"] == 1:
+                    logger.warning(
+                        "LMDB writer is falling behind, dropping {}".format(obj_name)
+                    )
+                return False
+        with self._pending_lock:
+            self._pending_bytes += len(container.obj)
+            pending_bytes = self._pending_bytes
+        if (
+            self.put_queue.qsize() >= self.commit_records
+            or pending_bytes >= self.commit_bytes
+        ):
+            self._commit_event.set()
+
         # Write
         if self.flush_immediately or flush_this_immediately:
             self.commit()
             self.lmdb_env.sync()
+        return True
 
     def flush(self, sig=None, frame=None):
         """Must run before exiting. Flushes buffer to disk."""
-        self.commit()
-        self.lmdb_env.sync()
-        self.lmdb_env.close()
+        self.close()
         exit(0)
 
+    def close(self):
+        """Commit pending objects, write them to disk and close the LMDB"""
+        self.commit()
+        for env in self._segment_envs.values() if self._segments else [self.lmdb_env]:
+            env.sync()
+            env.close()
+        self._segment_envs = {}
+        self._index_dbs = {}
+
     def commit_daemon(self):
         time.sleep(2 * random())  # Reduce multiple commits at the same time.
         while True:
-            time.sleep(self.lmdb_commit_freq)
+            # Commit every commit_freq seconds, or sooner if put asks to
+            self._commit_event.wait(self.lmdb_commit_freq)
+            self._commit_event.clear()
             self.commit()
 
     def commit(self):
-        """Commit objects in {self.put_cache} into LMDB."""
-        if not self.put_queue.empty():
-            print(self.put_queue.qsize())
-            with self.lmdb_env.begin(write=True) as txn:
-                while not self.put_queue.empty():
-                    container = self.put_queue.get_nowait()
-                    txn.put(container.name, container.obj, overwrite=True)
+        """Commit objects in {self.put_queue} into LMDB, in one transaction."""
+        with self._commit_lock:
+            # Objects put while committing wait for the next commit
+            n = self.put_queue.qsize()
+            if n == 0:
+                return
+            if self._segments is not None:
+                self._roll_over()
+            start = time.perf_counter()
+            containers = [self.put_queue.get_nowait() for _ in range(n)]
+            nbytes = sum(len(container.obj) for container in containers)
+            try:
+                # Compress here rather than in put, off the acquisition thread
+                records = [
+                    (
+                        LMDBStoreInterface.compress_record(
+                            container.obj, *container.codec
+                        )
+                        if container.codec is not None
+                        else container.obj
+                    )
+                    for container in containers
+                ]
+                indexes = self._index_dbs[self.lmdb_env]
+                with self.lmdb_env.begin(write=True) as txn:
+                    for container, record in zip(containers, records):
+                        old = txn.get(container.name)
+                        if old is not None:
+                            LMDBStoreInterface._unindex(
+                                txn, indexes, container.name, old
+                            )
+                        txn.put(container.name, record, overwrite=True)
+                        LMDBStoreInterface._index(
+                            txn,
+                            indexes,
+                            container.name,
+                            container.obj_name,
+                            container.time,
+                        )
+            except Exception as e:
+                # The objects are out of the queue; count them as dropped
+                # rather than retry a write that may keep failing
+                logger.error("Could not commit {} objects to LMDB: {}".format(n, e))
+                self._stats["dropped"] += n
+                return
+            finally:
+                with self._pending_lock:
+                    self._pending_bytes -= nbytes
+            latency = time.perf_counter() - start
+            oldest = containers[0].time
+            lag = time.time() - oldest
+
+            stats = self._stats
+            stats["commits"] += 1
+            stats["records_written"] += n
+            stats["bytes_put"] += nbytes
+            stats["bytes_written"] += sum(len(record) for record in records)
+            stats["last_commit_latency"] = latency
+            stats["max_commit_latency"] = max(stats["max_commit_latency"], latency)
+            stats["last_lag"] = lag
+            stats["max_lag"] = max(stats["max_lag"], lag)
+
+    def get_write_stats(self):
+        """
+        How the writer is keeping up with puts
+
+        Returns:
+            dict of the objects and bytes pending, written and dropped,
+            the bytes put before compression,
+            the number of commits, the latest and longest commit
+            latency and lag (seconds from put to commit of the oldest
+            object in a commit), the age of the oldest pending object
+            and the bytes written per second since the store was opened
+        """
+        stats = dict(self._stats)
+        stats["pending"] = self.put_queue.qsize()
+        with self._pending_lock:
+            stats["pending_bytes"] = self._pending_bytes
+        try:
+            stats["lag"] = time.time() - self.put_queue.queue[0].time
+        except IndexError:
+            stats["lag"] = 0.0
+        stats["throughput"] = stats["bytes_written"] / (time.time() - self._started)
+        return stats
 
     def delete(self, obj_id):
         """
@@ -497,10 +2970,534 @@ class LMDBStoreInterface(StoreInterface):
         Raises:
             ObjectNotFoundError: If the id is not found
         """
-        with self.lmdb_env.begin(write=True) as txn:
-            out = txn.pop(LMDBStoreInterface._convert_obj_id_to_bytes(obj_id))
-        if out is None:
-            raise ObjectNotFoundError
+        key = LMDBStoreInterface._convert_obj_id_to_bytes(obj_id)
+        for env in self._envs():
+            with env.begin(write=True) as txn:
+                out = txn.pop(key)
+                if out is not None:
+                    LMDBStoreInterface._unindex(txn, self._index_dbs[env], key, out)
+            if out is not None:
+                return
+        raise ObjectNotFoundError(obj_id)
+
+    def keys_by_name(self, prefix):
+        """
+        Keys of the objects whose names start with prefix,
+        found with the name index rather than a scan of all keys
+
+        Args:
+            prefix (str): start of the object names
+
+        Returns:
+            list of keys, in order of name
+        """
+        return self._index_lookup(_INDEX_NAME, prefix)
+
+    def keys_by_frame(self, start, stop=None):
+        """
+        Keys of the objects whose names end with a frame number in
+        [start, stop), found with the frame index
+
+        Args:
+            start (int): first frame number
+            stop (int): frame number after the last one, None for just start
+
+        Returns:
+            list of keys, in order of frame number
+        """
+        return self._index_lookup(
+            _INDEX_FRAME, start, start + 1 if stop is None else stop
+        )
+
+    def keys_by_time(self, start=None, stop=None):
+        """
+        Keys of the objects stored between times start and stop,
+        found with the time index
+
+        Args:
+            start (float): earliest time, None for no limit
+            stop (float): time after the latest one, None for no limit
+
+        Returns:
+            list of keys, in order of time
+        """
+        return self._index_lookup(_INDEX_TIME, start, stop)
+
+    @staticmethod
+    def index_keys(txn, db, index, start=None, stop=None):
+        """
+        Keys found in one index of an LMDB environment
+
+        Args:
+            txn: transaction on the environment
+            db: the index database, opened in the environment
+            index: one of INDEXES
+            start: name prefix, first frame number or earliest time
+            stop: frame number or time after the last one, None for no limit
+
+        Returns:
+            list of keys, in order of the index
+        """
+        return [
+            LMDBStoreInterface._index_key(index, entry)
+            for entry in LMDBStoreInterface._index_scan(txn, db, index, start, stop)
+        ]
+
+    def reindex(self):
+        """Rebuild the indexes from the record headers, for LMDBs
+        written before they were kept"""
+        self.commit()
+        for env in self._envs():
+            if self._index_dbs[env] is None:
+                self._index_dbs[env] = {
+                    db: env.open_db(db) for db in LMDBStoreInterface.INDEXES
+                }
+            indexes = self._index_dbs[env]
+            with env.begin(write=True, buffers=True) as txn:
+                for db in indexes.values():
+                    txn.drop(db, delete=False)
+                records = []
+                with txn.cursor() as cur:
+                    for key, record in cur:
+                        if bytes(key) not in LMDBStoreInterface.INDEXES:
+                            info = LMDBStoreInterface.decode_record_info(record)
+                            records.append((bytes(key), info.name, info.time))
+                for key, name, t in records:
+                    LMDBStoreInterface._index(txn, indexes, key, name, t)
+
+    def _open_env(self, path):
+        """Open an LMDB environment and its indexes. A loaded LMDB whose
+        records were written without indexes is left without them, rather
+        than given empty ones"""
+        env = lmdb.open(
+            path.as_posix(),
+            map_size=self.max_size,
+            sync=self.flush_immediately,
+            max_dbs=len(LMDBStoreInterface.INDEXES),
+        )
+        try:
+            indexes = {
+                db: env.open_db(db, create=False) for db in LMDBStoreInterface.INDEXES
+            }
+        except lmdb.NotFoundError:
+            indexes = None
+            if not self.load or not env.stat()["entries"]:
+                indexes = {db: env.open_db(db) for db in LMDBStoreInterface.INDEXES}
+        self._index_dbs[env] = indexes
+        return env
+
+    def _index_lookup(self, index, start=None, stop=None):
+        """Keys found in an index of every segment, in order of the index"""
+        entries = []
+        for env in self._envs():
+            indexes = self._index_dbs[env]
+            with env.begin() as txn:
+                if indexes is None:
+                    entries.extend(
+                        LMDBStoreInterface._record_scan(txn, index, start, stop)
+                    )
+                else:
+                    entries.extend(
+                        LMDBStoreInterface._index_scan(
+                            txn, indexes[index], index, start, stop
+                        )
+                    )
+        keys = []
+        for entry in sorted(entries):
+            key = LMDBStoreInterface._index_key(index, entry)
+            if key not in keys[-1:]:
+                keys.append(key)
+        return keys
+
+    @staticmethod
+    def _index_bounds(index, start=None, stop=None):
+        """Name prefix, first and stop index entries of a lookup"""
+        prefix = None
+        if index == _INDEX_NAME:
+            prefix = start = (start or "").encode()
+        else:
+            pack = (_INDEX_NUMBER if index == _INDEX_FRAME else _INDEX_TIME_KEY).pack
+            start = b"" if start is None else pack(start)
+            stop = None if stop is None else pack(stop)
+        return prefix, start, stop
+
+    @staticmethod
+    def _index_scan(txn, db, index, start=None, stop=None):
+        """Index entries from start up to stop, or starting with a name prefix"""
+        prefix, start, stop = LMDBStoreInterface._index_bounds(index, start, stop)
+        entries = []
+        with txn.cursor(db=db) as cur:
+            if not cur.set_range(start):
+                return entries
+            for entry in cur.iternext(values=False):
+                if prefix is not None and not entry.startswith(prefix):
+                    break
+                if stop is not None and entry >= stop:
+                    break
+                entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _record_scan(txn, index, start=None, stop=None):
+        """The index entries _index_scan would find, made from the record
+        headers of an LMDB without indexes"""
+        prefix, start, stop = LMDBStoreInterface._index_bounds(index, start, stop)
+        entries = []
+        with txn.cursor() as cur:
+            for key, record in cur:
+                info = LMDBStoreInterface.decode_record_info(record)
+                for db, entry in LMDBStoreInterface._index_entries(
+                    key, info.name or "", info.time
+                ):
+                    if (
+                        db == index
+                        and entry >= start
+                        and (prefix is None or entry.startswith(prefix))
+                        and (stop is None or entry < stop)
+                    ):
+                        entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _index_key(index, entry):
+        """Key of the record an index entry points to"""
+        if index == _INDEX_NAME:
+            return entry[entry.index(b"\0") + 1 :]
+        return entry[8:]  # after the frame number or time
+
+    @staticmethod
+    def _index_entries(key, name, t):
+        entries = [
+            (_INDEX_NAME, name.encode() + b"\0" + key),
+            (_INDEX_TIME, _INDEX_TIME_KEY.pack(t) + key),
+        ]
+        frame = _FRAME_NUMBER.search(name)
+        # Numbers too big for the index are not frame numbers; leave them out
+        # rather than fail the whole commit
+        if frame is not None and int(frame.group(1)) < 2**64:
+            entries.append(
+                (_INDEX_FRAME, _INDEX_NUMBER.pack(int(frame.group(1))) + key)
+            )
+        return entries
+
+    @staticmethod
+    def _index(txn, indexes, key, name, t):
+        if indexes is None:
+            return  # an LMDB from before the indexes, see reindex
+        for db, entry in LMDBStoreInterface._index_entries(key, name or "", t):
+            txn.put(entry, b"", db=indexes[db])
+
+    @staticmethod
+    def _unindex(txn, indexes, key, record):
+        """Remove the index entries of a record about to be replaced or deleted"""
+        if indexes is None or bytes(record[:2]) != _RECORD_MAGIC:
+            return  # records from before the indexes
+        info = LMDBStoreInterface.decode_record_info(record)
+        for db, entry in LMDBStoreInterface._index_entries(key, info.name, info.time):
+            txn.delete(entry, db=indexes[db])
+
+    def get_segments(self):
+        """
+        Segments of a segmented LMDB, as listed in its manifest
+
+        Returns:
+            list of dicts with the name, start and end time of each
+            segment, oldest first (the end of the current one is None),
+            or None if the LMDB is not segmented
+        """
+        if self._segments is None:
+            return None
+        self._refresh_segments()
+        return [dict(segment) for segment in self._segments]
+
+    @staticmethod
+    def segment_paths(path):
+        """
+        LMDB environments an LMDB folder is made of: the folder itself,
+        or the segments listed in its manifest that are still there
+
+        Args:
+            path: the LMDB folder
+
+        Returns:
+            list of paths, oldest first
+        """
+        path = Path(path)
+        if not (path / _MANIFEST).exists():
+            return [path]
+        with open(path / _MANIFEST) as f:
+            segments = json.load(f)["segments"]
+        return [
+            path / segment["name"]
+            for segment in segments
+            if (path / segment["name"] / "data.mdb").exists()
+        ]
+
+    def _envs(self):
+        """Environments to read from, newest first"""
+        if self._segments is None:
+            return [self.lmdb_env]
+        self._refresh_segments()
+        envs = []
+        for segment in reversed(self._segments):
+            env = self._segment_env(segment["name"])
+            if env is not None:
+                envs.append(env)
+        return envs
+
+    def _segment_env(self, name):
+        """Open the environment of a segment, None if it has been moved away"""
+        env = self._segment_envs.get(name)
+        if env is None:
+            if (
+                name != self._segments[-1]["name"]
+                and not (self.path / name / "data.mdb").exists()
+            ):
+                return None
+            env = self._open_env(self.path / name)
+            self._segment_envs[name] = env
+        return env
+
+    def _refresh_segments(self):
+        """Reread the manifest if it changed, and write to the newest segment"""
+        mtime = os.stat(self.path / _MANIFEST).st_mtime_ns
+        if mtime == self._manifest_mtime:
+            return
+        with open(self.path / _MANIFEST) as f:
+            self._segments = json.load(f)["segments"]
+        self._manifest_mtime = mtime
+        self.lmdb_env = self._segment_env(self._segments[-1]["name"])
+
+    def _roll_over(self):
+        """Start a new segment if the current one is old or big enough"""
+        self._refresh_segments()
+        segment = self._segments[-1]
+        info = self.lmdb_env.info()
+        size = (info["last_pgno"] + 1) * self.lmdb_env.stat()["psize"]
+        if not (
+            self.segment_seconds is not None
+            and time.time() - segment["start"] >= self.segment_seconds
+            or self.segment_bytes is not None
+            and size >= self.segment_bytes
+        ):
+            return
+        with self._manifest() as manifest:
+            # Another process may have rolled over first
+            if manifest["segments"][-1]["name"] == segment["name"]:
+                LMDBStoreInterface._add_segment(manifest)
+        self.lmdb_env.sync()
+        self._refresh_segments()
+
+    @contextmanager
+    def _manifest(self):
+        """Read the manifest, and write back changes to it, locked
+        against other processes writing to the same LMDB"""
+        with open(self.path / _MANIFEST_LOCK, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.path / _MANIFEST) as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                manifest = {
+                    "segment_seconds": self.segment_seconds,
+                    "segment_bytes": self.segment_bytes,
+                    "segments": [],
+                }
+            yield manifest
+            # Replace the manifest at once so readers never see it half written
+            tmp = self.path / (_MANIFEST + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, self.path / _MANIFEST)
+
+    @staticmethod
+    def _add_segment(manifest):
+        segments = manifest["segments"]
+        now = time.time()
+        if segments:
+            segments[-1]["end"] = now
+        segments.append(
+            {"name": "segment_{:05d}".format(len(segments)), "start": now, "end": None}
+        )
+
+    @staticmethod
+    def key(obj_name, obj_id=None):
+        """Key an object put with obj_name and obj_id is stored under"""
+        if obj_name.startswith("q_") or obj_name.startswith("config"):  # Queue
+            return obj_name.encode()
+        return obj_id.binary() if obj_id is not None else obj_name.encode()
+
+    def set_codec(self, prefix, codec, level=None):
+        """
+        Compress objects whose names start with prefix. An object
+        matching several prefixes uses the codec of the longest one.
+
+        Args:
+            prefix (str): start of the object names
+            codec (str): "none", or a name in LMDB_CODECS: "zlib", "lzma",
+                and "lz4" or "zstd" if installed
+            level (int): compression level, None for the codec's default
+
+        Raises:
+            ValueError: If the codec is not available
+        """
+        if codec == "none" or codec is None:
+            self._codecs[prefix] = None
+            return
+        if codec not in LMDB_CODECS:
+            raise ValueError(
+                "Unknown codec {}, available: {}".format(codec, sorted(LMDB_CODECS))
+            )
+        self._codecs[prefix] = (codec, level)
+
+    def get_codec(self, obj_name):
+        """
+        Codec and level objects named obj_name are compressed with
+
+        Returns:
+            (codec, level), or None if they are not compressed
+        """
+        matches = [prefix for prefix in self._codecs if obj_name.startswith(prefix)]
+        if not matches:
+            return None
+        return self._codecs[max(matches, key=len)]
+
+    @staticmethod
+    def encode_record(obj, t, name, is_queue=False):
+        """
+        Record an object is stored as: a header with its metadata, then
+        the raw bytes of an array or, for any other object, its pickle
+
+        Args:
+            obj: object to be saved
+            t (float): time the object was saved
+            name (str): the name of the object
+            is_queue (bool): whether the object came from a queue
+
+        Returns:
+            bytes of the record
+        """
+        flags = _RECORD_QUEUE if is_queue else 0
+        name = (name or "").encode()
+        if (
+            isinstance(obj, np.ndarray)
+            and not obj.dtype.hasobject
+            and obj.dtype.names is None
+        ):
+            flags |= _RECORD_ARRAY
+            dtype = obj.dtype.str.encode()
+            shape = obj.shape
+            payload = np.ascontiguousarray(obj).reshape(-1).view(np.uint8).data
+        else:
+            dtype = b""
+            shape = ()
+            payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+        header = b"".join(
+            [
+                _RECORD.pack(
+                    _RECORD_MAGIC, flags, t, len(name), len(dtype), len(shape)
+                ),
+                name,
+                dtype,
+            ]
+            + [_DIM.pack(n) for n in shape]
+        )
+        return b"".join([header, bytes(-len(header) % 8), payload])
+
+    @staticmethod
+    def compress_record(record, codec, level=None):
+        """
+        Compress the payload of a record, leaving its header readable
+
+        Args:
+            record: bytes of an uncompressed record
+            codec (str): a name in LMDB_CODECS
+            level (int): compression level, None for the codec's default
+
+        Returns:
+            bytes of the compressed record
+        """
+        codec = LMDB_CODECS[codec]
+        _, start = LMDBStoreInterface._read_header(record)
+        payload = codec.compress(
+            memoryview(record)[start:], codec.level if level is None else level
+        )
+        header = bytearray(record[:start])
+        header[2] |= codec.id << _CODEC_SHIFT  # flags
+        return b"".join([header, payload])
+
+    @staticmethod
+    def decode_record_info(record):
+        """
+        Metadata of a record, without decoding its payload
+
+        Args:
+            record: bytes or buffer of the record
+
+        Returns:
+            LMDBRecordInfo
+        """
+        if bytes(record[:2]) != _RECORD_MAGIC:
+            data = pickle.loads(record)
+            obj = data.obj
+            if isinstance(obj, np.ndarray):
+                return LMDBRecordInfo(
+                    data.time, data.name, data.is_queue, obj.dtype, obj.shape
+                )
+            return LMDBRecordInfo(data.time, data.name, data.is_queue, None, ())
+        info, _ = LMDBStoreInterface._read_header(record)
+        return info
+
+    @staticmethod
+    def decode_record(record):
+        """
+        Object and metadata of a record. Arrays are read-only views
+        of the record rather than copies.
+
+        Args:
+            record: bytes or buffer of the record
+
+        Returns:
+            LMDBData
+        """
+        if bytes(record[:2]) != _RECORD_MAGIC:
+            return pickle.loads(record)
+        info, start = LMDBStoreInterface._read_header(record)
+        payload = memoryview(record)[start:]
+        codec = record[2] >> _CODEC_SHIFT
+        if codec:
+            try:
+                payload = _CODEC_IDS[codec].decompress(payload)
+            except KeyError:
+                raise ValueError(
+                    "Record for {} was compressed with a codec "
+                    "that is not installed".format(info.name)
+                )
+        if info.dtype is None:
+            obj = pickle.loads(payload)
+        else:
+            obj = np.frombuffer(payload, dtype=info.dtype).reshape(info.shape)
+        return LMDBData(obj, time=info.time, name=info.name, is_queue=info.is_queue)
+
+    @staticmethod
+    def _read_header(record):
+        """Metadata of a record and the offset of its payload"""
+        _, flags, t, name_len, dtype_len, ndim = _RECORD.unpack_from(record)
+        start = _RECORD.size
+        name = bytes(record[start : start + name_len]).decode()
+        start += name_len
+        dtype = None
+        if flags & _RECORD_ARRAY:
+            dtype = np.dtype(bytes(record[start : start + dtype_len]).decode())
+        start += dtype_len
+        shape = tuple(
+            _DIM.unpack_from(record, start + i * _DIM.size)[0] for i in range(ndim)
+        )
+        start += ndim * _DIM.size
+        start += -start % 8
+        info = LMDBRecordInfo(t, name, bool(flags & _RECORD_QUEUE), dtype, shape)
+        return info, start
 
     @staticmethod
     def _convert_obj_id_to_bytes(obj_id):
@@ -509,15 +3506,191 @@ class LMDBStoreInterface(StoreInterface):
         except AttributeError:
             return obj_id
 
-    def replace(self):
-        pass  # TODO
+    def replace(self, object, object_name):
+        """
+        Save object as the next version of object_name, and commit it.
+        Every version stays in the LMDB, for the record of a session,
+        under the name and version number (see get_version).
+
+        Args:
+            object:
+            object_name (str):
+
+        Returns:
+            int: the new version number, counting from 1;
+            None if the object was dropped
+        """
+        with self._version_lock:
+            version = self._versions.get(object_name)
+            if version is None:
+                keys = self._version_keys(object_name)
+                version = self._key_version(keys[-1]) if keys else 0
+            version += 1
+            key = self._version_key(object_name, version)
+            if not self._put_record(key, object, object_name):
+                return None
+            self._versions[object_name] = version
+        self.commit()
+        return version
+
+    def get_version(self, object_name, version=None):
+        """
+        Get a version of an object saved with replace
+
+        Args:
+            object_name (str):
+            version (int): the version, None for the latest
+
+        Returns:
+            the object
+
+        Raises:
+            ObjectNotFoundError: If the version is not in the LMDB
+        """
+        if version is None:
+            keys = self._version_keys(object_name)
+            key = keys[-1] if keys else None
+        else:
+            key = self._version_key(object_name, version)
+        data = None if key is None else self.get(key, include_metadata=True)
+        if data is None:
+            raise ObjectNotFoundError("{}@{}".format(object_name, version))
+        return data.obj
+
+    @staticmethod
+    def _version_key(object_name, version):
+        """Key of a version saved with replace: name, NUL, big-endian version"""
+        return object_name.encode() + b"\0" + _INDEX_NUMBER.pack(version)
+
+    @staticmethod
+    def _key_version(key):
+        return _INDEX_NUMBER.unpack(key[-_INDEX_NUMBER.size :])[0]
+
+    def _version_keys(self, object_name):
+        """Keys of the saved versions of object_name, oldest first,
+        from the name index entries of the name alone"""
+        prefix = object_name.encode() + b"\0"
+        return [
+            key
+            for key in self.keys_by_name(object_name + "\0")
+            if key.startswith(prefix) and len(key) == len(prefix) + _INDEX_NUMBER.size
+        ]
 
     def subscribe(self):
-        pass  # TODO
+        """Nothing to subscribe to: LMDB does not notify of new records,
+        which readers find with keys_by_time instead"""
+        pass
+
+
+class AsyncStoreInterface:
+    """Asyncio client for a plasma or shared memory store.
+    Puts and gets run in a pool of worker threads, each with its own
+    connection to the store, so copies into and out of the store
+    do not block the event loop and several requests can be outstanding.
+    """
+
+    def __init__(self, store, max_workers=4):
+        """
+        Constructor for the AsyncStoreInterface
+
+        :param store: a connected PlasmaStoreInterface or
+            SharedMemoryStoreInterface, whose store the workers connect to
+        :param max_workers: number of requests served at once
+        """
+        self.store = store
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="{}_store".format(store.name)
+        )
+        self._local = local()
+        self._worker_stores = []
+
+    async def put_async(self, object, object_name, consumers=None):
+        """
+        Put a single object referenced by its string name into the store
+
+        Args:
+            consumers (int): number of consumers the object is leased to,
+                see SharedMemoryStoreInterface.put
+
+        Returns:
+            id of the object, None if it was not stored
+        """
+        return await self._run(
+            lambda store: store.put(object, object_name, consumers=consumers)
+        )
+
+    async def get_async(self, obj_id, timeout=None):
+        """
+        Get object by object ID, waiting for it to be sealed if needed
+
+        Args:
+            obj_id: the id of the object
+            timeout (float): seconds to wait, None to wait forever
+
+        Raises:
+            ObjectNotFoundError: If the id is not found in time
+        """
+        return await self._run(lambda store: store.getID(obj_id, timeout=timeout))
+
+    async def get_many_async(self, ids, timeout=None):
+        """
+        Get several objects by object ID, all requested at once
 
+        Returns:
+            list of the objects, in the order of ids
+
+        Raises:
+            ObjectNotFoundError: If one of the ids is not found in time
+        """
+        return await asyncio.gather(*(self.get_async(i, timeout) for i in ids))
+
+    def close(self):
+        """Wait for outstanding requests, then stop the workers"""
+        self._executor.shutdown(wait=True)
+        for store in self._worker_stores:
+            store.release()
+        self._worker_stores = []
+
+    async def _run(self, request):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: request(self._worker_store())
+        )
+
+    def _worker_store(self):
+        """Connection to the store for the current worker thread"""
+        store = getattr(self._local, "store", None)
+        if store is None:
+            store = type(self.store)(self.store.name, self.store.store_loc)
+            if self.store.use_hdd:
+                store.use_hdd = True
+                store.lmdb_store = self.store.lmdb_store
+            self._local.store = store
+            self._worker_stores.append(store)
+        return store
+
+
+# Store implementations selectable with the store_backend setting
+STORE_BACKENDS = {
+    "plasma": PlasmaStoreInterface,
+    "shared_memory": SharedMemoryStoreInterface,
+}
+# plasma stays the default where pyarrow still provides it
+DEFAULT_STORE_BACKEND = "shared_memory" if plasma is None else "plasma"
 
 # Aliasing
-StoreInterface = PlasmaStoreInterface
+StoreInterface = STORE_BACKENDS[DEFAULT_STORE_BACKEND]
+
+# Types of the ids that stores return from put
+OBJECT_ID_TYPES = (
+    (SharedMemoryObjectID,)
+    if plasma is None
+    else (
+        SharedMemoryObjectID,
+        ObjectID,
+    )
+)
 
 
 @dataclass
@@ -573,6 +3746,20 @@ class CannotGetObjectError(Exception):
         return self.message
 
 
+class StoreFullError(Exception):
+    """Raised when there is no room left in the store for an object."""
+
+    def __init__(self, size, store_loc):
+        super().__init__()
+
+        self.name = "StoreFullError"
+
+        self.message = "No room for {} bytes in store at {}".format(size, store_loc)
+
+    def __str__(self):
+        return self.message
+
+
 class CannotConnectToStoreInterfaceError(Exception):
     """Raised when failing to connect to store."""
 
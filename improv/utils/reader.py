@@ -1,11 +1,20 @@
 import os
+import re
+import mmap
 import pickle
-from contextlib import contextmanager
+import tempfile
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ProcessPoolExecutor
 
 # from typing import Dict, Set
+import h5py
 import lmdb
+import numpy as np
+from improv.store import LMDBStoreInterface, shared_memory_dir
 from .utils import get_num_length_from_key
 
+NAME, FRAME, TIME = LMDBStoreInterface.INDEXES
+
 
 class LMDBReader:
     def __init__(self, path):
@@ -16,24 +25,42 @@ class LMDBReader:
             raise FileNotFoundError
         self.path = path
 
-    def get_all_data(self):
+    def get_all_data(self, workers=None):
         """Load all data from LMDB into a dictionary
         Make sure that the LMDB is small enough to fit in RAM
+
+        workers: Number of processes decoding records at once. Each decodes
+            a range of keys and hands arrays back in shared memory.
+            None or 1 to decode in this process.
         """
-        with LMDBReader._lmdb_cur(self.path) as cur:
-            return {
-                LMDBReader._decode_key(key): pickle.loads(value)
+        if workers is not None and workers > 1:
+            return self._get_all_data_parallel(workers)
+        data = {}
+        for _, cur, indexes in self._lmdb_curs():
+            data.update(
+                LMDBReader._decode_item(key, value)
                 for key, value in cur.iternext()
-            }
+                if indexes is None or key not in indexes
+            )
+        return data
 
     def get_data_types(self):
         """Return all data types defined as {object_name}, but without number."""
         num_idx = get_num_length_from_key()
 
-        with LMDBReader._lmdb_cur(self.path) as cur:
-            return {
-                key[: -12 - num_idx.send(key)] for key in cur.iternext(values=False)
-            }
+        types = set()
+        for txn, cur, indexes in self._lmdb_curs():
+            if indexes is None:
+                types.update(
+                    key[: -12 - num_idx.send(key)] for key in cur.iternext(values=False)
+                )
+            else:
+                with txn.cursor(db=indexes[NAME]) as names:
+                    types.update(
+                        entry[: entry.index(b"\0")].rstrip(b"0123456789")
+                        for entry in names.iternext(values=False)
+                    )
+        return types
 
     def get_data_by_number(self, t):
         """Return data at a specific frame number t"""
@@ -45,33 +72,204 @@ class LMDBReader:
             except ValueError:
                 return False
 
-        with LMDBReader._lmdb_cur(self.path) as cur:
-            keys = (
-                key for key in cur.iternext(values=False) if check_if_key_equals_t(key)
-            )
-            return {
-                LMDBReader._decode_key(key): pickle.loads(cur.get(key)) for key in keys
-            }
+        data = {}
+        for txn, cur, indexes in self._lmdb_curs():
+            if indexes is None:
+                keys = [
+                    key
+                    for key in cur.iternext(values=False)
+                    if check_if_key_equals_t(key)
+                ]
+            else:
+                keys = LMDBStoreInterface.index_keys(
+                    txn, indexes[FRAME], FRAME, t, t + 1
+                )
+            data.update(LMDBReader._decode_item(key, cur.get(key)) for key in keys)
+        return data
 
     def get_data_by_type(self, t):
         """Return data with key that starts with t"""
-        with LMDBReader._lmdb_cur(self.path) as cur:
-            keys = (
-                key for key in cur.iternext(values=False) if key.startswith(t.encode())
-            )
-            return {
-                LMDBReader._decode_key(key): pickle.loads(cur.get(key)) for key in keys
-            }
+        data = {}
+        for txn, cur, indexes in self._lmdb_curs():
+            if indexes is None:
+                keys = [
+                    key
+                    for key in cur.iternext(values=False)
+                    if key.startswith(t.encode())
+                ]
+            else:
+                keys = LMDBStoreInterface.index_keys(txn, indexes[NAME], NAME, t)
+            data.update(LMDBReader._decode_item(key, cur.get(key)) for key in keys)
+        return data
 
     def get_params(self):
         """Return parameters in a dictionary"""
-        with LMDBReader._lmdb_cur(self.path) as cur:
-            keys = [
-                key
-                for key in cur.iternext(values=False)
-                if key.startswith(b"params_dict")
-            ]
-            return pickle.loads(cur.get(keys[-1]))
+        params = None
+        for txn, cur, indexes in self._lmdb_curs():
+            if indexes is None:
+                keys = [
+                    key
+                    for key in cur.iternext(values=False)
+                    if key.startswith(b"params_dict")
+                ]
+            else:
+                keys = LMDBStoreInterface.index_keys(
+                    txn, indexes[NAME], NAME, "params_dict"
+                )
+            if keys:
+                params = LMDBStoreInterface.decode_record(cur.get(keys[-1]))
+        return params
+
+    def export(self, name, to, dataset=None, batch_size=256, compression=None):
+        """Stream objects named {name}{frame number} into an HDF5 dataset,
+        in order of frame number, without loading the LMDB into RAM.
+        The objects must all have the same shape and dtype.
+
+        Args:
+            name (str): name of the objects without their frame number
+            to (str): path of the HDF5 file, created if needed
+            dataset (str): name of the dataset, name by default. Frame
+                numbers and times go in {dataset}_frame and {dataset}_time
+            batch_size (int): objects read before each write to the file
+            compression (str): HDF5 compression filter, e.g. "gzip"
+
+        Returns:
+            number of objects exported
+
+        Raises:
+            ValueError: If there is no object with that name, or the
+                objects differ in shape
+        """
+        dataset = dataset or name
+        pattern = re.compile(re.escape(name) + r"(\d+)$")
+        with ExitStack() as stack:
+            txns = []
+            entries = []  # frame number, segment, key
+            for path in LMDBStoreInterface.segment_paths(self.path):
+                txn, cur, indexes = stack.enter_context(
+                    LMDBReader._lmdb_cur(path.as_posix())
+                )
+                for obj_name, key in LMDBReader._names(txn, cur, indexes, name):
+                    frame = pattern.match(obj_name)
+                    if frame is not None:
+                        entries.append((int(frame.group(1)), len(txns), key))
+                txns.append(txn)
+            if not entries:
+                raise ValueError("No objects named {}<frame number>".format(name))
+            entries.sort()
+
+            n = len(entries)
+            _, segment, key = entries[0]
+            first = np.asarray(
+                LMDBStoreInterface.decode_record(txns[segment].get(key)).obj
+            )
+            batch = min(batch_size, n)
+            buf = np.empty((batch,) + first.shape, first.dtype)
+            times = np.empty(batch)
+
+            with h5py.File(to, "a") as f:
+                data = f.create_dataset(
+                    dataset,
+                    shape=(n,) + first.shape,
+                    dtype=first.dtype,
+                    chunks=True,  # chosen by h5py, not by the batch size
+                    compression=compression,
+                )
+                f.create_dataset(
+                    dataset + "_frame", data=[entry[0] for entry in entries]
+                )
+                time_data = f.create_dataset(dataset + "_time", shape=(n,), dtype="f8")
+                for start in range(0, n, batch):
+                    stop = min(start + batch, n)
+                    for i, (frame, segment, key) in enumerate(entries[start:stop]):
+                        record = LMDBStoreInterface.decode_record(
+                            txns[segment].get(key)
+                        )
+                        obj = np.asarray(record.obj)
+                        if obj.shape != first.shape:
+                            raise ValueError(
+                                "{}{} has shape {}, not {}".format(
+                                    name, frame, obj.shape, first.shape
+                                )
+                            )
+                        buf[i] = obj
+                        times[i] = record.time
+                    data[start:stop] = buf[: stop - start]
+                    time_data[start:stop] = times[: stop - start]
+        return n
+
+    def _get_all_data_parallel(self, workers):
+        """get_all_data, with ranges of keys decoded in a process pool"""
+        ranges = []
+        for path in LMDBStoreInterface.segment_paths(self.path):
+            with LMDBReader._lmdb_cur(path.as_posix()) as (_, cur, indexes):
+                keys = [
+                    key
+                    for key in cur.iternext(values=False)
+                    if indexes is None or key not in indexes
+                ]
+            # Several ranges per worker, so that workers that finish early
+            # take over from slower ones
+            size = max(1, -(-len(keys) // (4 * workers)))
+            ranges.extend(
+                (path.as_posix(), keys[i], keys[min(i + size, len(keys)) - 1])
+                for i in range(0, len(keys), size)
+            )
+
+        data = {}
+        if not ranges:
+            return data
+        with ProcessPoolExecutor(workers) as pool:
+            # Results come back in order, so later segments win as in get_all_data
+            for items, layout, shared in pool.map(_decode_range, *zip(*ranges)):
+                arrays = LMDBReader._attach(shared, layout)
+                for name, record, i in items:
+                    if i is not None:
+                        record.obj = arrays[i]
+                    data[name] = record
+        return data
+
+    @staticmethod
+    def _attach(shared, layout):
+        """Arrays in a shared memory file written by _decode_range.
+        The file is removed at once; its memory lasts as long as the arrays."""
+        if shared is None:
+            return []
+        try:
+            with open(shared, "r+b") as f:
+                buf = mmap.mmap(f.fileno(), 0)
+        finally:
+            os.unlink(shared)
+        return [
+            np.ndarray(shape, dtype, buffer=buf, offset=offset)
+            for offset, dtype, shape in layout
+        ]
+
+    @staticmethod
+    def _names(txn, cur, indexes, prefix):
+        """Names and keys of the objects whose names start with prefix"""
+        if indexes is None:
+            # Without indexes, read the names from the records
+            for key, value in cur.iternext():
+                info = LMDBStoreInterface.decode_record_info(value)
+                if info.name and info.name.startswith(prefix):
+                    yield info.name, key
+            return
+        with txn.cursor(db=indexes[NAME]) as names:
+            if names.set_range(prefix.encode()):
+                for entry in names.iternext(values=False):
+                    if not entry.startswith(prefix.encode()):
+                        break
+                    obj_name, key = entry.split(b"\0", 1)
+                    yield obj_name.decode(), key
+
+    @staticmethod
+    def _decode_item(key, record):
+        """Name and data of a record: the name is {object_name}_{time}"""
+        data = LMDBStoreInterface.decode_record(record)
+        if record[:2] == LMDBStoreInterface.RECORD_MAGIC:
+            return f"{data.name}_{data.time}", data
+        return LMDBReader._decode_key(key), data
 
     @staticmethod
     def _decode_key(key):
@@ -87,18 +285,90 @@ class LMDBReader:
 
         return f"{key[:-12].decode()}_{pickle.loads(key[-12:])}"
 
+    def _lmdb_curs(self):
+        """Transaction and cursor on each segment of the LMDB in turn,
+        oldest first, with the index databases of the segment
+        (None if it was written without indexes)"""
+        for path in LMDBStoreInterface.segment_paths(self.path):
+            with LMDBReader._lmdb_cur(path.as_posix()) as (txn, cur, indexes):
+                yield txn, cur, indexes
+
     @staticmethod
     @contextmanager
     def _lmdb_cur(path):
         """Helper context manager to open and ensure proper closure of LMDB"""
 
-        env = lmdb.open(path)
+        env = lmdb.open(path, max_dbs=len(LMDBStoreInterface.INDEXES))
         txn = env.begin()
+        try:
+            indexes = {
+                db: env.open_db(db, txn=txn, create=False)
+                for db in LMDBStoreInterface.INDEXES
+            }
+        except lmdb.NotFoundError:
+            indexes = None
         cur = txn.cursor()
         try:
-            yield cur
+            yield txn, cur, indexes
 
         finally:
             cur.__exit__()
             txn.commit()
             env.close()
+
+
+def _decode_range(path, first, last):
+    """Decode the records with keys from first to last in the LMDB at path,
+    for LMDBReader.get_all_data in a worker process
+
+    Returns:
+        (name, LMDBData, index of its array or None) for each record,
+        offset, dtype and shape of each array, and the shared memory file
+        the arrays were copied to (None if there are none)
+    """
+    env = lmdb.open(
+        path, readonly=True, lock=False, max_dbs=len(LMDBStoreInterface.INDEXES)
+    )
+    items = []
+    arrays = []
+    try:
+        with env.begin(buffers=True) as txn, txn.cursor() as cur:
+            cur.set_range(first)
+            for key, record in cur:
+                key = bytes(key)
+                if key > last:
+                    break
+                if key in LMDBStoreInterface.INDEXES:
+                    continue
+                name, data = LMDBReader._decode_item(key, record)
+                i = None
+                if isinstance(data.obj, np.ndarray):
+                    # May be a view of the LMDB page: copy it out in this txn
+                    i = len(arrays)
+                    arrays.append(data.obj)
+                    data.obj = None
+                items.append((name, data, i))
+            layout, shared = _share_arrays(arrays)
+    finally:
+        env.close()
+    return items, layout, shared
+
+
+def _share_arrays(arrays):
+    """Copy arrays into a new shared memory file, each at an aligned offset"""
+    if not arrays:
+        return [], None
+    layout = []
+    size = 0
+    for a in arrays:
+        layout.append((size, a.dtype, a.shape))
+        size += -(-a.nbytes // 64) * 64
+    fd, shared = tempfile.mkstemp(prefix="improv-read-", dir=shared_memory_dir())
+    try:
+        os.ftruncate(fd, max(size, 1))
+        with mmap.mmap(fd, max(size, 1)) as buf:
+            for a, (offset, dtype, shape) in zip(arrays, layout):
+                np.ndarray(shape, dtype, buffer=buf, offset=offset)[...] = a
+    finally:
+        os.close(fd)
+    return layout, shared
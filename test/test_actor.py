@@ -2,9 +2,10 @@ import os
 import psutil
 import pytest
 import subprocess
-from improv.link import Link  # , AsyncQueue
+import numpy as np
+from improv.link import Link, MultiLink  # , AsyncQueue
 from improv.actor import AbstractActor as Actor
-from improv.store import StoreInterface
+from improv.store import StoreInterface, SharedMemoryStoreInterface
 
 
 # set global_variables
@@ -313,3 +314,42 @@ def test_actor_connection(setup_store, set_store_loc):
     act1.q_in.put(msg)
 
     assert act2.q_out.get() == msg
+
+
+def test_send_receive_releases_leases(tmp_path):
+    """Tests that an object sent to several consumers is freed
+    once each of them has received it."""
+    store_loc = str(tmp_path / "store")
+    SharedMemoryStoreInterface.create_store(store_loc, 10000000)
+    acts = [Actor("act" + str(i), store_loc) for i in range(3)]
+    for act in acts:
+        act.setStoreInterface(SharedMemoryStoreInterface(store_loc=store_loc))
+    q_out, q_ins = MultiLink("Multi", "act0.q_out", ["act1.q_in", "act2.q_in"])
+    acts[0].setLinkOut(q_out)
+    acts[1].setLinkIn(q_ins[0])
+    acts[2].setLinkIn(q_ins[1])
+
+    obj_id = acts[0].send(np.arange(5), "range")
+    with acts[1].receive(timeout=1) as obj:
+        assert np.array_equal(obj, np.arange(5))
+    assert acts[0].client.get_all()[obj_id]["consumers"] == 1
+    with acts[2].receive(timeout=1) as obj:
+        assert np.array_equal(obj, np.arange(5))
+    assert acts[0].client.get_all() == {}
+    SharedMemoryStoreInterface.destroy_store(store_loc)
+
+
+def test_send_receive_plasma(setup_store, set_store_loc):
+    """Tests that send and receive work with the plasma store,
+    which ignores leases."""
+    act1 = Actor("a1", set_store_loc)
+    act2 = Actor("a2", set_store_loc)
+    act1.setStoreInterface(StoreInterface(store_loc=set_store_loc))
+    act2.setStoreInterface(StoreInterface(store_loc=set_store_loc))
+    link = Link("L12", "a1.q_out", "a2.q_in")
+    act1.setLinkOut(link)
+    act2.setLinkIn(link)
+
+    assert act1.send([1, 2, 3], "list") is not None
+    with act2.receive(timeout=1) as obj:
+        assert obj == [1, 2, 3]
@@ -6,6 +6,10 @@ import subprocess
 import asyncio
 import signal
 import improv.cli as cli
+from improv.store import LMDBStoreInterface
+from improv.utils.reader import LMDBReader
+import h5py
+import numpy as np
 
 from test_nexus import ports
 
@@ -182,6 +186,50 @@ def test_can_override_ip(mode, flag, expected):
     assert vars(args)[params[flag]] == expected
 
 
+def _lmdb_session(path):
+    store = LMDBStoreInterface(path=path, name="lmdb", max_size=10**8)
+    for i in [2, 0, 1]:
+        store.put(np.full((2, 3), i, dtype=np.uint16), "acq_raw" + str(i))
+    store.put("not a frame", "acq_raw_settings")
+    store.close()
+    return path / "lmdb"
+
+
+def test_export(tmp_path, capsys):
+    lmdb_path = _lmdb_session(tmp_path)
+    to = tmp_path / "frames.h5"
+    args = cli.parse_cli_args(
+        ["export", str(lmdb_path), "-n", "acq_raw", "-t", str(to), "-b", "2"]
+    )
+    args.func(args)
+    assert "Exported 3 objects" in capsys.readouterr().out
+    with h5py.File(to, "r") as f:
+        assert f["acq_raw"].shape == (3, 2, 3)
+        assert f["acq_raw"].dtype == np.uint16
+        assert list(f["acq_raw"][:, 0, 0]) == [0, 1, 2]
+        assert list(f["acq_raw_frame"]) == [0, 1, 2]
+        assert f["acq_raw_time"][2] < f["acq_raw_time"][0] < f["acq_raw_time"][1]
+
+
+def test_export_chunks_independent_of_batch(tmp_path):
+    store = LMDBStoreInterface(path=tmp_path, name="lmdb", max_size=10**8)
+    for i in range(40):
+        store.put(np.full((64, 64), i, dtype=np.float64), "acq_raw" + str(i))
+    store.close()
+    to = tmp_path / "frames.h5"
+    assert LMDBReader(str(tmp_path / "lmdb")).export("acq_raw", to) == 40
+    with h5py.File(to, "r") as f:
+        frames = f["acq_raw"]
+        assert np.prod(frames.chunks) * frames.dtype.itemsize <= 2**20
+        assert frames[39, 0, 0] == 39
+
+
+def test_export_unknown_name(tmp_path):
+    reader = LMDBReader(str(_lmdb_session(tmp_path)))
+    with pytest.raises(ValueError, match="No objects named"):
+        reader.export("estimates", tmp_path / "estimates.h5")
+
+
 async def test_sigint_kills_server(server):
     server.send_signal(signal.SIGINT)
 
@@ -170,6 +170,32 @@ def test_cyclic_graph(set_configdir):
     assert not checks.check_if_connections_acyclic(path)
 
 
+def test_createConfig_link_options(set_configdir):
+    cfg = Config("bounded_links.yaml")
+    assert cfg.createConfig() == 0
+    assert cfg.connections == {"Acquirer.q_out": ["Analysis.q_in"]}
+    assert cfg.link_options == {
+        "Acquirer.q_out": {"maxsize": 10, "overflow": "drop-oldest"}
+    }
+    assert checks.check_if_connections_acyclic(os.getcwd() + "/bounded_links.yaml")
+
+
+@pytest.mark.parametrize(
+    ("connection", "error"),
+    [
+        ({"maxsize": 10}, "no inputs"),
+        ({"to": ["Analysis.q_in"], "overflow": "drop"}, "overflow"),
+        ({"to": ["Analysis.q_in"], "maxsize": -1}, "maxsize"),
+        ({"to": ["Analysis.q_in"], "maxsize": 10, "overflow": "latest"}, "latest"),
+    ],
+)
+def test_createConfig_bad_link_options(set_configdir, caplog, connection, error):
+    cfg = Config("bounded_links.yaml")
+    cfg.config["connections"]["Acquirer.q_out"] = connection
+    assert cfg.createConfig() == -1
+    assert error in caplog.text
+
+
 def test_saveActors_clean(set_configdir):
     """Compares internal actor representation to what was saved in the file."""
 
@@ -1,6 +1,9 @@
 import asyncio
+import os
 import queue
+import select
 import subprocess
+import threading
 import time
 
 import pytest
@@ -8,7 +11,9 @@ import pytest
 from improv.actor import Actor
 
 from improv.store import StoreInterface
-from improv.link import Link
+from improv.link import Link, MultiLink, LatestValueQueue, SharedMemoryQueue
+from multiprocessing import get_context
+from queue import Full
 
 
 @pytest.fixture
@@ -109,6 +114,7 @@ def _kill_pytest_processes():
         ("cancelled_join", False),
         ("status", "pending"),
         ("result", None),
+        ("consumers", 1),
     ],
 )
 def test_Link_init(setup_store, example_link, attribute, expected):
@@ -478,3 +484,274 @@ async def test_multi_actor_system(example_actor_system, setup_store):
     assert await acts[2].links["q_in_1"].get_async() == light_msgs[1]
     assert await acts[3].links["q_in_1"].get_async() == light_msgs[0]
     assert await acts[3].links["q_in_2"].get_async() == light_msgs[2]
+
+
+def test_shared_memory_queue_wraps():
+    q = SharedMemoryQueue(capacity=1024)
+    for i in range(200):
+        q.put("message" * (i % 7))
+        assert q.qsize() == 1
+        assert q.get() == "message" * (i % 7)
+    assert q.empty()
+
+
+def test_shared_memory_queue_large_message():
+    q = SharedMemoryQueue(capacity=1024)
+    big = list(range(10**4))
+    q.put(big)
+    q.put("after")
+    assert q.get() == big
+    assert q.get() == "after"
+    assert not os.path.exists(q.path + ".0")  # the file of the big message
+
+
+def test_shared_memory_queue_full():
+    q = SharedMemoryQueue(capacity=256)
+    with pytest.raises(Full):
+        for i in range(100):
+            q.put_nowait(i)
+    n = q.qsize()
+    with pytest.raises(Full):
+        q.put(0, timeout=0.1)
+    assert [q.get_nowait() for _ in range(n)] == list(range(n))
+
+
+def _echo(q_in, q_out):
+    q_out.put(q_in.get(timeout=10) + 1)
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_shared_memory_queue_across_processes(method):
+    q_in, q_out = SharedMemoryQueue(), SharedMemoryQueue()
+    p = get_context(method).Process(target=_echo, args=(q_in, q_out))
+    p.start()
+    q_in.put(1)
+    assert q_out.get(timeout=10) == 2
+    p.join(10)
+
+
+async def test_get_async_polls_link(example_link):
+    task = asyncio.create_task(example_link.get_async())
+    await asyncio.sleep(0.1)
+    assert not task.done()
+    example_link.put("message")
+    assert await asyncio.wait_for(task, 5) == "message"
+    assert example_link.real_executor is None
+
+
+async def test_put_async_waits_for_room():
+    lnk = Link("Small", "a", "b")
+    lnk.queue = SharedMemoryQueue(capacity=256)
+    n = 0
+    while not lnk.queue.full():
+        try:
+            lnk.put_nowait(n)
+        except Full:
+            break
+        n += 1
+    task = asyncio.create_task(lnk.put_async("last"))
+    await asyncio.sleep(0.1)
+    assert not task.done()
+    assert [lnk.get() for _ in range(4)] == [0, 1, 2, 3]
+    await asyncio.wait_for(task, 5)
+    assert [lnk.get() for _ in range(n - 3)][-1] == "last"
+    assert lnk.real_executor is None
+
+
+async def test_poll_many_links_without_threads():
+    links = [Link("L" + str(i), "a", "b") for i in range(100)]
+    threads = threading.active_count()
+    tasks = [asyncio.create_task(lnk.get_async()) for lnk in links]
+    await asyncio.sleep(0.1)
+    links[42].put("message")
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    assert [task.result() for task in done] == ["message"]
+    assert threading.active_count() == threads
+    for task in pending:
+        task.cancel()
+
+
+def test_link_fileno(example_link):
+    assert select.select([example_link], [], [], 0)[0] == []
+    example_link.put("message")
+    assert select.select([example_link], [], [], 1)[0] == [example_link]
+
+
+def test_get_many(example_link):
+    example_link.put_many(range(10))
+    assert example_link.get_many(4, timeout=1) == [0, 1, 2, 3]
+    assert example_link.get_many(100, timeout=1) == list(range(4, 10))
+    with pytest.raises(queue.Empty):
+        example_link.get_many(4, timeout=0.1)
+
+
+def test_put_many_wraps_and_fills():
+    q = SharedMemoryQueue(capacity=256)
+    with pytest.raises(Full):
+        q.put_many(range(100), timeout=0.1)
+    n = q.qsize()
+    assert q.get_many(100) == list(range(n))
+    for i in range(50):
+        q.put_many(["message" * (i % 5)] * 3)
+        assert q.get_many(10, timeout=1) == ["message" * (i % 5)] * 3
+    q.put_many([list(range(10**4)), "after"])
+    assert q.get_many(2) == [list(range(10**4)), "after"]
+
+
+def test_get_many_falls_back_to_get(example_link):
+    example_link.queue = queue.Queue()
+    example_link.put_many([1, 2, 3])
+    assert example_link.get_many(10, timeout=1) == [1, 2, 3]
+
+
+def test_multi_link_put_many(setup_store):
+    q_in, q_out = MultiLink("Multi", "a", ["b", "c"])
+    q_in.put_many(i for i in range(3))
+    assert [q.get_many(10, timeout=1) for q in q_out] == [[0, 1, 2]] * 2
+    assert q_in.queue is None
+    assert q_in.empty()
+
+
+async def test_multi_link_producer_cannot_get(setup_store):
+    q_in, q_out = MultiLink("Multi", "a", ["b", "c"])
+    q_in.put(1)
+    with pytest.raises(TypeError, match="producer end"):
+        q_in.get(timeout=1)
+    with pytest.raises(TypeError, match="producer end"):
+        q_in.get_nowait()
+    with pytest.raises(TypeError, match="producer end"):
+        q_in.get_many(10, timeout=1)
+    with pytest.raises(TypeError, match="producer end"):
+        await q_in.get_async()
+    assert [q.get(timeout=1) for q in q_out] == [1, 1]
+
+
+@pytest.mark.parametrize(
+    ("overflow", "expected"),
+    [("drop-newest", [0, 1, 2]), ("drop-oldest", [7, 8, 9])],
+)
+def test_bounded_link_drops(setup_store, overflow, expected):
+    lnk = Link("Bounded", "a", "b", maxsize=3, overflow=overflow)
+    for i in range(10):
+        lnk.put(i)
+    assert lnk.qsize() == 3
+    assert lnk.get_many(10, timeout=1) == expected
+    assert lnk.dropped() == 7
+    assert lnk.empty()
+
+
+def test_bounded_link_blocks(setup_store):
+    lnk = Link("Bounded", "a", "b", maxsize=2)
+    lnk.put(0)
+    lnk.put(1)
+    assert lnk.full()
+    with pytest.raises(Full):
+        lnk.put_nowait(2)
+    assert lnk.get() == 0
+    lnk.put_nowait(2)
+    assert lnk.get_many(10) == [1, 2]
+    assert lnk.dropped() == 0
+
+
+def test_bounded_link_drops_large_messages():
+    q = SharedMemoryQueue(capacity=1024, maxsize=1, overflow="drop-oldest")
+    big = list(range(10**4))
+    q.put(big)
+    q.put("after")
+    assert q.get() == "after"
+    assert q.dropped() == 1
+    assert not os.path.exists(q.path + ".0")
+
+
+def test_bounded_link_overflow_policy():
+    with pytest.raises(ValueError, match="overflow must be one of"):
+        SharedMemoryQueue(overflow="drop")
+
+
+def _put_range(q, n):
+    for i in range(n):
+        q.put(i)
+
+
+def test_bounded_link_across_processes():
+    q = SharedMemoryQueue(maxsize=2, overflow="drop-newest")
+    p = get_context("spawn").Process(target=_put_range, args=(q, 5))
+    p.start()
+    p.join(10)
+    assert q.get_many(10, timeout=1) == [0, 1]
+    assert q.dropped() == 3
+
+
+def test_multi_link_dropped(setup_store):
+    q_in, q_out = MultiLink("Multi", "a", ["b", "c"], maxsize=1, overflow="drop-oldest")
+    q_in.put_many(range(3))
+    assert [q.get(timeout=1) for q in q_out] == [2, 2]
+    assert q_in.dropped() == 4
+
+
+def test_latest_link(setup_store):
+    lnk = Link("Latest", "a", "b", overflow="latest")
+    assert lnk.empty()
+    for i in range(10):
+        lnk.put(i)
+    assert lnk.qsize() == 1
+    assert lnk.get_many(10, timeout=1) == [9]
+    assert lnk.dropped() == 9
+    with pytest.raises(queue.Empty):
+        lnk.get(timeout=0.1)
+    lnk.put_many(range(5))
+    assert lnk.get() == 4
+    assert lnk.dropped() == 13
+
+
+def test_latest_link_large_messages():
+    q = LatestValueQueue(capacity=256)
+    q.put(list(range(10**4)))
+    q.put(list(range(10**3)))
+    assert q.get() == list(range(10**3))
+    q.put("small")
+    assert q.get() == "small"
+    assert not os.path.exists(q.path + ".1")  # the files of the big messages
+    assert not os.path.exists(q.path + ".2")
+
+
+async def test_latest_link_get_async(setup_store):
+    lnk = Link("Latest", "a", "b", overflow="latest")
+    task = asyncio.create_task(lnk.get_async())
+    await asyncio.sleep(0.1)
+    assert not task.done()
+    await lnk.put_async("message")
+    assert await asyncio.wait_for(task, 5) == "message"
+
+
+def test_latest_link_across_processes():
+    q = LatestValueQueue()
+    p = get_context("spawn").Process(target=_put_range, args=(q, 1000))
+    p.start()
+    p.join(10)
+    assert q.get(timeout=1) == 999
+    assert q.dropped() == 999
+
+
+def test_latest_link_counts_at_put():
+    q = LatestValueQueue()
+    q.put(1)
+    q.put(2)
+    q.put_many([3, 4])
+    assert q.dropped() == 3
+    assert q.get() == 4
+
+
+async def test_latest_link_producer_died_writing():
+    q = LatestValueQueue()
+    q.put("message")
+    # as if the producer died in the middle of writing the next one
+    q._buf[64] += 1
+    start = time.monotonic()
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.2)
+    with pytest.raises(queue.Empty):
+        q.get_nowait()
+    assert time.monotonic() - start < 2
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(q.get_async(), 0.2)
@@ -7,7 +7,7 @@ import signal
 import yaml
 
 from improv.nexus import Nexus
-from improv.store import StoreInterface
+from improv.store import StoreInterface, SharedMemoryStoreInterface
 
 
 # from improv.actor import Actor
@@ -140,6 +140,48 @@ def test_argument_config_precedence(setdir, ports):
     assert not cfg["use_watcher"]
 
 
+def test_shared_memory_backend(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+        store_backend="shared_memory",
+    )
+    store_loc = nex.store_loc
+    assert isinstance(nex.store, SharedMemoryStoreInterface)
+    assert all(
+        isinstance(actor.client, SharedMemoryStoreInterface)
+        and actor.store_class is SharedMemoryStoreInterface
+        for actor in nex.actors.values()
+    )
+    id = nex.actors["Generator"].client.put([1, 2, 3], "list")
+    assert nex.actors["Processor"].client.getID(id) == [1, 2, 3]
+    nex.destroyNexus()
+    assert not os.path.exists(store_loc)
+
+
+def test_store_backend_argument_overrides_settings(setdir, ports, tmp_path):
+    with open("minimal.yaml", "r") as ymlfile:
+        cfg = yaml.safe_load(ymlfile)
+    cfg["settings"] = {"store_backend": "plasma"}
+    config_file = str(tmp_path / "plasma_backend.yaml")
+    with open(config_file, "w") as ymlfile:
+        yaml.safe_dump(cfg, ymlfile)
+    nex = Nexus("test")
+    nex.createNexus(
+        file=config_file,
+        control_port=ports[0],
+        output_port=ports[1],
+        store_backend="shared_memory",
+    )
+    backend = nex.config.settings["store_backend"]
+    store = nex.store
+    nex.destroyNexus()
+    assert backend == "shared_memory"
+    assert isinstance(store, SharedMemoryStoreInterface)
+
+
 def test_settings_override_random_ports(setdir, ports):
     config_file = "minimal_with_settings.yaml"
     nex = Nexus("test")
@@ -1,10 +1,14 @@
 import pytest
 
-# import time
-from improv.store import StoreInterface
+import time
+from improv.store import StoreInterface, SharedMemoryStoreInterface
+from improv.store import AsyncStoreInterface
+from improv.store import LMDBStoreInterface, LMDBData
+from improv.utils.reader import LMDBReader
 
 # from multiprocessing import Process
 from pyarrow._plasma import PlasmaObjectExists
+from scipy import sparse
 from scipy.sparse import csc_matrix
 import numpy as np
 import pyarrow.plasma as plasma
@@ -12,10 +16,16 @@ import pyarrow.plasma as plasma
 # from pyarrow.lib import ArrowIOError
 # from improv.store import ObjectNotFoundError
 # from improv.store import CannotGetObjectError
-from improv.store import CannotConnectToStoreInterfaceError
-
-# import pickle
+from improv.store import CannotConnectToStoreInterfaceError, ObjectNotFoundError
+
+import lmdb
+import pickle
+import signal
+import shutil
+import asyncio
+import threading
 import subprocess
+from multiprocessing import get_context
 
 WAIT_TIMEOUT = 10
 
@@ -140,6 +150,17 @@ def test_is_csc_matrix_and_put(setup_store, set_store_loc):
     assert isinstance(store.getID(x), csc_matrix)
 
 
+@pytest.mark.parametrize("fmt", ["csc", "csr", "coo"])
+def test_sparse_matrix_put_without_pickling(setup_store, set_store_loc, fmt):
+    mat = sparse.random(30, 20, density=0.2, format=fmt, random_state=0)
+    store = StoreInterface(store_loc=set_store_loc)
+    x = store.put(mat, "matrix")
+    res = store.getID(x)
+    assert type(res) is type(mat)
+    assert np.array_equal(res.toarray(), mat.toarray())
+    assert np.shares_memory(res.data, store.getID(x).data)
+
+
 # FAILED - ObjectNotFoundError NOT RAISED?
 # def test_not_put(setup_store):
 #     store_loc = '/tmp/store'
@@ -213,6 +234,91 @@ def test_put_twice(setup_store):
     assert e.value.message == "Object already exists. Meant to call replace?"
 
 
+def test_putMany(setup_store, set_store_loc):
+    store = StoreInterface(store_loc=set_store_loc)
+    mat = csc_matrix((3, 4), dtype=np.int8)
+    ids = store.putMany([1, np.arange(5), mat], ["one", "range", "matrix"])
+    assert store.getID(ids[0]) == 1
+    assert np.array_equal(store.getID(ids[1]), np.arange(5))
+    assert isinstance(store.getID(ids[2]), csc_matrix)
+
+
+def test_delete(setup_store, set_store_loc):
+    store = StoreInterface(store_loc=set_store_loc)
+    obj_id = store.put(np.arange(5), "range")
+    store.delete(obj_id)
+    assert not store.client.contains(obj_id)
+
+
+def test_replace(setup_store, set_store_loc):
+    store = StoreInterface(store_loc=set_store_loc)
+    assert store.replace(np.zeros(10), "theta") == 1
+    first = store._version_id("theta", 1)
+    assert store.replace(np.ones(10), "theta") == 2
+    assert np.array_equal(store.get_version("theta"), np.ones(10))
+    assert not store.client.contains(first)
+    with pytest.raises(ObjectNotFoundError):
+        store.get_version("theta", 1)
+    other = StoreInterface(store_loc=set_store_loc)
+    assert other.replace(np.full(10, 2), "theta") == 3
+    assert np.array_equal(store.get_version("theta"), np.full(10, 2))
+    with pytest.raises(ObjectNotFoundError):
+        store.get_version("mu")
+
+
+def _put_later(store, obj_id, obj, delay=0.2):
+    thread = threading.Timer(delay, store.client.put, args=(obj, obj_id))
+    thread.start()
+    return thread
+
+
+def test_getID_waits_for_seal(setup_store, set_store_loc):
+    store = StoreInterface(store_loc=set_store_loc)
+    producer = StoreInterface(store_loc=set_store_loc)
+    obj_id = store.random_ObjectID()[0]
+    with pytest.raises(ObjectNotFoundError):
+        store.getID(obj_id, timeout=0.05)
+    thread = _put_later(producer, obj_id, "late")
+    assert store.getID(obj_id, timeout=10) == "late"
+    thread.join()
+
+
+async def test_get_async(setup_store, set_store_loc):
+    store = StoreInterface(store_loc=set_store_loc)
+    producer = StoreInterface(store_loc=set_store_loc)
+    obj_id = store.random_ObjectID()[0]
+    thread = _put_later(producer, obj_id, np.arange(3))
+    assert np.array_equal(await store.get_async(obj_id, timeout=10), np.arange(3))
+    thread.join()
+    with pytest.raises(ObjectNotFoundError):
+        await store.get_async(store.random_ObjectID()[0], timeout=0.05)
+
+
+def test_read_cache(setup_store, set_store_loc):
+    store = StoreInterface(store_loc=set_store_loc)
+    assert store.cache_info() is None
+    store.enable_cache(max_objects=2)
+    ids = [store.put([i], "coords" + str(i)) for i in range(3)]
+    assert store.getID(ids[0]) == [0]
+    assert store.getID(ids[0]) is store.getID(ids[0])
+    assert store.getList(ids) == [[0], [1], [2]]
+    assert store.cache_info() == {"hits": 3, "misses": 3, "size": 2, "max_objects": 2}
+    store.delete(ids[2])
+    assert store.cache_info()["size"] == 1
+
+
+async def test_async_client(setup_store, set_store_loc):
+    client = AsyncStoreInterface(StoreInterface(store_loc=set_store_loc))
+    ids = await asyncio.gather(
+        *(client.put_async(np.full(1000, i), "frame" + str(i)) for i in range(8))
+    )
+    frames = await client.get_many_async(ids)
+    assert [frame[0] for frame in frames] == list(range(8))
+    with pytest.raises(ObjectNotFoundError):
+        await client.get_async(client.store.random_ObjectID()[0], timeout=0)
+    client.close()
+
+
 # class StoreInterface_PutGet(StoreInterfaceDependentTestCase):
 
 
@@ -294,3 +400,870 @@ class StoreInterface_sparseMatrix(StoreInterfaceDependentTestCase):
         csc = csc_matrix((3, 4), dtype=np.int8)
         self.store.put(csc, "csc")
         assert np.allclose(self.store.get("csc").toarray(), csc.toarray()) == True"""
+
+
+@pytest.fixture
+def shm_store(tmp_path):
+    """Create a 10 mb shared memory store and connect to it."""
+    store_loc = str(tmp_path / "store")
+    SharedMemoryStoreInterface.create_store(store_loc, 10000000)
+    yield SharedMemoryStoreInterface(store_loc=store_loc)
+    SharedMemoryStoreInterface.destroy_store(store_loc)
+
+
+def test_shm_connect_missing_store(tmp_path):
+    store_loc = str(tmp_path / "nothing")
+    with pytest.raises(CannotConnectToStoreInterfaceError) as e:
+        SharedMemoryStoreInterface(store_loc=store_loc)
+    assert e.value.message == "Cannot connect to store at {}".format(store_loc)
+
+
+def test_shm_init_empty(shm_store):
+    assert shm_store.get_all() == {}
+    assert shm_store.get_usage() == (0, 10000000)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        np.arange(12, dtype=np.float32).reshape(3, 4),
+        np.zeros((0, 5)),
+        np.array(7),
+        np.arange(20)[::3],
+    ],
+)
+def test_shm_put_get_array(shm_store, obj):
+    id = shm_store.put(obj, "array")
+    res = shm_store.getID(id)
+    assert res.dtype == obj.dtype
+    assert np.array_equal(res, obj)
+    assert not res.flags.writeable
+
+
+def test_shm_get_is_view(shm_store):
+    id = shm_store.put(np.ones(100), "ones")
+    assert np.shares_memory(shm_store.getID(id), shm_store.getID(id))
+
+
+@pytest.mark.parametrize(
+    "obj", [1, "one", [1, 2, 3], {"a": np.ones(3)}, np.asmatrix(np.eye(2))]
+)
+def test_shm_put_get_pickled(shm_store, obj):
+    id = shm_store.put(obj, "obj")
+    res = shm_store.getID(id)
+    assert type(res) is type(obj)
+    assert str(res) == str(obj)
+
+
+def test_shm_csc_matrix(shm_store):
+    mat = csc_matrix(np.eye(4, dtype=np.int8))
+    id = shm_store.put(mat, "matrix")
+    assert np.array_equal(shm_store.getID(id).toarray(), mat.toarray())
+
+
+def test_shm_tree_of_arrays(shm_store):
+    coords = [
+        {"neuron_id": i, "coordinates": np.random.rand(20, 2), "CoM": np.float64(i)}
+        for i in range(300)
+    ]
+    tree = {"coords": coords, "tune": (np.arange(4), None), "ok": True, 7: b"raw"}
+    obj_id = shm_store.put(tree, "tree")
+    assert shm_store.get_all()[obj_id]["data_size"] > 300 * 20 * 2 * 8
+    res = shm_store.getID(obj_id)
+    assert res.keys() == tree.keys()
+    assert res["tune"][1] is None
+    assert res["ok"] is True
+    assert res[7] == b"raw"
+    assert isinstance(res["tune"], tuple)
+    for got, expected in zip(res["coords"], coords):
+        assert got["neuron_id"] == expected["neuron_id"]
+        assert type(got["CoM"]) is np.float64
+        assert np.array_equal(got["coordinates"], expected["coordinates"])
+        assert not got["coordinates"].flags.writeable
+
+
+def test_shm_tree_falls_back_to_pickle(shm_store):
+    tree = {"values": [np.arange(3), {1, 2}]}
+    res = shm_store.getID(shm_store.put(tree, "tree"))
+    assert res["values"][1] == {1, 2}
+    assert res["values"][0].flags.writeable
+
+
+def test_shm_tree_with_lone_surrogate_is_pickled(shm_store):
+    tree = {"label": "cell\udc80", "values": np.arange(3)}
+    res = shm_store.getID(shm_store.put(tree, "tree"))
+    assert res["label"] == "cell\udc80"
+    assert np.array_equal(res["values"], np.arange(3))
+
+
+@pytest.mark.parametrize("fmt", ["csc", "csr", "coo"])
+def test_shm_sparse_matrix_is_view(shm_store, fmt):
+    mat = sparse.random(30, 20, density=0.2, format=fmt, random_state=0)
+    id = shm_store.put(mat, "matrix")
+    res = shm_store.getID(id)
+    assert type(res) is type(mat)
+    assert np.array_equal(res.toarray(), mat.toarray())
+    assert np.shares_memory(res.data, shm_store.getID(id).data)
+
+
+def test_shm_sparse_matrix_other_format(shm_store):
+    mat = sparse.random(10, 10, density=0.2, format="lil", random_state=0)
+    id = shm_store.put(mat, "matrix")
+    assert np.array_equal(shm_store.getID(id).toarray(), mat.toarray())
+
+
+def test_shm_getList_and_get_all(shm_store):
+    ids = [shm_store.put(i, "n" + str(i)) for i in range(3)]
+    assert shm_store.getList(ids) == [0, 1, 2]
+    listing = shm_store.get_all()
+    assert set(listing.keys()) == set(ids)
+    assert sorted(v["name"] for v in listing.values()) == ["n0", "n1", "n2"]
+
+
+def test_shm_putMany(shm_store):
+    objects = [np.arange(5), {"a": 1}, "two"]
+    ids = shm_store.putMany(objects, ["range", "dict", "str"])
+    assert len(set(ids)) == 3
+    assert np.array_equal(shm_store.getID(ids[0]), objects[0])
+    assert shm_store.getList(ids[1:]) == objects[1:]
+
+
+def test_shm_putMany_unpicklable(shm_store):
+    ids = shm_store.putMany([1, lambda x: x, 2], ["one", "lambda", "two"])
+    assert ids[1] is None
+    assert shm_store.getList([ids[0], ids[2]]) == [1, 2]
+
+
+def test_shm_putMany_full_is_all_or_nothing(shm_store):
+    ids = shm_store.putMany([np.zeros(10**6), np.zeros(10**6)], ["a", "b"])
+    assert ids == [None, None]
+    assert shm_store.get_usage()[0] == 0
+
+
+def test_shm_get_missing(shm_store):
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(shm_store.random_ObjectID()[0])
+
+
+def test_shm_store_full(shm_store, caplog):
+    assert shm_store.put(np.zeros(2 * 10**6), "too big") is None
+    assert any("No room for" in record.msg for record in caplog.records)
+    assert shm_store.get_usage()[0] == 0
+
+
+def test_shm_free_space_is_reused(shm_store):
+    # fill the arena in blocks, then free them all and allocate the whole arena
+    handles = shm_store._handles
+    offsets = [shm_store._reserve(handles, [10**6])[0] for _ in range(9)]
+    for offset in offsets[::2] + offsets[1::2]:
+        shm_store._free(handles, [(offset, 10**6)])
+    assert shm_store.get_usage()[0] == 0
+    assert shm_store._reserve(handles, [10000000]) == [0]
+
+
+def test_shm_lease_released_by_all_consumers(shm_store):
+    obj_id = shm_store.put(np.arange(1000), "leased", consumers=2)
+    assert shm_store.get_all()[obj_id]["consumers"] == 2
+    shm_store.releaseID(obj_id)
+    assert np.array_equal(shm_store.getID(obj_id), np.arange(1000))
+    assert shm_store.get_all()[obj_id]["consumers"] == 1
+    shm_store.releaseID(obj_id)
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(obj_id)
+    assert shm_store.get_usage()[0] == 0
+
+
+def test_shm_release_unleased_is_noop(shm_store):
+    obj_id = shm_store.put(np.arange(10), "kept")
+    shm_store.releaseID(obj_id)
+    assert shm_store.get_all()[obj_id]["consumers"] is None
+    assert np.array_equal(shm_store.getID(obj_id), np.arange(10))
+
+
+def test_shm_delete(shm_store):
+    ids = shm_store.putMany([np.arange(10), np.ones(10)], ["a", "b"], consumers=3)
+    shm_store.delete(ids[0])
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(ids[0])
+    shm_store.delete(ids[1])
+    assert shm_store.get_usage()[0] == 0
+
+
+def test_shm_delete_missing(shm_store):
+    obj_id = shm_store.random_ObjectID()[0]
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.delete(obj_id)
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.releaseID(obj_id)
+
+
+def test_shm_replace(shm_store):
+    assert shm_store.replace(np.zeros(10), "theta") == 1
+    assert shm_store.replace(np.ones(10), "theta") == 2
+    assert np.array_equal(shm_store.get_version("theta"), np.ones(10))
+    # superseded versions nobody holds are freed
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.get_version("theta", 1)
+    assert len(shm_store.get_all()) == 1
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.get_version("mu")
+
+
+def test_shm_replace_snapshot(shm_store):
+    shm_store.replace({"w": np.arange(5)}, "theta")
+    with shm_store.snapshot("theta") as theta:
+        for i in range(3):
+            shm_store.replace({"w": np.full(5, i)}, "theta")
+        assert np.array_equal(theta["w"], np.arange(5))
+        assert np.array_equal(shm_store.get_version("theta", 1)["w"], np.arange(5))
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.get_version("theta", 1)
+    version, theta = shm_store.hold_version("theta")
+    assert version == 4
+    shm_store.release_version("theta", version)
+    assert np.array_equal(shm_store.get_version("theta")["w"], np.full(5, 2))
+    (latest,) = shm_store.get_all()
+    shm_store.delete(latest)
+    assert shm_store.get_usage()[0] == 0
+
+
+def test_shm_retention_window(shm_store):
+    shm_store.set_retention("acq_raw*", 3)
+    ids = [shm_store.put(np.full(1000, i), "acq_raw" + str(i)) for i in range(5)]
+    kept = shm_store.put(np.arange(10), "other")
+    for obj_id in ids[:2]:
+        with pytest.raises(ObjectNotFoundError):
+            shm_store.getID(obj_id)
+    for i, obj_id in enumerate(ids[2:], 2):
+        assert np.array_equal(shm_store.getID(obj_id), np.full(1000, i))
+    assert np.array_equal(shm_store.getID(kept), np.arange(10))
+    assert shm_store.get_retention() == {
+        "acq_raw": {"keep": 3, "retained": 3, "evicted": 2, "evicted_bytes": 16000}
+    }
+
+
+def test_shm_retention_longest_prefix(tmp_path):
+    store_loc = str(tmp_path / "store")
+    SharedMemoryStoreInterface.create_store(
+        store_loc, 10000000, retention={"S": 1, "Stats": 2}
+    )
+    store = SharedMemoryStoreInterface(store_loc=store_loc)
+    store.putMany([1, 2, 3], ["S1", "Stats1", "Stats2"])
+    store.putMany([4, 5], ["S2", "Stats3"])
+    names = sorted(info["name"] for info in store.get_all().values())
+    assert names == ["S2", "Stats2", "Stats3"]
+    SharedMemoryStoreInterface.destroy_store(store_loc)
+
+
+def test_shm_retention_frees_space(shm_store):
+    shm_store.set_retention("frame", 2)
+    for i in range(50):
+        assert shm_store.put(np.zeros(10**5), "frame" + str(i)) is not None
+    assert shm_store.get_usage()[0] == 2 * 8 * 10**5
+    assert shm_store.get_retention()["frame"]["evicted"] == 48
+
+
+def test_shm_retention_skips_deleted(shm_store):
+    shm_store.set_retention("frame", 1)
+    obj_id = shm_store.put(1, "frame0")
+    shm_store.delete(obj_id)
+    shm_store.put(2, "frame1")
+    assert shm_store.get_retention()["frame"]["evicted"] == 0
+    shm_store.set_retention("frame", None)
+    assert shm_store.get_retention() == {}
+    shm_store.put(3, "frame2")
+    assert len(shm_store.get_all()) == 2
+
+
+def test_shm_retention_defers_leased(shm_store):
+    shm_store.set_retention("frame", 1)
+    leased = shm_store.put(np.full(1000, 7), "frame0", consumers=1)
+    view = shm_store.getID(leased)
+    for i in range(1, 5):
+        shm_store.put(np.full(1000, i), "frame" + str(i))
+    assert shm_store.get_retention()["frame"]["evicted"] == 4
+    assert np.array_equal(view, np.full(1000, 7))
+    shm_store.releaseID(leased)
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(leased)
+    assert shm_store.get_usage()[0] == 8000
+
+
+def test_shm_ring(shm_store):
+    ring = shm_store.create_ring("frames", (4, 5), np.uint16, 3)
+    assert ring.latest() == -1
+    with pytest.raises(ObjectNotFoundError):
+        ring.get(0)
+    for i in range(4):
+        assert ring.put(np.full((4, 5), i)) == i
+    assert ring.latest() == 3
+    assert not ring.is_valid(0)
+    with pytest.raises(ObjectNotFoundError):
+        ring.get(0)
+    frame = ring.get(2)
+    assert frame.dtype == np.uint16
+    assert np.array_equal(frame, np.full((4, 5), 2))
+    assert not frame.flags.writeable
+
+
+def test_shm_ring_claim_in_place(shm_store):
+    ring = shm_store.create_ring("frames", 8, np.float64, 2)
+    seq, slot = ring.claim()
+    slot[:] = np.arange(8)
+    assert not ring.is_valid(seq)
+    ring.commit(seq)
+    other = shm_store.get_ring("frames")
+    assert np.array_equal(other.get(seq), np.arange(8))
+
+
+def test_shm_ring_lifecycle(shm_store):
+    shm_store.create_ring("frames", (100, 100), np.float64, 10)
+    with pytest.raises(ValueError, match="already exists"):
+        shm_store.create_ring("frames", (100, 100), np.float64, 10)
+    assert shm_store.get_usage()[0] >= 10 * 8 * 100 * 100
+    shm_store.delete(shm_store.ring_id("frames"))
+    assert shm_store.get_usage()[0] == 0
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.get_ring("frames")
+
+
+def test_shm_traces(shm_store):
+    traces = shm_store.create_traces("C", max_rows=5, max_frames=100)
+    assert traces.shape == (0, 0)
+    assert traces.append([1.0, 2.0]) == 0
+    assert traces.append([3.0, 4.0, 5.0]) == 1
+    assert traces.extend(np.ones((3, 2))) == 3
+    assert traces.shape == (3, 4)
+    expected = [[1, 3, 1, 1], [2, 4, 1, 1], [0, 5, 1, 1]]
+    assert np.array_equal(traces.window(), expected)
+    window = shm_store.get_traces("C").window(-2)
+    assert np.array_equal(window, np.ones((3, 2)))
+    assert not window.flags.writeable
+
+
+def test_shm_traces_full(shm_store):
+    traces = shm_store.create_traces("C", max_rows=2, max_frames=2, dtype=np.float32)
+    with pytest.raises(ValueError, match="rows do not fit"):
+        traces.append(np.zeros(3))
+    traces.extend(np.zeros((2, 2)))
+    with pytest.raises(ValueError, match="is full"):
+        traces.append(np.zeros(2))
+    with pytest.raises(ValueError, match="already exists"):
+        shm_store.create_traces("C", max_rows=2, max_frames=2)
+    shm_store.delete(shm_store.traces_id("C"))
+    assert shm_store.get_usage()[0] == 0
+
+
+def _read_ring_in_child(store_loc, ring, queue):
+    queue.put(ring.get(ring.latest()).sum())
+    ring.put(np.ones(10))
+
+
+def test_shm_ring_shared_across_processes(shm_store):
+    ring = shm_store.create_ring("frames", 10, np.int32, 4)
+    ring.put(np.arange(10))
+    ctx = get_context("spawn")
+    queue = ctx.Queue()
+    p = ctx.Process(target=_read_ring_in_child, args=(shm_store.store_loc, ring, queue))
+    p.start()
+    assert queue.get(timeout=60) == 45
+    p.join(timeout=60)
+    assert np.array_equal(ring.get(1), np.ones(10))
+
+
+def _put_with_id(store, obj_id, obj):
+    """Put obj under an id chosen in advance, as a producer would"""
+    handles = store._handles
+    kind, header, payload, nbytes = store._encode(obj)
+    offset = store._reserve(handles, [nbytes])[0]
+    store._write(handles, kind, payload, offset, nbytes)
+    store._seal(handles, [(obj_id, "late", kind, header, offset, nbytes)])
+
+
+def _put_later_shm(store, obj_id, obj="late", delay=0.2):
+    thread = threading.Timer(delay, _put_with_id, args=(store, obj_id, obj))
+    thread.start()
+    return thread
+
+
+def test_shm_getID_waits_for_seal(shm_store):
+    obj_id = shm_store.random_ObjectID()[0]
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(obj_id, timeout=0.05)
+    thread = _put_later_shm(shm_store, obj_id)
+    assert shm_store.getID(obj_id, timeout=10) == "late"
+    thread.join()
+
+
+async def test_shm_get_async(shm_store):
+    obj_id = shm_store.random_ObjectID()[0]
+    thread = _put_later_shm(shm_store, obj_id)
+    results = await asyncio.gather(
+        shm_store.get_async(obj_id, timeout=10),
+        shm_store.get_async(obj_id, timeout=10),
+    )
+    assert results == ["late", "late"]
+    thread.join()
+    with pytest.raises(ObjectNotFoundError):
+        await shm_store.get_async(shm_store.random_ObjectID()[0], timeout=0.05)
+
+
+async def test_shm_async_client(shm_store):
+    client = AsyncStoreInterface(shm_store, max_workers=2)
+    obj_id = await client.put_async(np.arange(10**6), "big")
+    late_id = shm_store.random_ObjectID()[0]
+    thread = _put_later_shm(shm_store, late_id)
+    big, late = await client.get_many_async([obj_id, late_id], timeout=10)
+    assert np.array_equal(big, np.arange(10**6))
+    assert late == "late"
+    thread.join()
+    client.close()
+
+
+def test_shm_read_cache(shm_store):
+    shm_store.enable_cache(max_objects=2)
+    coords = shm_store.put({"neurons": [1, 2, 3]}, "coords")
+    frame = shm_store.put(np.arange(3), "frame")
+    assert shm_store.getID(coords) is shm_store.getID(coords)
+    assert shm_store.getList([coords, frame])[0] is shm_store.getID(coords)
+    assert shm_store.cache_info()["hits"] == 3
+    # arrays are views on the arena and are not cached
+    shm_store.getID(frame)
+    assert shm_store.cache_info()["size"] == 1
+    shm_store.delete(coords)
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(coords)
+    shm_store.disable_cache()
+    assert shm_store.cache_info() is None
+
+
+def test_shm_notify(shm_store):
+    assert shm_store.notify() is None
+    shm_store.subscribe()
+    ids = shm_store.putMany([np.arange(10), "x"], ["a", "b"])
+    assert shm_store.notify() == (ids[0], 80, 0)
+    assert shm_store.notify()[0] == ids[1]
+    assert shm_store.notify() is None
+    shm_store.unsubscribe()
+    shm_store.put(1, "c")
+    assert shm_store.notify() is None
+
+
+def _get_in_child(store_loc, obj_id, queue):
+    store = SharedMemoryStoreInterface("child", store_loc)
+    queue.put(store.getID(obj_id, timeout=60).sum())
+
+
+def test_shm_getID_waits_across_processes(shm_store):
+    obj_id = shm_store.random_ObjectID()[0]
+    ctx = get_context("spawn")
+    queue = ctx.Queue()
+    p = ctx.Process(target=_get_in_child, args=(shm_store.store_loc, obj_id, queue))
+    p.start()
+    time.sleep(1)
+    _put_with_id(shm_store, obj_id, np.arange(10))
+    assert queue.get(timeout=60) == 45
+    p.join(timeout=60)
+
+
+def test_shm_spill_and_promote(shm_store, tmp_path):
+    shm_store.set_spill(tmp_path / "spill", high_water=0.5, low_water=0.25)
+    ids = [shm_store.put(np.full(10**5, i), "frame" + str(i)) for i in range(10)]
+    used, size = shm_store.get_usage()
+    assert used <= size / 2
+    assert np.array_equal(shm_store.getID(ids[0]), np.full(10**5, 0))
+    assert [frame[0] for frame in shm_store.getList(ids)] == list(range(10))
+    assert len(shm_store.get_all()) == 10
+
+
+def test_shm_spill_keeps_sigint_handler(shm_store, tmp_path):
+    def handler(signum, frame):
+        pass
+
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        shm_store.set_spill(tmp_path / "spill", high_water=0.5, low_water=0.25)
+        for i in range(10):
+            shm_store.put(np.zeros(10**5), "frame")
+        assert signal.getsignal(signal.SIGINT) is handler
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def test_shm_spill_when_full(shm_store, tmp_path):
+    shm_store.set_spill(tmp_path / "spill", high_water=1, low_water=0.5)
+    leased = shm_store.put(np.zeros(4 * 10**5), "leased", consumers=1)
+    ids = [shm_store.put(np.full(2 * 10**5, i), "frame") for i in range(10)]
+    assert None not in ids
+    assert shm_store.get_all()[leased]["consumers"] == 1
+    shm_store.delete(ids[0])
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(ids[0])
+    assert shm_store.getID(ids[1])[0] == 1
+
+
+def test_shm_spill_off(shm_store, tmp_path):
+    shm_store.set_spill(tmp_path / "spill", high_water=0.5, low_water=0.25)
+    shm_store.set_spill(None)
+    for i in range(10):
+        shm_store.put(np.zeros(10**5), "frame")
+    assert shm_store.get_usage()[0] == 8 * 10**6
+    with pytest.raises(ValueError, match="low_water"):
+        shm_store.set_spill(tmp_path / "spill", high_water=0.5, low_water=0.75)
+
+
+def _put_in_child(store_loc, queue):
+    store = SharedMemoryStoreInterface("child", store_loc)
+    queue.put(store.put(np.arange(10), "from_child"))
+
+
+def test_shm_shared_across_processes(shm_store):
+    ctx = get_context("spawn")
+    queue = ctx.Queue()
+    p = ctx.Process(target=_put_in_child, args=(shm_store.store_loc, queue))
+    p.start()
+    id = queue.get(timeout=WAIT_TIMEOUT)
+    p.join(WAIT_TIMEOUT)
+    assert np.array_equal(shm_store.getID(id), np.arange(10))
+
+
+@pytest.fixture
+def lmdb_store(tmp_path):
+    """Start an LMDB store that commits every put"""
+    store = LMDBStoreInterface(
+        path=tmp_path, name="lmdb", max_size=10**8, flush_immediately=True
+    )
+    yield store
+    store.close()
+
+
+def test_lmdb_raw_array_record(lmdb_store):
+    lmdb_store.put(np.arange(12, dtype=np.int16).reshape(3, 4), "frame")
+    data = lmdb_store.get(b"frame", include_metadata=True)
+    assert data.name == "frame"
+    assert np.array_equal(data.obj, np.arange(12).reshape(3, 4))
+    assert data.obj.dtype == np.int16
+    assert not data.obj.flags.writeable
+    assert lmdb_store.get([b"frame", b"missing"])[0].shape == (3, 4)
+
+
+def test_lmdb_pickled_record(lmdb_store):
+    lmdb_store.put({"a": [1, 2]}, "q__Acquirer.q_out__1")
+    data = lmdb_store.get(b"q__Acquirer.q_out__1", include_metadata=True)
+    assert data.obj == {"a": [1, 2]}
+    assert data.queue == "q_out"
+
+
+def test_lmdb_metadata(lmdb_store):
+    lmdb_store.put(np.zeros((2, 5)), "frame")
+    lmdb_store.put("text", "note")
+    frame, note = lmdb_store.get_metadata([b"frame", b"note"])
+    assert frame.shape == (2, 5)
+    assert frame.dtype == np.float64
+    assert note.dtype is None
+    assert note.name == "note"
+    assert lmdb_store.get_metadata(b"missing") is None
+
+
+def test_lmdb_view(lmdb_store):
+    lmdb_store.put(np.arange(10.0), "frame")
+    with lmdb_store.view(b"frame") as frame:
+        assert frame.sum() == 45
+    with pytest.raises(ObjectNotFoundError), lmdb_store.view(b"missing"):
+        pass
+
+
+def test_lmdb_reads_pickled_lmdbdata(lmdb_store):
+    with lmdb_store.lmdb_env.begin(write=True) as txn:
+        txn.put(b"old", pickle.dumps(LMDBData(np.ones(3), time=1.0, name="old")))
+    assert np.array_equal(lmdb_store.get(b"old"), np.ones(3))
+    assert lmdb_store.get_metadata(b"old").shape == (3,)
+
+
+def _wait_for_commit(store, records):
+    deadline = time.time() + WAIT_TIMEOUT
+    while store.get_write_stats()["records_written"] < records:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_lmdb_commits_when_records_pending(tmp_path):
+    store = LMDBStoreInterface(
+        path=tmp_path, name="lmdb", max_size=10**8, commit_freq=60, commit_records=2
+    )
+    store.put(np.zeros(10), "a")
+    store.put(np.zeros(10), "b")
+    _wait_for_commit(store, 2)
+    stats = store.get_write_stats()
+    assert stats["pending"] == 0
+    assert stats["pending_bytes"] == 0
+    assert stats["commits"] == 1
+    assert store.get_metadata(b"b").shape == (10,)
+
+
+def test_lmdb_commits_when_bytes_pending(tmp_path):
+    store = LMDBStoreInterface(
+        path=tmp_path, name="lmdb", max_size=10**8, commit_freq=60, commit_bytes=1000
+    )
+    store.put(np.zeros(1000), "frame")
+    _wait_for_commit(store, 1)
+    assert store.get_write_stats()["bytes_written"] > 8000
+
+
+def test_lmdb_drop_when_full(tmp_path, caplog):
+    store = LMDBStoreInterface(
+        path=tmp_path, name="lmdb", max_size=10**8, max_pending=2, overflow="drop"
+    )
+    with store._commit_lock:  # hold off the writer
+        for i in range(3):
+            store.put(i, str(i))
+        stats = store.get_write_stats()
+    assert stats["pending"] == 2
+    assert stats["dropped"] == 1
+    assert "dropping 2" in caplog.text
+    store.commit()
+    assert store.get(b"2") is None
+    assert store.get(b"1") == 1
+
+
+def test_lmdb_failed_commit_is_counted(tmp_path, caplog):
+    store = LMDBStoreInterface(path=tmp_path, name="lmdb", max_size=10**6)
+    with store._commit_lock:  # hold off the writer
+        store.put(np.zeros(10**6), "too_big")  # more than the map size
+    store.commit()
+    stats = store.get_write_stats()
+    assert stats["dropped"] == 1
+    assert stats["pending_bytes"] == 0
+    assert "Could not commit 1 objects" in caplog.text
+    store.put(1, "small")
+    store.commit()
+    assert store.get(b"small") == 1
+
+
+def test_lmdb_overflow_policy():
+    with pytest.raises(ValueError, match="overflow"):
+        LMDBStoreInterface(name="lmdb", overflow="spill")
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_lmdb_codec(tmp_path, codec):
+    store = LMDBStoreInterface(
+        path=tmp_path,
+        name="lmdb",
+        max_size=10**8,
+        flush_immediately=True,
+        codecs={"frame": codec},
+    )
+    store.put(np.zeros((100, 100)), "frame_1")
+    store.put({"spikes": np.ones(10)}, "frame_est")
+    store.put(np.zeros(1000), "raw")
+    assert np.array_equal(store.get(b"frame_1"), np.zeros((100, 100)))
+    assert np.array_equal(store.get(b"frame_est")["spikes"], np.ones(10))
+    assert store.get_metadata(b"frame_1").shape == (100, 100)
+    stats = store.get_write_stats()
+    assert stats["bytes_written"] < stats["bytes_put"] / 2
+
+
+def test_lmdb_codec_longest_prefix(lmdb_store):
+    lmdb_store.set_codec("frame", "zlib", level=9)
+    lmdb_store.set_codec("frame_raw", "none")
+    assert lmdb_store.get_codec("frame_1") == ("zlib", 9)
+    assert lmdb_store.get_codec("frame_raw") is None
+    assert lmdb_store.get_codec("estimates") is None
+    with pytest.raises(ValueError, match="Unknown codec"):
+        lmdb_store.set_codec("frame", "rar")
+
+
+def test_lmdb_segments(tmp_path):
+    store = LMDBStoreInterface(
+        path=tmp_path,
+        name="lmdb",
+        max_size=10**8,
+        flush_immediately=True,
+        segment_bytes=4 * 10**4,
+    )
+    store.put(np.zeros(10**4), "frame_0")
+    store.put(np.ones(10**4), "frame_1")
+    store.put({"rate": 1}, "params_dict")
+    segments = store.get_segments()
+    assert [segment["name"] for segment in segments] == [
+        "segment_00000",
+        "segment_00001",
+        "segment_00002",
+    ]
+    assert segments[0]["end"] is not None
+    assert segments[2]["end"] is None
+    assert store.get_keys() == [b"frame_0", b"frame_1", b"params_dict"]
+    assert store.get([b"frame_0", b"frame_1"])[1][0] == 1
+
+    store.close()
+    loaded = LMDBStoreInterface(path=tmp_path / "lmdb", load=True)
+    assert loaded.get_metadata(b"frame_0").shape == (10**4,)
+    loaded.close()
+    assert LMDBReader((tmp_path / "lmdb").as_posix()).get_params().obj == {"rate": 1}
+
+    # finished segments can be moved away while the LMDB is in use
+    shutil.rmtree(tmp_path / "lmdb" / "segment_00000")
+    loaded = LMDBStoreInterface(path=tmp_path / "lmdb", load=True)
+    assert loaded.get(b"frame_0") is None
+    assert loaded.get(b"frame_1")[0] == 1
+    assert len(LMDBStoreInterface.segment_paths(tmp_path / "lmdb")) == 2
+
+
+def test_lmdb_segments_by_time(tmp_path):
+    store = LMDBStoreInterface(
+        path=tmp_path,
+        name="lmdb",
+        max_size=10**8,
+        flush_immediately=True,
+        segment_seconds=0,
+    )
+    store.put(1, "a")
+    store.put(2, "b")
+    assert len(store.get_segments()) == 3
+    assert store.get([b"a", b"b"]) == [1, 2]
+
+
+def test_lmdb_indexes(lmdb_store):
+    for i in range(3):
+        lmdb_store.put(np.full(4, i), "acq_raw" + str(i))
+        lmdb_store.put(i, "q__Acquirer.q_out__" + str(i))
+    assert lmdb_store.keys_by_name("q__Acquirer") == [
+        b"q__Acquirer.q_out__0",
+        b"q__Acquirer.q_out__1",
+        b"q__Acquirer.q_out__2",
+    ]
+    assert sorted(lmdb_store.keys_by_frame(1)) == [
+        b"acq_raw1",
+        b"q__Acquirer.q_out__1",
+    ]
+    assert len(lmdb_store.keys_by_frame(0, 2)) == 4
+    keys = lmdb_store.keys_by_time()
+    assert keys[0] == b"acq_raw0"
+    assert keys[-1] == b"q__Acquirer.q_out__2"
+    t = lmdb_store.get_metadata(b"acq_raw1").time
+    assert lmdb_store.keys_by_time(t, np.nextafter(t, np.inf)) == [b"acq_raw1"]
+    assert b"__by_name__" not in lmdb_store.get_keys()
+
+
+def test_lmdb_indexes_follow_delete(lmdb_store):
+    lmdb_store.put(1, "acq_raw1")
+    lmdb_store.delete(b"acq_raw1")
+    assert lmdb_store.keys_by_name("acq") == []
+    assert lmdb_store.keys_by_frame(1) == []
+
+
+def test_lmdb_name_ending_in_huge_number(lmdb_store):
+    name = "acq_raw" + str(2**64)
+    lmdb_store.put(1, name)
+    assert lmdb_store.keys_by_name(name) == [name.encode()]
+    assert lmdb_store.keys_by_frame(0, 2**64 - 1) == []
+
+
+def test_lmdb_reindex(lmdb_store):
+    with lmdb_store.lmdb_env.begin(write=True) as txn:
+        txn.put(b"old7", pickle.dumps(LMDBData(1, time=1.0, name="old7")))
+    assert lmdb_store.keys_by_frame(7) == []
+    lmdb_store.reindex()
+    assert lmdb_store.keys_by_frame(7) == [b"old7"]
+    assert lmdb_store.keys_by_time(0, 2) == [b"old7"]
+
+
+def test_lmdb_replace(tmp_path):
+    store = LMDBStoreInterface(path=tmp_path, name="lmdb", max_size=10**8)
+    assert store.replace(np.zeros(10), "theta") == 1
+    store.put(5, "theta")
+    store.replace(7, "theta2")
+    assert store.replace(np.ones(10), "theta") == 2
+    assert np.array_equal(store.get_version("theta"), np.ones(10))
+    assert np.array_equal(store.get_version("theta", 1), np.zeros(10))
+    with pytest.raises(ObjectNotFoundError):
+        store.get_version("theta", 3)
+    with pytest.raises(ObjectNotFoundError):
+        store.get_version("mu")
+    store.close()
+
+    store = LMDBStoreInterface(path=tmp_path, name="lmdb", max_size=10**8)
+    assert store.replace(np.full(10, 2), "theta") == 3
+    assert store.get_version("theta2") == 7
+    store.close()
+
+
+def test_lmdb_codecs_setting(shm_store, tmp_path):
+    shm_store._setup_LMDB(
+        use_lmdb=True,
+        lmdb_path=tmp_path,
+        lmdb_name="lmdb",
+        lmdb_codecs={"acq_raw": "zlib"},
+    )
+    assert shm_store.lmdb_store.get_codec("acq_raw1") == ("zlib", None)
+    assert shm_store.lmdb_store.get_codec("estimates1") is None
+    shm_store.lmdb_store.close()
+
+
+def test_lmdb_load_without_indexes(tmp_path):
+    env = lmdb.open((tmp_path / "old").as_posix())
+    with env.begin(write=True) as txn:
+        for i in range(3):
+            name = "q__Acquirer.q_out__" + str(i)
+            txn.put(name.encode(), pickle.dumps(LMDBData([i], time=i, name=name)))
+    env.close()
+    loaded = LMDBStoreInterface(path=tmp_path / "old", load=True)
+    assert len(loaded.keys_by_name("q__Acquirer")) == 3
+    assert loaded.keys_by_frame(1) == [b"q__Acquirer.q_out__1"]
+    loaded.close()
+    # loading left the LMDB as it was, with no index databases
+    env = lmdb.open((tmp_path / "old").as_posix())
+    with env.begin() as txn:
+        assert txn.get(LMDBStoreInterface.INDEXES[0]) is None
+    env.close()
+
+
+def test_lmdb_reader_uses_indexes(tmp_path):
+    store = LMDBStoreInterface(path=tmp_path, name="lmdb", max_size=10**8)
+    store.put(np.zeros(4), "acq_raw3")
+    store.put("est", "estimates3")
+    store.close()
+    reader = LMDBReader((tmp_path / "lmdb").as_posix())
+    assert sorted(reader.get_data_by_number(3)) == sorted(
+        f"{d.name}_{d.time}" for d in reader.get_all_data().values()
+    )
+    assert list(reader.get_data_by_type("est").values())[0].obj == "est"
+    assert reader.get_data_types() == {b"acq_raw", b"estimates"}
+
+
+def test_lmdb_reader_by_number(tmp_path):
+    store = LMDBStoreInterface(path=tmp_path, name="lmdb", max_size=10**8)
+    for i in range(5):
+        store.put(np.full(4, i), "acq_raw" + str(i))
+    store.close()
+    data = LMDBReader((tmp_path / "lmdb").as_posix()).get_data_by_number(2)
+    assert len(data) == 1
+    assert list(data.values())[0].name == "acq_raw2"
+
+
+def test_lmdb_reader_parallel(tmp_path):
+    store = LMDBStoreInterface(
+        path=tmp_path, name="lmdb", max_size=10**8, segment_bytes=10**5
+    )
+    for i in range(40):
+        store.put(np.full((100, 100), i, dtype=np.int32), "acq_raw" + str(i))
+        store.put({"frame": i}, "q__Acquirer.q_out__" + str(i))
+        store.commit()
+    store.close()
+    reader = LMDBReader((tmp_path / "lmdb").as_posix())
+    serial = reader.get_all_data()
+    parallel = reader.get_all_data(workers=3)
+    assert len(store.get_segments()) > 1
+    assert parallel.keys() == serial.keys()
+    for name, data in serial.items():
+        if isinstance(data.obj, np.ndarray):
+            assert np.array_equal(parallel[name].obj, data.obj)
+        else:
+            assert parallel[name].obj == data.obj
+
+
+def test_plasma_store_needs_pyarrow(monkeypatch):
+    monkeypatch.setattr("improv.store.plasma", None)
+    with pytest.raises(ImportError, match="pip install improv\\[plasma\\]"):
+        StoreInterface()